@@ -0,0 +1,119 @@
+"""
+Player animation state machine.
+
+Simulation.texture is the pose the bear collides with, and stays exactly as
+it was so that physics, replays and the batch simulation are unchanged.
+What is drawn comes from PlayerAnimator instead: an integer state, one of
+IDLE, WALK, JUMP, FALL and DASH times the facing, picked from the
+simulation's state, and a frame table per state that the animator steps
+through by elapsed simulation time. This shows the fall frames while the
+bear drops and an idle frame while it stands still, which the pose never does.
+
+update() reports whether the (state, frame) shown changed, so the sprite's
+texture is only set when there is a new frame to show.
+"""
+from physics import PHYSICS_STEP
+from simulation import PLAYER_SPRITE_IMAGE_CHANGE_SPEED, PLAYER_X_SPEED
+
+#Facing, the low bit of a state
+FACING_LEFT = 0
+FACING_RIGHT = 1
+
+#Kinds of movement, the high bits of a state
+IDLE = 0
+WALK = 1
+JUMP = 2
+FALL = 3
+DASH = 4
+KINDS = 5
+
+#Seconds per frame of every kind; a walk frame lasts as long as the bear
+#takes to walk PLAYER_SPRITE_IMAGE_CHANGE_SPEED pixels, like the pose's
+FRAME_DURATIONS = {
+    IDLE: 1.0,
+    WALK: PLAYER_SPRITE_IMAGE_CHANGE_SPEED / PLAYER_X_SPEED * PHYSICS_STEP,
+    JUMP: 0.1,
+    FALL: 0.1,
+    DASH: 0.05,
+}
+
+#PLAYER_ANIMATIONS name of every kind, per facing
+ANIMATIONS = {
+    IDLE: ("idle_left", "idle_right"),
+    WALK: ("left", "right"),
+    JUMP: ("up_left", "up_right"),
+    FALL: ("down_left", "down_right"),
+    DASH: ("dash_left", "dash_right"),
+}
+
+#Facing of Simulation.last_button_x and Simulation.last_dash_direction values
+FACINGS = {"Left": FACING_LEFT, "Right": FACING_RIGHT, "left": FACING_LEFT, "right": FACING_RIGHT}
+
+
+def state_code(kind, facing):
+    return kind * 2 + facing
+
+
+def frame_tables(frame_counts):
+    """
+    Per state: (animation name, frame duration, frame count).
+
+    frame_counts maps animation names to their number of frames.
+    """
+    tables = [None] * (KINDS * 2)
+    for kind, names in ANIMATIONS.items():
+        for facing, name in enumerate(names):
+            tables[state_code(kind, facing)] = name, FRAME_DURATIONS[kind], frame_counts[name]
+    return tables
+
+
+class PlayerAnimator:
+    """
+    Which player frame to draw, advanced once per update by simulation time.
+    """
+    def __init__(self, frame_counts):
+        self.tables = frame_tables(frame_counts)
+        self.state = state_code(IDLE, FACING_RIGHT)
+        self.frame = 0
+        self.state_time = 0.0
+        self.time = None
+
+    def pick_state(self, simulation):
+        if simulation.dashing:
+            return state_code(DASH, FACINGS.get(simulation.last_dash_direction, FACING_RIGHT))
+        facing = FACINGS.get(simulation.last_button_x, FACING_RIGHT)
+        if simulation.player_jump:
+            kind = JUMP
+        elif not simulation.collide:
+            kind = FALL
+        elif simulation.player_x != simulation.previous_x:
+            kind = WALK
+        else:
+            kind = IDLE
+        return state_code(kind, facing)
+
+    def update(self, simulation):
+        """Follow the simulation to its current time. True if the frame to draw changed."""
+        elapsed = 0.0 if self.time is None else max(0.0, simulation.total_time - self.time)
+        first = self.time is None
+        self.time = simulation.total_time
+
+        state = self.pick_state(simulation)
+        if state != self.state:
+            self.state_time = 0.0
+            frame = 0
+        else:
+            self.state_time += elapsed
+            _, duration, count = self.tables[state]
+            frame = int(self.state_time / duration) % count
+
+        if state == self.state and frame == self.frame and not first:
+            return False
+        self.state = state
+        self.frame = frame
+        return True
+
+    @property
+    def texture(self):
+        """(animation name, frame) to draw, like Simulation.texture."""
+        return self.tables[self.state][0], self.frame
@@ -0,0 +1,121 @@
+"""
+Process-wide texture cache.
+
+Every image is decoded once per process. Mirrored frames are made from the
+already decoded pixels instead of reading the PNG again, and all player frames
+share one texture atlas, so switching the bear's texture never uploads
+anything.
+"""
+import os
+
+import arcade
+import PIL.Image
+from arcade.texture_atlas import Allocator
+
+from simulation import GAME_DIR, PLAYER_ANIMATIONS
+
+#Width of the player atlas; its height is what the frames need
+PLAYER_ATLAS_WIDTH = 1024
+
+#Pixels around every texture in an atlas
+ATLAS_BORDER = 1
+
+
+def atlas_size(textures, width):
+    """Size of the lowest atlas of the given width that holds textures added in this order."""
+    width = max([width] + [texture.image.width + 2 * ATLAS_BORDER for texture in textures])
+    # Packed the way the atlas will pack them
+    allocator = Allocator(width, sum(texture.image.height + 2 * ATLAS_BORDER for texture in textures))
+    height = 1
+    for texture in textures:
+        box_height = texture.image.height + 2 * ATLAS_BORDER
+        _, y = allocator.alloc(texture.image.width + 2 * ATLAS_BORDER, box_height)
+        height = max(height, y + box_height)
+    return width, height
+
+
+class AssetManager:
+    """
+    Loads images and textures once and counts how well the cache does.
+    """
+    def __init__(self, game_dir=GAME_DIR):
+        self.game_dir = game_dir
+
+        # path -> decoded PIL image
+        self.images = {}
+
+        # (path, flipped) -> arcade.Texture
+        self.textures = {}
+
+        self.player_atlas = None
+
+        #Counters
+        self.hits = 0
+        self.misses = 0
+        self.decodes = 0
+
+    @property
+    def resident_bytes(self):
+        """Memory held by decoded pixels, mirrored copies included."""
+        total = 0
+        for texture in self.textures.values():
+            image = texture.image
+            total += image.width * image.height * len(image.getbands())
+        for path, image in self.images.items():
+            if (path, False) not in self.textures:
+                total += image.width * image.height * len(image.getbands())
+        return total
+
+    def image(self, path):
+        """Decoded pixels of an image, relative to the game directory."""
+        image = self.images.get(path)
+        if image is None:
+            image = PIL.Image.open(os.path.join(self.game_dir, path)).convert("RGBA")
+            self.images[path] = image
+            self.decodes += 1
+        return image
+
+    def texture(self, path, flipped=False):
+        key = path, flipped
+        texture = self.textures.get(key)
+        if texture is not None:
+            self.hits += 1
+            return texture
+
+        self.misses += 1
+        image = self.image(path)
+        name = path
+        if flipped:
+            image = image.transpose(PIL.Image.FLIP_LEFT_RIGHT)
+            name = f"{path}-flipped"
+        # Collisions are the simulation's; the sprite's box is enough for culling
+        texture = arcade.Texture(name, image, hit_box_algorithm="None")
+        self.textures[key] = texture
+        return texture
+
+    def player_animations(self):
+        """Textures of PLAYER_ANIMATIONS, as name -> list of frames."""
+        return {name: [self.texture(image, flipped) for image, flipped in frames]
+                for name, frames in PLAYER_ANIMATIONS.items()}
+
+    def get_player_atlas(self):
+        """One atlas holding every player frame, for the player's SpriteList."""
+        if self.player_atlas is None:
+            # Each frame once, tallest first, which the atlas packs best
+            textures = {texture.name: texture for frames in self.player_animations().values() for texture in frames}
+            textures = sorted(textures.values(), key=lambda texture: -texture.image.height)
+            self.player_atlas = arcade.TextureAtlas(atlas_size(textures, PLAYER_ATLAS_WIDTH), border=ATLAS_BORDER)
+            for texture in textures:
+                self.player_atlas.add(texture)
+        return self.player_atlas
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "decodes": self.decodes,
+            "resident_bytes": self.resident_bytes,
+        }
+
+
+ASSETS = AssetManager()
@@ -0,0 +1,142 @@
+"""
+Static layer baking.
+
+Most tile layers never change once a level is loaded: the sky, the city, the
+walls, even the platforms and spikes. Drawing them sprite by sprite costs
+thousands of quads a frame. BakedLayers renders the bottom run of those
+layers once, at map load, into camera-sized chunk textures inside an atlas;
+on_draw then only draws the chunks that overlap the camera.
+
+Layers are baked from the bottom up to the first layer whose sprites change
+(coins get picked up), so the draw order of everything on screen stays the
+same.
+"""
+import arcade
+import PIL.Image
+
+#Layers whose sprites are added or removed while playing
+DYNAMIC_LAYERS = {"coins"}
+
+#Largest atlas a bake asks for; arcade grows atlases up to the GPU limit
+MAX_BAKED_ATLAS_SIZE = 8192
+
+
+def static_layer_names(scene):
+    """Names of the scene layers, bottom first, that can be baked."""
+    names = []
+    for name in scene.name_mapping:
+        if name in DYNAMIC_LAYERS:
+            break
+        names.append(name)
+    return names
+
+
+def _atlas_side(chunks, chunk_size):
+    side = 256
+    while side < chunks * (chunk_size + 2) and side < MAX_BAKED_ATLAS_SIZE:
+        side *= 2
+    return side
+
+
+class BakedLayers:
+    """
+    The static layers of a scene as a grid of pre-rendered chunks.
+
+    Creating one does no OpenGL work. Chunks are rendered by bake_next(), one
+    per call and the ones on screen first, or all at once by bake(). Until the
+    chunks on screen are baked, draw() draws the layers themselves.
+    """
+    def __init__(self, scene, map_width, map_height, chunk_width, chunk_height):
+        self.scene = scene
+        self.layer_names = static_layer_names(scene)
+        self.live_layer_names = [name for name in scene.name_mapping if name not in self.layer_names]
+        self.chunk_width = chunk_width
+        self.chunk_height = chunk_height
+        self.columns = max(1, -(-int(map_width) // chunk_width))
+        self.rows = max(1, -(-int(map_height) // chunk_height))
+
+        # (column, row) -> Sprite showing that chunk
+        self.chunks = {}
+        self.pending = [(column, row) for row in range(self.rows) for column in range(self.columns)]
+        self.atlas = None
+        self.visible = None
+        self.visible_keys = None
+
+        # Chunks on screen that are not baked yet, drawn as layers meanwhile
+        self.wanted = []
+        self.direct = False
+
+    @property
+    def baked(self):
+        return not self.pending
+
+    def bake_next(self):
+        """Render one more chunk. Returns False when all are done."""
+        if not self.pending:
+            return False
+        wanted = [key for key in self.wanted if key in self.pending]
+        self.bake_chunks(wanted[:1] or self.pending[:1])
+        return bool(self.pending)
+
+    def bake_chunks(self, keys):
+        """Render the chunks at (column, row) keys straight into the atlas."""
+        if self.atlas is None:
+            self.atlas = arcade.TextureAtlas((_atlas_side(self.columns, self.chunk_width),
+                                              _atlas_side(self.rows, self.chunk_height)))
+            self.visible = arcade.SpriteList(atlas=self.atlas)
+
+        # All added before any is rendered: writing to the atlas after rendering into it waits for the GPU
+        textures = []
+        for column, row in keys:
+            self.pending.remove((column, row))
+            texture = arcade.Texture(f"baked-{id(self)}-{column}-{row}",
+                                     PIL.Image.new("RGBA", (self.chunk_width, self.chunk_height)),
+                                     hit_box_algorithm="None")
+            self.atlas.add(texture)
+            textures.append(texture)
+
+        for (column, row), texture in zip(keys, textures):
+            left = column * self.chunk_width
+            bottom = row * self.chunk_height
+            with self.atlas.render_into(texture, projection=(left, left + self.chunk_width,
+                                                             bottom, bottom + self.chunk_height)):
+                self.scene.draw(names=self.layer_names)
+
+            chunk = arcade.Sprite(texture=texture)
+            chunk.center_x = left + self.chunk_width / 2
+            chunk.center_y = bottom + self.chunk_height / 2
+            self.chunks[column, row] = chunk
+
+    def bake(self):
+        while self.bake_next():
+            pass
+
+    def update_visible(self, left, bottom, width, height):
+        """Pick the chunks that overlap a camera rectangle."""
+        first_column = max(0, int(left // self.chunk_width))
+        last_column = min(self.columns - 1, int((left + width) // self.chunk_width))
+        first_row = max(0, int(bottom // self.chunk_height))
+        last_row = min(self.rows - 1, int((bottom + height) // self.chunk_height))
+        keys = (first_column, last_column, first_row, last_row)
+        if keys == self.visible_keys:
+            return
+
+        shown = [(column, row) for row in range(first_row, last_row + 1)
+                 for column in range(first_column, last_column + 1)]
+        self.wanted = [key for key in shown if key not in self.chunks]
+        # Baking them all here would make one long frame; bake_next() gets to them
+        self.direct = bool(self.wanted)
+        if self.direct:
+            return
+        self.visible_keys = keys
+
+        while len(self.visible):
+            self.visible.pop()
+        for key in shown:
+            self.visible.append(self.chunks[key])
+
+    def draw(self):
+        if self.direct:
+            self.scene.draw(names=self.layer_names)
+        else:
+            self.visible.draw()
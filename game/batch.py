@@ -0,0 +1,784 @@
+"""
+Vectorized batch simulation.
+
+BatchSimulation plays one level with N bears at once for automated level
+tests and tuning runs. Every piece of player state lives in a NumPy array
+with one entry per bear (structure of arrays), and step() advances all of
+them with array operations, following the rules of Simulation.step exactly:
+same movement, dash and jump timers, texture changes and collision pushes.
+
+Collision uses CandidateTable: for every player size and every small cell of
+player positions, the few tiles whose collision tests the player can pass from
+there, precomputed at load time. Resolving then runs in rounds, one candidate
+per bear and round, in the same tile order as CollisionGrid.resolve. A bear
+pushed too far from where its candidates were picked carries on with the
+candidates of its new cell, the way the grid fetches tiles again, so results
+never differ.
+
+Bears are picked out of large arrays with index arrays (flatnonzero,
+compress) rather than boolean masks, and masks that only add or subtract are
+multiplied in: NumPy's masked assignment and np.where are several times
+slower at these sizes.
+
+Bears that reach the exit of the level (or the honey) are finished:
+they keep their last state and are no longer moved. Movement constants can be
+given per bear to try out different settings in one run.
+
+Needs NumPy, which the game itself does not.
+"""
+import os
+
+import numpy as np
+
+from collision import FLOOR, LEFT, RIGHT, CEILING
+from entities import ENTITY_LAYERS
+from levels import DEFAULT_KILL_Y
+from physics import PHYSICS_STEP
+from simulation import (GAME_DIR, CHARACTER_SCALING, JUMP_MAX_HEIGHT, PLAYER_X_SPEED, PLAYER_Y_SPEED,
+                        MAX_FALL_SPEED, GRAVITY, PLAYER_SPRITE_IMAGE_CHANGE_SPEED, DASH_SPEED, DASH_DURATION,
+                        DASH_COOLDOWN, JUMP_BUFFER_TIME, COYOTE_TIME, WINDOW_EPSILON, NEVER, PLAYER_ANIMATIONS,
+                        image_size, load_level)
+
+#Size of the player position cells of a CandidateTable, and how far a push may
+#move a player before its candidates are fetched again
+CANDIDATE_CELL = 16
+CANDIDATE_SLACK = 8
+
+#Pixels a CandidateTable reach box is wider than the tests it stands for
+REACH_EPSILON = 1e-3
+
+#Which of the player's collision tests a CandidateTable is built for
+PROBE_SIDES = "sides"
+PROBE_FLOOR = "floor"
+PROBE_POINT = "point"
+
+#Last Left/Right button, as InputState.facing and Simulation.last_button_x
+NO_BUTTON = 0
+LEFT_BUTTON = 1
+RIGHT_BUTTON = 2
+BUTTON_CODES = {None: NO_BUTTON, "Left": LEFT_BUTTON, "Right": RIGHT_BUTTON}
+
+#Animation codes, the positions of the names in PLAYER_ANIMATIONS
+ANIMATION_NAMES = tuple(PLAYER_ANIMATIONS)
+ANIMATION_CODES = {name: code for code, name in enumerate(ANIMATION_NAMES)}
+RIGHT_ANIMATION = ANIMATION_CODES["right"]
+LEFT_ANIMATION = ANIMATION_CODES["left"]
+DASH_LEFT_ANIMATION = ANIMATION_CODES["dash_left"]
+DASH_RIGHT_ANIMATION = ANIMATION_CODES["dash_right"]
+UP_RIGHT_ANIMATION = ANIMATION_CODES["up_right"]
+UP_LEFT_ANIMATION = ANIMATION_CODES["up_left"]
+
+#Walking and jumping animation of every last Left/Right button
+WALK_ANIMATIONS = np.zeros(3, dtype=np.int8)
+WALK_ANIMATIONS[LEFT_BUTTON] = LEFT_ANIMATION
+WALK_ANIMATIONS[RIGHT_BUTTON] = RIGHT_ANIMATION
+JUMP_ANIMATIONS = np.zeros(3, dtype=np.int8)
+JUMP_ANIMATIONS[LEFT_BUTTON] = UP_LEFT_ANIMATION
+JUMP_ANIMATIONS[RIGHT_BUTTON] = UP_RIGHT_ANIMATION
+
+#Frame timings of Simulation
+DASH_FRAME_DURATION = 0.05
+JUMP_FRAME_DURATION = 0.1
+
+#CollisionGrid side flags as bytes, so that flags built from masks stay bytes
+FLOOR_FLAG, LEFT_FLAG, RIGHT_FLAG, CEILING_FLAG = (np.int8(flag) for flag in (FLOOR, LEFT, RIGHT, CEILING))
+
+#Score of a coin
+COIN_SCORE = ENTITY_LAYERS["coins"][2]
+
+
+def _probe_boxes(rects, probe, width, height):
+    """For every tile, (x0, x1, y0, y1) of the player positions at which a test can pass."""
+    left, bottom, right, top = rects.T
+    fifth_width = width / 5
+    quarter_width = width / 4
+    half_height = height / 2
+    quarter_height = height / 4
+    if probe == PROBE_POINT:
+        return [(left, right, bottom, top)]
+    boxes = [(left - fifth_width, right + fifth_width, bottom + half_height, top + half_height)]
+    if probe == PROBE_SIDES:
+        boxes.append((left + quarter_width, right + quarter_width, bottom - quarter_height, top + quarter_height))
+        boxes.append((left - quarter_width, right - quarter_width, bottom - quarter_height, top + quarter_height))
+        boxes.append((left - fifth_width, right + fifth_width, bottom - half_height, top - half_height))
+    return boxes
+
+
+def _table_boxes(rects, sizes, probe, slack):
+    """
+    (size, x0, x1, y0, y1) of the player positions, `slack` and a pixel wider,
+    from which each test of every tile can pass, and every size's reach.
+    """
+    boxes = []
+    reach = []
+    for size, (width, height) in enumerate(sizes):
+        size_boxes = _probe_boxes(rects, probe, width, height)
+        for x0, x1, y0, y1 in size_boxes:
+            # One more pixel on each side covers the rounding of the cell lookup
+            boxes.append((size, x0 - slack - 1, x1 + slack + 1, y0 - slack - 1, y1 + slack + 1))
+        # A hair wider than the tests themselves, for their rounding
+        reach.append([np.min([box[0] for box in size_boxes], axis=0) - REACH_EPSILON,
+                      np.max([box[1] for box in size_boxes], axis=0) + REACH_EPSILON,
+                      np.min([box[2] for box in size_boxes], axis=0) - REACH_EPSILON,
+                      np.max([box[3] for box in size_boxes], axis=0) + REACH_EPSILON])
+    return boxes, reach
+
+
+def _boxes_extent(boxes):
+    return (min(box[1].min() for box in boxes), min(box[3].min() for box in boxes),
+            max(box[2].max() for box in boxes), max(box[4].max() for box in boxes))
+
+
+def candidate_extent(grid, sizes, probe=PROBE_SIDES, slack=CANDIDATE_SLACK):
+    """(x0, y0, x1, y1) of the player positions a CandidateTable of grid has candidates for, or None."""
+    rects = np.array(grid.rects, dtype=np.float64).reshape(-1, 4)
+    if not len(rects):
+        return None
+    return _boxes_extent(_table_boxes(rects, sizes, probe, slack)[0])
+
+
+class CandidateTable:
+    """
+    Tiles of a CollisionGrid within reach of the player, per player size and
+    position cell.
+
+    cells(x, y) gives the cell of every player and rows(size, cells) the row
+    of `candidates` for that cell and size: candidates[rank, row] is the
+    rank-th candidate, in ascending tile order. Entries are pairs, size *
+    (tiles + 1) + tile, indexing the per-pair arrays: the tile's rect, the
+    player's test offsets for that size and `reach`, the box of positions from
+    which any test can pass. Rows are padded with a pair whose arrays are NaN
+    so that every test against it fails. Any tile whose test can pass for a
+    position up to `slack` outside the cell is in the row.
+
+    The cells cover `extent` (x0, y0, x1, y1), grown to take in every tile's
+    reach, plus a ring of empty cells that positions outside fall into.
+    Tables built with the same extent, cell and slack share their cells.
+    """
+    def __init__(self, grid, sizes, probe=PROBE_SIDES, cell=CANDIDATE_CELL, slack=CANDIDATE_SLACK, extent=None):
+        rects = np.array(grid.rects, dtype=np.float64).reshape(-1, 4)
+        tile_count = len(rects)
+        self.cell = cell
+        self.slack = slack
+        boxes, reach = _table_boxes(rects, sizes, probe, slack)
+
+        def per_pair(values):
+            """One value per (size, tile) pair, NaN for the padding tile."""
+            return np.concatenate([np.append(value, np.nan) for value in values])
+
+        self.left = per_pair([rects[:, 0]] * len(sizes))
+        self.bottom = per_pair([rects[:, 1]] * len(sizes))
+        self.right = per_pair([rects[:, 2]] * len(sizes))
+        self.top = per_pair([rects[:, 3]] * len(sizes))
+        self.reach_left, self.reach_right, self.reach_bottom, self.reach_top = (
+            per_pair([size_reach[i] for size_reach in reach]) for i in range(4))
+        self.fifth_width = per_pair([np.full(tile_count, width / 5) for width, height in sizes])
+        self.quarter_width = per_pair([np.full(tile_count, width / 4) for width, height in sizes])
+        self.half_height = per_pair([np.full(tile_count, height / 2) for width, height in sizes])
+        self.quarter_height = per_pair([np.full(tile_count, height / 4) for width, height in sizes])
+        self.tile = np.tile(np.arange(tile_count + 1, dtype=np.int64), len(sizes))
+
+        if tile_count:
+            own = _boxes_extent(boxes)
+            extent = own if extent is None else (min(extent[0], own[0]), min(extent[1], own[1]),
+                                                 max(extent[2], own[2]), max(extent[3], own[3]))
+        if extent is None:
+            extent = (0.0, 0.0, 0.0, 0.0)
+        # One cell of margin on each side keeps the outermost ring empty
+        self.origin_x = (extent[0] - cell) // cell * cell
+        self.origin_y = (extent[1] - cell) // cell * cell
+        self.columns = int(extent[2] + cell - self.origin_x) // cell + 1
+        self.rows_per_size = int(extent[3] + cell - self.origin_y) // cell + 1
+        self.cells_per_size = cells_per_size = self.columns * self.rows_per_size
+        row_count = len(sizes) * cells_per_size
+        # The corner cell is in the empty ring: a row of nothing but padding
+        self.empty_row = 0
+
+        keys = []
+        tiles = np.arange(tile_count, dtype=np.int64)
+        for size, x0, x1, y0, y1 in boxes:
+            first_column = ((x0 - self.origin_x) // cell).astype(np.int64)
+            last_column = ((x1 - self.origin_x) // cell).astype(np.int64)
+            first_row = ((y0 - self.origin_y) // cell).astype(np.int64)
+            last_row = ((y1 - self.origin_y) // cell).astype(np.int64)
+            widths = last_column - first_column + 1
+            counts = widths * (last_row - first_row + 1)
+            owners = np.repeat(tiles, counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            columns = first_column[owners] + offsets % widths[owners]
+            rows = first_row[owners] + offsets // widths[owners]
+            row_ids = size * cells_per_size + rows * self.columns + columns
+            keys.append(row_ids * (tile_count + 1) + owners)
+
+        keys = np.unique(np.concatenate(keys)) if keys else np.zeros(0, dtype=np.int64)
+        row_ids, owners = np.divmod(keys, tile_count + 1)
+        counts = np.bincount(row_ids, minlength=row_count)
+        self.width = int(counts.max(initial=0))
+        # Bytes where they fit, which NumPy sorts by radix
+        self.counts = counts.astype(np.uint8 if self.width < 256 else np.int32)
+        starts = np.cumsum(counts) - counts
+        # Rank-major, so that the candidates of one rank are a single contiguous array
+        self.candidates = np.full((self.width, row_count), tile_count, dtype=np.int64)
+        self.candidates[np.arange(len(keys)) - starts[row_ids], row_ids] = \
+            row_ids // cells_per_size * (tile_count + 1) + owners
+
+    def cells(self, x, y):
+        """Cell of each player at (x, y)."""
+        # astype truncates towards zero instead of flooring, which only differs
+        # below zero, where the lower bound takes both to the ring anyway
+        column = np.minimum(np.maximum(((x - self.origin_x) / self.cell).astype(np.int64), 0), self.columns - 1)
+        row = np.minimum(np.maximum(((y - self.origin_y) / self.cell).astype(np.int64), 0), self.rows_per_size - 1)
+        return row * self.columns + column
+
+    def rows(self, size, cells):
+        """Table rows of players of size class `size` in cells."""
+        return size * self.cells_per_size + cells
+
+
+class BatchInputs:
+    """
+    Keys of N bears for one physics step, like N InputStates.
+
+    facing holds NO_BUTTON, LEFT_BUTTON or RIGHT_BUTTON.
+    """
+    def __init__(self, count):
+        self.left = np.zeros(count, dtype=bool)
+        self.right = np.zeros(count, dtype=bool)
+        self.jump = np.zeros(count, dtype=bool)
+        self.down = np.zeros(count, dtype=bool)
+        self.dash = np.zeros(count, dtype=bool)
+        self.facing = np.zeros(count, dtype=np.int8)
+
+    @classmethod
+    def from_states(cls, states):
+        inputs = cls(len(states))
+        for i, state in enumerate(states):
+            inputs.left[i] = state.left
+            inputs.right[i] = state.right
+            inputs.jump[i] = state.jump
+            inputs.down[i] = state.down
+            inputs.dash[i] = state.dash
+            inputs.facing[i] = BUTTON_CODES[state.facing]
+        return inputs
+
+
+class BatchSimulation:
+    """
+    N bears playing the same level, each on its own.
+
+    The keyword arguments override movement constants of the simulation
+    module, with one value for all bears or an array with one per bear.
+    """
+    STATE = ("x", "y", "jump_start", "fall_speed", "dash_end_time", "last_dash_time", "dash_frame_timer",
+             "jump_frame_timer", "last_button", "dash_direction", "animation", "frame", "dash_frame_index",
+             "jump_frame_index", "jumping", "collide", "collide_left", "collide_right", "collide_top",
+             "collide_coin", "dashing", "in_honey", "finished", "finish_time", "score", "respawns", "coins_left",
+             "reached", "jump_press_time", "floor_time")
+
+    def __init__(self, count, level=1, game_dir=GAME_DIR, loaded=None, jump_max_height=JUMP_MAX_HEIGHT,
+                 player_x_speed=PLAYER_X_SPEED, player_y_speed=PLAYER_Y_SPEED, max_fall_speed=MAX_FALL_SPEED,
+                 gravity=GRAVITY, dash_speed=DASH_SPEED, jump_buffer_time=JUMP_BUFFER_TIME, coyote_time=COYOTE_TIME):
+        self.count = count
+        self.level = level
+        self.jump_max_height = jump_max_height
+        self.player_x_speed = player_x_speed
+        self.player_y_speed = player_y_speed
+        self.max_fall_speed = max_fall_speed
+        self.gravity = gravity
+        self.dash_speed = dash_speed
+        self.jump_buffer_time = jump_buffer_time
+        self.coyote_time = coyote_time
+
+        # Player box of every animation; animations of the same size share a size class
+        sizes = []
+        size_classes = []
+        for name in ANIMATION_NAMES:
+            width, height = image_size(os.path.join(game_dir, PLAYER_ANIMATIONS[name][0][0]))
+            size = width * CHARACTER_SCALING, height * CHARACTER_SCALING
+            if size not in sizes:
+                sizes.append(size)
+            size_classes.append(sizes.index(size))
+        self.sizes = sizes
+        self.size_class = np.array(size_classes, dtype=np.int64)
+
+        # Level
+        loaded = loaded or load_level(level, game_dir)
+        self.collision = loaded.collision
+        self.end_of_map = loaded.level_data.width * loaded.level_data.tile_width
+        # All tables share their cells, so the entities are looked up with one cells() call
+        tables = ((self.collision.platforms, sizes, PROBE_SIDES), (self.collision.spikes, sizes, PROBE_FLOOR),
+                  (self.collision.coins, sizes, PROBE_SIDES), (self.collision.honey, [(0, 0)], PROBE_POINT))
+        extents = [extent for extent in (candidate_extent(*table) for table in tables) if extent is not None]
+        extent = (min(e[0] for e in extents), min(e[1] for e in extents),
+                  max(e[2] for e in extents), max(e[3] for e in extents)) if extents else None
+        self.platforms, self.spikes, self.coins, self.honey = (CandidateTable(*table, extent=extent)
+                                                               for table in tables)
+
+        # Markers: spawn point, then the respawn point of every checkpoint, their
+        # areas, the exit areas and the kill plane areas, all as (left, bottom,
+        # right, top) rows
+        info = loaded.info
+        self.spawn_x, self.spawn_y = info.spawn
+        self.respawn_points = np.array([info.spawn] + info.checkpoints, dtype=np.float64)
+        self.checkpoint_areas = np.array(info.checkpoint_grid.rects, dtype=np.float64).reshape(-1, 4)
+        self.exit_areas = None if info.exits is None else np.array(info.exits.rects, dtype=np.float64)
+        self.kill_areas = None if info.kill_planes is None else np.array(info.kill_planes.rects, dtype=np.float64)
+
+        # Simulation clock, the same for every bear
+        self.total_time = 0.0
+        self.steps = 0
+        # Bears pushed out of their cell while resolving, see resolve()
+        self.requeries = 0
+
+        self.reset()
+
+    def reset(self):
+        """Every bear on the spawn point, as Simulation.load_level leaves it."""
+        count = self.count
+        self.x = np.full(count, self.spawn_x, dtype=np.float64)
+        self.y = np.full(count, self.spawn_y, dtype=np.float64)
+        self.jump_start = self.y.copy()
+        self.fall_speed = np.zeros(count)
+        self.dash_end_time = np.zeros(count)
+        self.last_dash_time = np.full(count, -float(DASH_COOLDOWN))
+        self.dash_frame_timer = np.zeros(count)
+        self.jump_frame_timer = np.zeros(count)
+        self.last_button = np.zeros(count, dtype=np.int8)
+        self.dash_direction = np.zeros(count, dtype=np.int8)
+        self.animation = np.full(count, RIGHT_ANIMATION, dtype=np.int8)
+        self.frame = np.zeros(count, dtype=np.int8)
+        self.dash_frame_index = np.zeros(count, dtype=np.int8)
+        self.jump_frame_index = np.zeros(count, dtype=np.int8)
+        self.jumping = np.zeros(count, dtype=bool)
+        self.jump_press_time = np.full(count, NEVER)
+        self.floor_time = np.full(count, NEVER)
+        self.collide = np.zeros(count, dtype=bool)
+        self.collide_left = np.zeros(count, dtype=bool)
+        self.collide_right = np.zeros(count, dtype=bool)
+        self.collide_top = np.zeros(count, dtype=bool)
+        self.collide_coin = np.zeros(count, dtype=bool)
+        self.dashing = np.zeros(count, dtype=bool)
+        self.in_honey = np.zeros(count, dtype=bool)
+        self.finished = np.zeros(count, dtype=bool)
+        self.finish_time = np.full(count, np.nan)
+        self.score = np.zeros(count, dtype=np.int32)
+        self.respawns = np.zeros(count, dtype=np.int32)
+        # Coins each bear has not picked up yet, one more column for the table padding
+        self.coins_left = np.ones((count, len(self.collision.coins.rects) + 1), dtype=bool)
+        self.coins_left[:, -1] = False
+        # Checkpoints each bear has reached
+        self.reached = np.zeros((count, len(self.checkpoint_areas)), dtype=bool)
+
+    def set_texture(self, where, animation, frame):
+        self.animation[where] = animation
+        self.frame[where] = frame
+
+    def walk_frame(self, x):
+        # int() truncates like astype, and & 3 is % 4 for negative frames too
+        return ((x / PLAYER_SPRITE_IMAGE_CHANGE_SPEED).astype(np.int64) & 3).astype(np.int8)
+
+    def set_walk_texture(self, where):
+        """The walking texture of the last Left/Right button, as end_dash and player_movement set it."""
+        where = np.compress(self.last_button[where] != NO_BUTTON, where)
+        self.set_texture(where, WALK_ANIMATIONS[self.last_button[where]], self.walk_frame(self.x[where]))
+
+    def respawn(self, where):
+        """Move bears to the spawn point or to their reached checkpoint nearest to them."""
+        if self.reached.shape[1]:
+            points = self.respawn_points
+            distance = ((points[:, 0] - self.x[where, None]) ** 2 + (points[:, 1] - self.y[where, None]) ** 2)
+            distance[:, 1:][~self.reached[where]] = np.inf
+            nearest = points[np.argmin(distance, axis=1)]
+            self.x[where] = nearest[:, 0]
+            self.y[where] = nearest[:, 1]
+        else:
+            self.x[where] = self.spawn_x
+            self.y[where] = self.spawn_y
+        self.respawns[where] += 1
+
+    def reach_checkpoints(self):
+        for index, (left, bottom, right, top) in enumerate(self.checkpoint_areas):
+            self.reached[:, index] |= (left <= self.x) & (self.x <= right) & (bottom <= self.y) & (self.y <= top)
+
+    def in_areas(self, areas):
+        """Which bears stand in any of the (left, bottom, right, top) areas."""
+        found = np.zeros(self.count, dtype=bool)
+        for left, bottom, right, top in areas:
+            found |= (left <= self.x) & (self.x <= right) & (bottom <= self.y) & (self.y <= top)
+        return found
+
+    def at_exit(self):
+        if self.exit_areas is None:
+            return self.x >= self.end_of_map
+        return self.in_areas(self.exit_areas)
+
+    def killed(self):
+        if self.kill_areas is None:
+            return self.y < DEFAULT_KILL_Y
+        return self.in_areas(self.kill_areas)
+
+    def _tuning(self, value, where):
+        return value[where] if isinstance(value, np.ndarray) else value
+
+    def step(self, inputs):
+        """Advance every bear by one physics step of PHYSICS_STEP seconds."""
+        frozen = np.flatnonzero(self.finished)
+        saved = {name: getattr(self, name)[frozen].copy() for name in self.STATE} if frozen.size else None
+
+        self.apply_input(inputs)
+        self.player_movement(inputs)
+
+        self.collide &= ~self.jumping
+        self.calculate_collision(np.flatnonzero(~self.jumping))
+        self.reach_checkpoints()
+
+        self.total_time += PHYSICS_STEP
+        self.steps += 1
+
+        fallen = np.flatnonzero(self.killed())
+        if fallen.size:
+            self.respawn(fallen)
+
+        done = np.flatnonzero((self.at_exit() | self.in_honey) & ~self.finished)
+        if done.size:
+            self.finished[done] = True
+            self.finish_time[done] = self.total_time
+
+        if saved is not None:
+            for name, values in saved.items():
+                getattr(self, name)[frozen] = values
+
+    def apply_input(self, inputs):
+        pressed = np.flatnonzero(inputs.facing != NO_BUTTON)
+        self.last_button[pressed] = inputs.facing[pressed]
+
+        self.jump_press_time[np.flatnonzero(inputs.jump)] = self.total_time
+        self.floor_time[np.flatnonzero(self.collide)] = self.total_time
+        jumps = np.flatnonzero((self.total_time - self.jump_press_time <= self.jump_buffer_time + WINDOW_EPSILON)
+                               & (self.total_time - self.floor_time <= self.coyote_time + WINDOW_EPSILON))
+        if jumps.size:
+            self.jumping[jumps] = True
+            self.jump_start[jumps] = self.y[jumps]
+            self.fall_speed[jumps] = self._tuning(self.player_y_speed, jumps)
+            self.jump_press_time[jumps] = NEVER
+            self.floor_time[jumps] = NEVER
+
+        # Adding 0 leaves a position exactly as it is
+        self.y += inputs.down * 15.0
+
+        dashes = np.flatnonzero(inputs.dash)
+        if dashes.size:
+            self.start_dash(dashes)
+
+    def start_dash(self, where):
+        current_time = self.total_time
+        where = np.compress(current_time - self.last_dash_time[where] >= DASH_COOLDOWN, where)
+        self.dashing[where] = True
+        self.dash_end_time[where] = current_time + DASH_DURATION
+        self.last_dash_time[where] = current_time
+        self.dash_frame_index[where] = 0
+        self.dash_frame_timer[where] = current_time
+
+        buttons = self.last_button[where]
+        pressed = np.compress(buttons != NO_BUTTON, where)
+        self.dash_direction[pressed] = self.last_button[pressed]
+
+        directions = self.dash_direction[where]
+        self.set_texture(where[directions == LEFT_BUTTON], DASH_LEFT_ANIMATION, 0)
+        self.set_texture(where[directions == RIGHT_BUTTON], DASH_RIGHT_ANIMATION, 0)
+
+    def end_dash(self, where):
+        self.dashing[where] = False
+        self.set_walk_texture(where)
+
+    def player_movement(self, inputs):
+        current_time = self.total_time
+        dashing = np.flatnonzero(self.dashing)
+        normal = np.ones(self.count, dtype=bool)
+        if dashing.size:
+            over = current_time > self.dash_end_time[dashing]
+            self.end_dash(np.compress(over, dashing))
+            dashing = np.compress(~over, dashing)
+            normal[dashing] = False
+            self.dash(dashing)
+
+        collide = self.collide
+        x = self.x
+        y = self.y
+
+        # When player hits the collision. Masks multiply in as 0 or 1, which
+        # is exact and far cheaper than np.where or masked assignment
+        dy = ~collide * (self.player_y_speed + self.fall_speed)
+        self.fall_speed[np.flatnonzero(normal & collide)] = 0
+
+        # Bears with a last Left/Right button get a jump or walk texture below,
+        # so only the others keep the one moving sets
+        unset = self.last_button == NO_BUTTON
+        moving = normal & inputs.left & ~self.collide_left
+        x -= moving * self.player_x_speed
+        moving = np.flatnonzero(moving & unset)
+        self.set_texture(moving, LEFT_ANIMATION, self.walk_frame(x[moving]))
+
+        moving = normal & inputs.right & ~self.collide_right
+        x += moving * self.player_x_speed
+        moving = np.flatnonzero(moving & unset)
+        self.set_texture(moving, RIGHT_ANIMATION, self.walk_frame(x[moving]))
+
+        jumping = np.flatnonzero(normal & self.jumping)
+        standing = normal & ~self.jumping
+
+        if jumping.size:
+            buttons = self.last_button[jumping]
+            animated = np.compress(buttons != NO_BUTTON, jumping)
+            advance = np.compress(current_time - self.jump_frame_timer[animated] > JUMP_FRAME_DURATION, animated)
+            self.jump_frame_timer[advance] = current_time
+            self.jump_frame_index[advance] = (self.jump_frame_index[advance] + 1) % 3
+            self.set_texture(animated, JUMP_ANIMATIONS[self.last_button[animated]], self.jump_frame_index[animated])
+
+            jump_max_height = self._tuning(self.jump_max_height, jumping)
+            jump_y = y[jumping]
+            jump_start = self.jump_start[jumping]
+            distance_covered = jump_y - jump_start
+            distance_left = jump_max_height - distance_covered
+            jump_speed_ratio = np.maximum(distance_left / jump_max_height, 0.1)
+            adjusted_jump_speed = (self._tuning(self.player_y_speed, jumping) * jump_speed_ratio
+                                   * self._tuning(self.gravity, jumping))
+            jump_y += adjusted_jump_speed
+            jump_y += dy[jumping]
+            y[jumping] = jump_y
+            top = np.flatnonzero(jump_y >= jump_start + jump_max_height)
+            self.jumping[jumping[top]] = False
+            self.fall_speed[jumping[top]] = adjusted_jump_speed[top]
+
+        self.set_walk_texture(np.flatnonzero(standing))
+        y -= standing * dy
+
+        falling = np.flatnonzero(normal & ~collide & ~self.jumping)
+        if falling.size:
+            self.fall_speed[falling] = np.minimum(self.fall_speed[falling] + self._tuning(self.gravity, falling),
+                                                  self._tuning(self.max_fall_speed, falling))
+
+    def dash(self, where):
+        """One step of an ongoing dash."""
+        current_time = self.total_time
+        advance = where[current_time - self.dash_frame_timer[where] > DASH_FRAME_DURATION]
+        self.dash_frame_timer[advance] = current_time
+        self.dash_frame_index[advance] = (self.dash_frame_index[advance] + 1) % 4
+        directions = self.dash_direction[advance]
+        for direction, animation in ((LEFT_BUTTON, DASH_LEFT_ANIMATION), (RIGHT_BUTTON, DASH_RIGHT_ANIMATION)):
+            chosen = advance[directions == direction]
+            self.set_texture(chosen, animation, self.dash_frame_index[chosen])
+
+        directions = self.dash_direction[where]
+        left = where[directions == LEFT_BUTTON]
+        self.x[left] -= self._tuning(self.dash_speed, left)
+        blocked = left[self.collide_left[left]]
+        self.x[blocked] += self._tuning(self.dash_speed, blocked)
+        self.end_dash(blocked)
+
+        right = where[directions == RIGHT_BUTTON]
+        self.x[right] += self._tuning(self.dash_speed, right)
+        blocked = right[self.collide_right[right]]
+        self.x[blocked] -= self._tuning(self.dash_speed, blocked)
+        self.end_dash(blocked)
+
+    def calculate_collision(self, where):
+        self.collide_coin[where] = False
+        size = self.size_class[self.animation[where]]
+
+        x, y, flags = self.resolve(where, size)
+        self.x[where] = x
+        self.y[where] = y
+        self.collide[where] = (flags & FLOOR) != 0
+        self.collide_left[where] = (flags & LEFT) != 0
+        self.collide_right[where] = (flags & RIGHT) != 0
+        self.collide_top[where] = top = (flags & CEILING) != 0
+        self.jumping[where[top]] = False
+
+        # Entities are all touched where the collision put the bears, as LevelEntities does
+        cells = self.spikes.cells(x, y)
+        rows = self.spikes.rows(size, cells)
+        spiked = self.on_floor(self.spikes, rows, x, y)
+        self.pick_coins(where, rows, x, y)
+        self.in_honey[where] = self.contains_point(self.honey, cells, x, y)
+        if spiked.any():
+            self.collide[where[spiked]] = True
+            self.respawn(where[spiked])
+
+    def resolve(self, where, size):
+        """
+        CollisionGrid.resolve of the platforms for the bears in where.
+
+        Each pass goes through the candidates of every bear's cell in rounds.
+        Bears are sorted by candidate count so that each round is a slice of
+        them. A bear pushed more than the slack from where its pass started
+        starts another pass from its new cell, after the last tile it went
+        through, like the grid fetching again.
+        """
+        table = self.platforms
+        x = self.x[where]
+        y = self.y[where]
+        flags = np.zeros(len(where), dtype=np.int8)
+        done = None
+        bears = np.arange(len(where))
+        bear_x, bear_y, bear_size = x, y, size
+
+        while bears.size:
+            rows = table.rows(bear_size, table.cells(bear_x, bear_y))
+            counts = table.counts[rows]
+            # Bears with the most candidates last, so the ones left at every rank are a suffix
+            order = np.argsort(counts, kind="stable")
+            first_at = np.searchsorted(counts[order], np.arange(table.width), side="right")
+            bears = bears[order]
+            rows = rows[order]
+            if done is not None:
+                done = done[order]
+            start_x = x[bears]
+            start_y = y[bears]
+            xs = start_x.copy()
+            ys = start_y.copy()
+            found = np.zeros(len(bears), dtype=np.int8)
+            escaped = np.zeros(len(bears), dtype=bool)
+            last_tile = np.zeros(len(bears), dtype=np.int64)
+
+            for rank in range(table.width):
+                first = first_at[rank]
+                if first == len(bears):
+                    break
+                pairs = table.candidates[rank].take(rows[first:])
+                near = _near(table, pairs, xs[first:], ys[first:])
+                if done is not None:
+                    near &= table.tile[pairs] > done[first:]
+                hit = np.flatnonzero(near)
+                if not hit.size:
+                    continue
+                pairs = pairs[hit]
+                hit += first
+                left = table.left[pairs]
+                bottom = table.bottom[pairs]
+                right = table.right[pairs]
+                top = table.top[pairs]
+                fw = table.fifth_width[pairs]
+                qw = table.quarter_width[pairs]
+                hh = table.half_height[pairs]
+                qh = table.quarter_height[pairs]
+                xa = xs[hit]
+                ya = ys[hit]
+
+                # The tests of CollisionGrid.resolve, each side term worked out once
+                foot = ya - hh
+                floor = (xa + fw > left) & (xa - fw < right) & (bottom <= foot) & (foot <= top)
+                ya = np.where(floor, top + hh, ya)
+                upper = ya + qh
+                lower = ya - qh
+                back = xa - qw
+                hit_left = (upper >= bottom) & (lower <= top) & (left <= back) & (back <= right)
+                xa = np.where(hit_left, right + qw, xa)
+                front = xa + qw
+                hit_right = (upper > bottom) & (lower < top) & (left <= front) & (front <= right)
+                xa = np.where(hit_right, left - qw, xa)
+                head = ya + hh
+                ceiling = (xa + fw > left) & (xa - fw < right) & (bottom <= head) & (head <= top)
+                ya = np.where(ceiling, bottom - hh, ya)
+
+                xs[hit] = xa
+                ys[hit] = ya
+                found[hit] |= ((floor * FLOOR_FLAG) | (hit_left * LEFT_FLAG) | (hit_right * RIGHT_FLAG)
+                               | (ceiling * CEILING_FLAG))
+
+                # Candidates only hold within slack of the cell they were picked for
+                out = (np.abs(xa - start_x[hit]) > table.slack) | (np.abs(ya - start_y[hit]) > table.slack)
+                if out.any():
+                    gone = hit[out]
+                    escaped[gone] = True
+                    last_tile[gone] = table.tile[pairs[out]]
+                    # The rest of the pass only finds padding for them
+                    rows[gone] = table.empty_row
+
+            x[bears] = xs
+            y[bears] = ys
+            flags[bears] |= found
+            done = last_tile[escaped]
+            bears = bears[escaped]
+            bear_x, bear_y, bear_size = x[bears], y[bears], size[bears]
+            self.requeries += len(bears)
+        return x, y, flags
+
+    def on_floor(self, table, rows, x, y):
+        """CollisionGrid.on_floor for every bear, given their table rows."""
+        counts = table.counts[rows]
+        hit = np.zeros(len(x), dtype=bool)
+        active = np.flatnonzero(counts)
+        for rank in range(table.width):
+            if not active.size:
+                break
+            pairs = table.candidates[rank].take(rows[active])
+            xa = x[active]
+            fw = table.fifth_width[pairs]
+            foot = y[active] - table.half_height[pairs]
+            touching = ((xa + fw > table.left[pairs]) & (xa - fw < table.right[pairs])
+                        & (table.bottom[pairs] <= foot) & (foot <= table.top[pairs]))
+            hit[active[touching]] = True
+            active = active[~touching & (counts[active] > rank + 1)]
+        return hit
+
+    def contains_point(self, table, cells, x, y):
+        """CollisionGrid.contains_point for every bear, given their cells."""
+        rows = table.rows(0, cells)
+        counts = table.counts[rows]
+        hit = np.zeros(len(x), dtype=bool)
+        active = np.flatnonzero(counts)
+        for rank in range(table.width):
+            if not active.size:
+                break
+            pairs = table.candidates[rank].take(rows[active])
+            xa = x[active]
+            ya = y[active]
+            hit[active] |= ((table.left[pairs] <= xa) & (xa <= table.right[pairs])
+                            & (table.bottom[pairs] <= ya) & (ya <= table.top[pairs]))
+            active = active[counts[active] > rank + 1]
+        return hit
+
+    def pick_coins(self, where, rows, x, y):
+        """CollisionGrid.touching of the coins, with every bear picking from its own set."""
+        table = self.coins
+        counts = table.counts[rows]
+        active = np.flatnonzero(counts)
+        for rank in range(table.width):
+            if not active.size:
+                break
+            pairs = table.candidates[rank].take(rows[active])
+            near = _near(table, pairs, x[active], y[active])
+            if near.any():
+                hit = active[near]
+                pairs = pairs[near]
+                bears = where[hit]
+                tiles = table.tile[pairs]
+                flags = _side_flags(table, pairs, x[hit], y[hit]) * self.coins_left[bears, tiles]
+                picked = flags != 0
+                self.collide_coin[bears[picked]] = True
+                self.coins_left[bears[picked], tiles[picked]] = False
+                self.score[bears[picked]] += COIN_SCORE
+            active = active[counts[active] > rank + 1]
+
+
+def _near(table, pairs, x, y):
+    """Which players stand where any collision test against their candidate can pass."""
+    return ((x >= table.reach_left[pairs]) & (x <= table.reach_right[pairs])
+            & (y >= table.reach_bottom[pairs]) & (y <= table.reach_top[pairs]))
+
+
+def _side_flags(table, pairs, x, y):
+    """CollisionGrid.touching flags of players against one candidate each."""
+    left = table.left[pairs]
+    bottom = table.bottom[pairs]
+    right = table.right[pairs]
+    top = table.top[pairs]
+    fw = table.fifth_width[pairs]
+    qw = table.quarter_width[pairs]
+    hh = table.half_height[pairs]
+    qh = table.quarter_height[pairs]
+    return ((((x + fw > left) & (x - fw < right) & (bottom <= y - hh) & (y - hh <= top)) * FLOOR)
+            | (((y + qh >= bottom) & (y - qh <= top) & (left <= x - qw) & (x - qw <= right)) * LEFT)
+            | (((y + qh > bottom) & (y - qh < top) & (left <= x + qw) & (x + qw <= right)) * RIGHT)
+            | (((x + fw > left) & (x - fw < right) & (bottom <= y + hh) & (y + hh <= top)) * CEILING))
@@ -0,0 +1,67 @@
+"""
+Asset cache check: memory over repeated level loads.
+
+Calls MyGame.setup() many times, as restarts and level changes do, and
+reports the asset cache counters and Python heap size along the way. With
+the cache the heap and resident texture bytes stay flat after the first
+load; tests/test_assets.py fails if they do not.
+Needs an OpenGL context (a software GL such as Mesa llvmpipe is enough).
+
+    python benchmarks/bench_assets.py [loads]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assets import ASSETS  # noqa: E402
+
+LOADS = 100
+
+
+def heap_growth(window, loads, report=None):
+    """
+    Heap growth over loads setup() calls, after the first 10 of them.
+
+    report(load, heap), if given, is called every 10 loads.
+    """
+    gc.collect()
+    tracemalloc.start()
+    first = heap = None
+    for load in range(1, loads + 1):
+        window.setup()
+        # Free the GL objects arcade defers deleting to the next frame, as a frame would
+        window.ctx.gc()
+        if load % 10 == 0:
+            gc.collect()
+            heap = tracemalloc.get_traced_memory()[0]
+            if first is None:
+                first = heap
+            if report:
+                report(load, heap)
+    tracemalloc.stop()
+    return heap - first
+
+
+def main():
+    from main import MyGame
+
+    loads = int(sys.argv[1]) if len(sys.argv) > 1 else LOADS
+    window = MyGame()
+    window.set_visible(False)
+    window.setup()
+    window.ctx.gc()
+    resident = ASSETS.stats()["resident_bytes"]
+
+    growth = heap_growth(window, loads,
+                         lambda load, heap: print(f"setup #{load:<4} heap {heap / 1024:>9.0f} KiB  {ASSETS.stats()}"))
+    print(f"heap growth after the first 10 loads: {growth / 1024:.0f} KiB")
+    print(f"resident texture bytes: {resident} after the first load, {ASSETS.stats()['resident_bytes']} now")
+    window.preloader.shutdown()
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
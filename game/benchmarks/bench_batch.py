@@ -0,0 +1,128 @@
+"""
+Batch simulation benchmark: BatchSimulation vs one Simulation per bear.
+
+First plays both levels, and a generated level with checkpoints, with
+PARITY_BEARS bears pressing random keys, once through BatchSimulation and once
+through a Simulation per bear, and checks after every step that position,
+texture, jump, dash, collision and score agree until each bear leaves the
+level. Then times BatchSimulation steps for larger
+batches and reports agent-steps per millisecond.
+
+    python benchmarks/bench_batch.py [bears]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from batch import BatchInputs, BatchSimulation, ANIMATION_NAMES, BUTTON_CODES  # noqa: E402
+from mapgen import generate_level  # noqa: E402
+from simulation import Simulation, InputState, LoadedLevel, EVENT_LEVEL  # noqa: E402
+
+PARITY_BEARS = 200
+PARITY_STEPS = 1800
+TIMED_STEPS = 300
+BEARS = [1000, 10000, 100000]
+FACING_NAMES = {code: name for name, code in BUTTON_CODES.items()}
+
+#Chances of holding nothing, Left or Right; parity bears mostly head right so
+#that some of them finish the level
+DIRECTIONS = (1 / 3, 1 / 3, 1 / 3)
+PARITY_DIRECTIONS = (0.1, 0.2, 0.7)
+
+#Size of the generated parity level, in cells
+GENERATED_SIZE = (300, 44)
+
+
+def random_inputs(rng, count, previous=None, directions=DIRECTIONS):
+    """Keys for one step: held directions change now and then, presses are rare."""
+    inputs = BatchInputs(count)
+    change = rng.random(count) < 0.02
+    direction = rng.choice(3, count, p=directions)
+    if previous is None:
+        change[:] = True
+    else:
+        inputs.left[:] = previous.left
+        inputs.right[:] = previous.right
+    inputs.left[change] = direction[change] == 1
+    inputs.right[change] = direction[change] == 2
+    inputs.facing[change & (direction == 1)] = BUTTON_CODES["Left"]
+    inputs.facing[change & (direction == 2)] = BUTTON_CODES["Right"]
+    inputs.jump[:] = rng.random(count) < 0.05
+    inputs.dash[:] = rng.random(count) < 0.01
+    inputs.down[:] = rng.random(count) < 0.002
+    return inputs
+
+
+def input_state(inputs, i):
+    return InputState(bool(inputs.left[i]), bool(inputs.right[i]), bool(inputs.jump[i]), bool(inputs.down[i]),
+                      bool(inputs.dash[i]), FACING_NAMES[int(inputs.facing[i])])
+
+
+def check_parity(level, seed=1, level_data=None):
+    rng = np.random.default_rng(seed)
+    if level_data is None:
+        batch = BatchSimulation(PARITY_BEARS, level)
+        bears = [Simulation(level) for _ in range(PARITY_BEARS)]
+    else:
+        batch = BatchSimulation(PARITY_BEARS, level, loaded=LoadedLevel(level, level_data))
+        bears = [Simulation(level, level_loader=lambda number: LoadedLevel(number, level_data))
+                 for _ in range(PARITY_BEARS)]
+    playing = set(range(PARITY_BEARS))
+    inputs = None
+    for step in range(PARITY_STEPS):
+        inputs = random_inputs(rng, PARITY_BEARS, inputs, PARITY_DIRECTIONS)
+        batch.step(inputs)
+        for i in list(playing):
+            bear = bears[i]
+            events = bear.step(input_state(inputs, i))
+            if bear.finished or any(event == EVENT_LEVEL for event, value in events):
+                assert batch.finished[i], (level, step, i, "finished")
+                playing.discard(i)
+                continue
+            assert not batch.finished[i], (level, step, i, "finished early")
+            expected = (bear.player_x, bear.player_y, bear.texture, bear.score, bear.player_jump, bear.dashing,
+                        bear.collide, bear.collide_left, bear.collide_right)
+            actual = (batch.x[i], batch.y[i], (ANIMATION_NAMES[batch.animation[i]], batch.frame[i]),
+                      batch.score[i], batch.jumping[i], batch.dashing[i], batch.collide[i], batch.collide_left[i],
+                      batch.collide_right[i])
+            assert expected == actual, (level, step, i, expected, actual)
+    return PARITY_BEARS - len(playing), int(batch.respawns.sum()), int(batch.reached.sum()), batch.requeries
+
+
+def time_batch(level, count, seed=2):
+    rng = np.random.default_rng(seed)
+    batch = BatchSimulation(count, level)
+    inputs = None
+    scripts = []
+    for _ in range(TIMED_STEPS):
+        inputs = random_inputs(rng, count, inputs)
+        scripts.append(inputs)
+    start = time.perf_counter()
+    for inputs in scripts:
+        batch.step(inputs)
+    elapsed = time.perf_counter() - start
+    return count * TIMED_STEPS / (elapsed * 1000), batch.requeries / (count * TIMED_STEPS)
+
+
+def main():
+    bears = [int(sys.argv[1])] if len(sys.argv) > 1 else BEARS
+    parity_levels = [(f"map{level}", level, None) for level in (1, 2)]
+    parity_levels.append(("generated", 1, generate_level(*GENERATED_SIZE)))
+    for name, level, level_data in parity_levels:
+        finished, respawns, checkpoints, requeries = check_parity(level, level_data=level_data)
+        print(f"{name}: {PARITY_BEARS} bears x {PARITY_STEPS} steps match Simulation "
+              f"({finished} finished, {respawns} respawns, {checkpoints} checkpoints reached, "
+              f"{requeries} requeries)")
+    for level in (1, 2):
+        for count in bears:
+            rate, requery_share = time_batch(level, count)
+            print(f"map{level} {count:>7} bears  {rate:>9.0f} agent-steps/ms  "
+                  f"{requery_share * 100:.3f}% requeries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Culling benchmark: sprites submitted per frame vs sprites on screen.
+
+Sweeps the CameraController across each level, along the floor and back
+along the top, and counts every frame:
+
+    scene.draw   every sprite of every layer, what on_draw used to submit
+    culled       baked chunks plus live sprites picked by CulledLayers
+    on screen    tile sprites that overlap the visible rectangle
+
+and times the world draw both ways.
+
+    python benchmarks/bench_camera.py [frames]
+"""
+import os
+import sys
+import time
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GAME_DIR)
+
+from main import MyGame  # noqa: E402
+from simulation import NUMBER_OF_LEVELS  # noqa: E402
+
+FRAMES = 300
+
+
+def sweep(map_width, map_height, frames):
+    """Points for the camera to follow: right along the bottom, then back along the top."""
+    half = frames // 2
+    for frame in range(frames):
+        if frame < half:
+            yield map_width * frame / half, 0
+        else:
+            yield map_width * (frames - frame) / half, map_height
+
+
+def sprite_boxes(scene):
+    return [(sprite.left, sprite.bottom, sprite.right, sprite.top)
+            for sprite_list in scene.sprite_lists if sprite_list.visible for sprite in sprite_list]
+
+
+def on_screen(boxes, rect):
+    left, bottom, right, top = rect
+    return sum(1 for box in boxes if box[0] < right and box[2] > left and box[1] < top and box[3] > bottom)
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES
+    window = MyGame()
+    window.set_visible(False)
+    window.setup()
+    controller = window.camera_controller
+
+    for level in range(1, NUMBER_OF_LEVELS + 1):
+        window.simulation.load_level(level)
+        window.load_scene()
+        window.prepared.finish()
+        scene = window.scene
+        baked = window.baked_layers
+        culled = window.culled_layers
+        boxes = sprite_boxes(scene)
+        all_sprites = sum(len(sprite_list) for sprite_list in scene.sprite_lists)
+        path = list(sweep(window.simulation.map_width, window.simulation.map_height, frames))
+
+        counts = {"scene.draw": 0, "culled": 0, "on screen": 0}
+        times = {"scene.draw": 0.0, "culled": 0.0}
+        for x, y in path:
+            window.camera.move_to(controller.follow(x, y))
+            window.clear()
+            window.camera.use()
+            window.ctx.finish()
+
+            start = time.perf_counter()
+            scene.draw()
+            window.ctx.finish()
+            times["scene.draw"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            window.draw_world()
+            window.ctx.finish()
+            times["culled"] += time.perf_counter() - start
+
+            counts["scene.draw"] += all_sprites
+            counts["culled"] += len(baked.visible) + len(culled)
+            counts["on screen"] += on_screen(boxes, controller.visible_rect)
+
+        print(f"map{level}: sprites submitted per frame, mean of {frames} frames")
+        for name, count in counts.items():
+            timing = f"  world draw {times[name] / frames * 1000:6.2f} ms" if name in times else ""
+            print(f"  {name:<10} {count / frames:8.1f}{timing}")
+
+    window.preloader.shutdown()
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Collision benchmark: full layer scan vs CollisionGrid.
+
+Runs the per-frame platform, spike and coin checks the way MyGame used to
+(every tile, every frame) and through the collision grid, on both shipped maps
+and on larger synthetic maps. tests/test_collision.py checks that both give
+the same positions and flags, using the scans below.
+
+    python benchmarks/bench_collision.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collision import CollisionGrid, FLOOR, LEFT, RIGHT, CEILING  # noqa: E402
+from level_data import LevelData, Tileset, load_level_data  # noqa: E402
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#Player box sizes for the walk, dash and jump/fall textures at CHARACTER_SCALING
+PLAYER_SIZES = [(112, 132), (168, 128), (256, 144)]
+PROBES = 1000
+
+
+class Block:
+    """Stand-in for a tile sprite with the attributes the old scan reads."""
+    def __init__(self, center_x, center_y, width, height):
+        self.center_x = center_x
+        self.center_y = center_y
+        self.width = width
+        self.height = height
+
+
+def scan_platforms(blocks, x, y, width, height):
+    """The platform loop of the old MyGame.calculate_collision."""
+    flags = 0
+    for block in blocks:
+        if (x + width / 5 > block.center_x - block.width / 2
+                and x - width / 5 < block.center_x + block.width / 2
+                and y - height / 2 <= block.center_y + block.height / 2
+                and y - height / 2 >= block.center_y - block.height / 2):
+            y = block.center_y + block.height / 2 + height / 2
+            flags |= FLOOR
+        if (y + height / 4 >= block.center_y - block.height / 2
+                and y - height / 4 <= block.center_y + block.height / 2
+                and x - width / 4 <= block.center_x + block.width / 2
+                and x - width / 4 >= block.center_x - block.width / 2):
+            x = block.center_x + block.width / 2 + width / 4
+            flags |= LEFT
+        if (y + height / 4 > block.center_y - block.height / 2
+                and y - height / 4 < block.center_y + block.height / 2
+                and x + width / 4 >= block.center_x - block.width / 2
+                and x + width / 4 <= block.center_x + block.width / 2):
+            x = block.center_x - block.width / 2 - width / 4
+            flags |= RIGHT
+        if (x + width / 5 > block.center_x - block.width / 2
+                and x - width / 5 < block.center_x + block.width / 2
+                and y + height / 2 >= block.center_y - block.height / 2
+                and y + height / 2 <= block.center_y + block.height / 2):
+            y = block.center_y - block.height / 2 - height / 2
+            flags |= CEILING
+    return x, y, flags
+
+
+def scan_on_floor(blocks, x, y, width, height):
+    """The spike loop of the old MyGame.calculate_collision."""
+    hit = False
+    for block in blocks:
+        if (x + width / 5 > block.center_x - block.width / 2
+                and x - width / 5 < block.center_x + block.width / 2
+                and y - height / 2 <= block.center_y + block.height / 2
+                and y - height / 2 >= block.center_y - block.height / 2):
+            hit = True
+    return hit
+
+
+def synthetic_level(width, height, seed=0):
+    """Random ledges, spikes and coins on a width x height map."""
+    rng = random.Random(seed)
+    platforms = [0] * (width * height)
+    spikes = [0] * (width * height)
+    coins = [0] * (width * height)
+    for row in range(height - 1, 0, -6):
+        column = 0
+        while column < width:
+            length = rng.randint(4, 16)
+            for i in range(column, min(column + length, width), 2):
+                platforms[row * width + i] = 100
+                if rng.random() < 0.05:
+                    spikes[(row - 2) * width + i] = 140
+                elif rng.random() < 0.02:
+                    coins[(row - 2) * width + i] = 342
+            column += length + rng.randint(2, 10)
+    layers = {"platforms01": platforms, "spikes": spikes, "coins": coins}
+    return LevelData(width, height, 32, 32, layers, [Tileset(1, 64, 64)])
+
+
+def probes(level, seed=1):
+    """Player boxes near the platforms, where the tests actually fire."""
+    rng = random.Random(seed)
+    blocks = list(level.blocks("platforms01"))
+    result = []
+    for _ in range(PROBES):
+        center_x, center_y, block_width, block_height = rng.choice(blocks)
+        width, height = rng.choice(PLAYER_SIZES)
+        result.append((center_x + rng.uniform(-width, width),
+                       center_y + rng.uniform(-height, height),
+                       width, height))
+    return result
+
+
+def time_level(name, level):
+    platform_blocks = [Block(*block) for block in level.blocks("platforms01")]
+    spike_blocks = [Block(*block) for block in level.blocks("spikes")]
+    platforms = CollisionGrid.from_layer(level, "platforms01")
+    spikes = CollisionGrid.from_layer(level, "spikes")
+    cases = probes(level)
+
+    start = time.perf_counter()
+    for x, y, width, height in cases:
+        scan_platforms(platform_blocks, x, y, width, height)
+        scan_on_floor(spike_blocks, x, y, width, height)
+    scan_time = (time.perf_counter() - start) / len(cases)
+
+    start = time.perf_counter()
+    for x, y, width, height in cases:
+        platforms.resolve(x, y, width, height)
+        spikes.on_floor(x, y, width, height)
+    grid_time = (time.perf_counter() - start) / len(cases)
+
+    print(f"{name:<18}{len(platform_blocks):>8}{scan_time * 1e6:>12.1f}{grid_time * 1e6:>12.1f}"
+          f"{scan_time / grid_time:>9.1f}x")
+
+
+def main():
+    print(f"{'map':<18}{'tiles':>8}{'scan us':>12}{'grid us':>12}{'speedup':>10}")
+    for level_number in (1, 2):
+        level = load_level_data(os.path.join(GAME_DIR, f"map/map{level_number}.json"))
+        time_level(f"map{level_number}", level)
+    for width, height in ((400, 44), (2000, 200)):
+        time_level(f"synthetic {width}x{height}", synthetic_level(width, height))
+
+
+if __name__ == "__main__":
+    main()
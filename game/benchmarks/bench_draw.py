@@ -0,0 +1,75 @@
+"""
+Draw benchmark: every tile sprite vs baked static layers.
+
+Pans the camera across each level and times the world draw both ways, CPU
+time with perf_counter and GPU time with an OpenGL timer query. Runs on a
+software GL too, e.g. LIBGL_ALWAYS_SOFTWARE=1 with Mesa llvmpipe.
+
+    python benchmarks/bench_draw.py [frames]
+"""
+import os
+import sys
+import time
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GAME_DIR)
+
+from main import MyGame  # noqa: E402
+from simulation import NUMBER_OF_LEVELS  # noqa: E402
+
+FRAMES = 300
+
+
+def time_frames(window, frames, draw):
+    """Mean CPU and GPU milliseconds per frame of draw()."""
+    query = window.ctx.query()
+    cpu = 0.0
+    gpu = 0.0
+    map_width = window.simulation.map_width - window.width
+    for frame in range(frames):
+        window.camera.move_to((map_width * frame / frames, 0))
+        window.clear()
+        window.camera.use()
+        start = time.perf_counter()
+        with query:
+            draw()
+        window.ctx.finish()
+        cpu += time.perf_counter() - start
+        gpu += query.time_elapsed / 1e9
+    return cpu / frames * 1000, gpu / frames * 1000
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES
+    window = MyGame()
+    window.set_visible(False)
+    window.setup()
+
+    for level in range(1, NUMBER_OF_LEVELS + 1):
+        window.simulation.load_level(level)
+        window.load_scene()
+        window.prepared.finish()
+        sprites = sum(len(sprite_list) for sprite_list in window.scene.sprite_lists)
+        baked = window.baked_layers
+
+        def draw_all():
+            window.scene.draw()
+
+        def draw_baked():
+            baked.update_visible(window.camera.position[0], window.camera.position[1],
+                                 window.camera.viewport_width, window.camera.viewport_height)
+            baked.draw()
+            window.scene.draw(names=baked.live_layer_names)
+
+        live = sum(len(window.scene[name]) for name in baked.live_layer_names)
+        before = time_frames(window, frames, draw_all)
+        after = time_frames(window, frames, draw_baked)
+        print(f"map{level}: {sprites} sprites -> {len(baked.chunks)} chunks + {live} live sprites")
+        print(f"  scene.draw   cpu {before[0]:6.2f} ms  gpu {before[1]:6.2f} ms")
+        print(f"  baked layers cpu {after[0]:6.2f} ms  gpu {after[1]:6.2f} ms")
+
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
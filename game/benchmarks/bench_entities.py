@@ -0,0 +1,118 @@
+"""
+Entity benchmark: coins collected on levels with thousands of them.
+
+Fills a synthetic level with rows of coins and spikes under them and walks a
+player box along every row, one physics step at a time, through
+LevelEntities. Checks that every coin is picked up exactly once and scores
+one point, then times the steps. The time per step should not grow with the
+number of coins.
+
+Then times taking picked up coins off the screen the way the game does, one
+coin a frame with the list drawn in between: removing the sprite from its
+SpriteList, as MyGame does, against hiding it and drawing it anyway.
+
+    python benchmarks/bench_entities.py [coins ...]
+"""
+import os
+import sys
+import time
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GAME_DIR)
+
+import arcade  # noqa: E402
+
+from collision import CollisionGrid  # noqa: E402
+from entities import LevelEntities, PICKUP, HAZARD  # noqa: E402
+
+COINS = (100, 1000, 10000)
+
+#Frames, each picking up one coin, timed per list size
+PICKUP_FRAMES = 100
+
+#Coins per row, the distance between two of them and the player box
+ROW = 100
+COIN_SIZE = 32
+COIN_SPACING = 64
+PLAYER_WIDTH = 112
+PLAYER_HEIGHT = 132
+PLAYER_X_SPEED = 5
+
+
+class SyntheticLevel:
+    """Coin and spike grids, the layers of a LevelCollision that LevelEntities reads."""
+    def __init__(self, coins):
+        self.coin_rows = (coins + ROW - 1) // ROW
+        coin_blocks = [(COIN_SPACING * (i % ROW + 1), COIN_SPACING * 4 * (i // ROW + 1), COIN_SIZE, COIN_SIZE)
+                       for i in range(coins)]
+        # A spike row under every coin row, out of reach of the player's feet
+        spike_blocks = [(COIN_SPACING * (i + 1), COIN_SPACING * 4 * (row + 1) - 3 * COIN_SPACING, 64, 64)
+                        for row in range(self.coin_rows) for i in range(ROW)]
+        self.layers = {"coins": CollisionGrid(coin_blocks, COIN_SIZE, COIN_SIZE),
+                       "spikes": CollisionGrid(spike_blocks, 64, 64)}
+
+
+def walk_rows(entities, level):
+    """Walk the player along every coin row. Returns (steps, score, pickups, hazards)."""
+    steps = score = pickups = hazards = 0
+    for row in range(level.coin_rows):
+        y = COIN_SPACING * 4 * (row + 1)
+        for x in range(0, COIN_SPACING * (ROW + 2), PLAYER_X_SPEED):
+            for layer, index in entities.touching(x, y, PLAYER_WIDTH, PLAYER_HEIGHT):
+                if layer.kind == PICKUP:
+                    entities.remove(layer, index)
+                    score += layer.value
+                    pickups += 1
+                elif layer.kind == HAZARD:
+                    hazards += 1
+            entities.flush()
+            steps += 1
+    return steps, score, pickups, hazards
+
+
+def time_sprite_removal(window, coins, remove):
+    """Milliseconds per frame of taking one coin off and drawing the list, up to PICKUP_FRAMES coins."""
+    sprite_list = arcade.SpriteList()
+    sprites = [arcade.SpriteSolidColor(COIN_SIZE, COIN_SIZE, arcade.color.GOLD) for _ in range(coins)]
+    for i, sprite in enumerate(sprites):
+        sprite.center_x = i
+        sprite_list.append(sprite)
+    sprite_list.draw()
+    window.ctx.finish()
+    frames = min(coins, PICKUP_FRAMES)
+    start = time.perf_counter()
+    for sprite in sprites[:frames]:
+        remove(sprite)
+        sprite_list.draw()
+        # Wait for the GPU like a buffer swap would
+        window.ctx.finish()
+    return (time.perf_counter() - start) * 1000 / frames
+
+
+def hide(sprite):
+    sprite.visible = False
+
+
+def main():
+    counts = [int(count) for count in sys.argv[1:]] or COINS
+    for coins in counts:
+        level = SyntheticLevel(coins)
+        entities = LevelEntities(level)
+        start = time.perf_counter()
+        steps, score, pickups, hazards = walk_rows(entities, level)
+        elapsed = time.perf_counter() - start
+        assert pickups == coins and score == coins, (coins, pickups, score)
+        assert hazards == 0 and len(level.layers["coins"]) == 0, (coins, hazards)
+        print(f"{coins:>6} coins  {steps:>7} steps  {elapsed / steps * 1e6:6.2f} us/step  every coin scored once")
+
+    window = arcade.Window(320, 240, "bench_entities", visible=False)
+    for coins in counts:
+        removed = time_sprite_removal(window, coins, arcade.Sprite.remove_from_sprite_lists)
+        hidden = time_sprite_removal(window, coins, hide)
+        print(f"{coins:>6} coin sprites  one pickup a frame: remove_from_sprite_lists {removed:7.3f} ms/frame  "
+              f"hide {hidden:7.3f} ms/frame")
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
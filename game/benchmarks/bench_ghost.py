@@ -0,0 +1,117 @@
+"""
+Ghost benchmark: size of a recorded run, accuracy and playback cost.
+
+Records the scripted runs of bench_simulation as ghosts, saves and loads
+them and checks that every sample plays back within half a quantum of
+where the player really was, respawns included. Then plays each ghost back
+at frame times that fall between samples, as MyGame does, and reports the
+time per frame and the memory each frame leaves allocated, which should be
+none.
+
+    python benchmarks/bench_ghost.py [steps]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from animation import PlayerAnimator  # noqa: E402
+from bench_simulation import SCRIPTS  # noqa: E402
+from ghost import Ghost, GhostPlayer, GhostRecorder, POSITION_SCALE  # noqa: E402
+from simulation import Simulation, InputState, PLAYER_ANIMATIONS  # noqa: E402
+
+STEPS = 7200
+
+#Frames drawn per physics step during playback, like a 144 Hz display at 60 steps a second
+FRAMES_PER_STEP = 2.4
+
+
+def off_the_left_edge(frame):
+    """Falls off the map again and again, a keyframe every respawn."""
+    return InputState(left=True, facing="Left" if frame == 0 else None, jump=frame % 45 == 0)
+
+
+def record(level, script, steps):
+    """Record a run as MyGame does. Returns the ghost and the player's position at every sample."""
+    simulation = Simulation(level)
+    animator = PlayerAnimator({name: len(frames) for name, frames in PLAYER_ANIMATIONS.items()})
+    animator.update(simulation)
+    recorder = GhostRecorder(simulation, animator.texture)
+    positions = [(simulation.player_x, simulation.player_y)]
+    for frame in range(steps):
+        simulation.step(script(frame))
+        animator.update(simulation)
+        recorder.record(simulation, animator.texture)
+        if recorder.steps % recorder.ghost.interval == 0 and simulation.level == level:
+            positions.append((simulation.player_x, simulation.player_y))
+        if simulation.finished or simulation.level != level:
+            break
+    return recorder.finish(), positions
+
+
+def worst_error(player, positions):
+    worst = 0.0
+    for sample, (x, y) in enumerate(positions):
+        player.update(sample * player.sample_time)
+        worst = max(worst, abs(player.x - x), abs(player.y - y))
+    return worst
+
+
+def update_frames(player, frames, frame_time):
+    for frame in range(frames):
+        player.update(frame * frame_time)
+
+
+def retained_bytes(player, frames, frame_time):
+    player.update(0.0)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    update_frames(player, frames, frame_time)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return retained
+
+
+def play_back(player, frames):
+    """
+    Time per frame of updating the ghost, and the bytes every frame leaves
+    allocated: what a long playback keeps beyond a short one, per extra frame.
+    """
+    frame_time = player.sample_time / player.ghost.interval / FRAMES_PER_STEP
+    growth = retained_bytes(player, frames, frame_time) - retained_bytes(player, frames // 10, frame_time)
+    start = time.perf_counter()
+    update_frames(player, frames, frame_time)
+    elapsed = time.perf_counter() - start
+    return elapsed / frames * 1e6, growth / (frames - frames // 10)
+
+
+def main():
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else STEPS
+    path = os.path.join(tempfile.mkdtemp(), "bench.ghost")
+    for level in (1, 2):
+        for script in SCRIPTS + [off_the_left_edge]:
+            ghost, positions = record(level, script, steps)
+            ghost.save(path)
+            size = os.path.getsize(path)
+            assert size == ghost.size, (size, ghost.size)
+            loaded = Ghost.load(path)
+            assert loaded.time == ghost.time and len(loaded) == len(ghost) == len(positions)
+
+            player = GhostPlayer(loaded)
+            error = worst_error(player, positions)
+            assert error <= 0.5 / POSITION_SCALE + 1e-3, (level, script.__name__, error)
+
+            frames = int(len(ghost) * ghost.interval * FRAMES_PER_STEP)
+            per_frame, retained = play_back(player, frames)
+            per_minute = size / ghost.time * 60 / 1024
+            print(f"map{level} {script.__name__:<18}{ghost.time:>7.1f} s {len(ghost):>6} samples "
+                  f"{len(ghost.key_samples):>3} keyframes {size / 1024:>6.1f} KiB ({per_minute:.1f} KiB/min)  "
+                  f"error {error:.3f} px  playback {per_frame:.2f} us/frame, {retained:.2f} B/frame retained")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+HUD benchmark: per-frame arcade.draw_text vs the cached Hud.
+
+Runs the game clock forward one physics step per frame, with the score going
+up now and then, and times formatting plus drawing the time and score both
+ways. Also checks that Hud shows the same text the old code formatted.
+
+    python benchmarks/bench_hud.py [frames]
+"""
+import math
+import os
+import sys
+import time
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GAME_DIR)
+
+import arcade  # noqa: E402
+
+from hud import Hud, format_time  # noqa: E402
+from physics import PHYSICS_STEP  # noqa: E402
+
+FRAMES = 3000
+
+#Frames between two coins
+SCORE_EVERY = 90
+
+
+def game_clock(frames):
+    """(total_time, score) of every frame."""
+    total_time = 0.0
+    for frame in range(frames):
+        total_time += PHYSICS_STEP
+        yield total_time, frame // SCORE_EVERY
+
+
+def draw_text_hud(total_time, score):
+    """What on_update and on_draw used to do."""
+    ms, sec = math.modf(total_time)
+    minutes = int(sec) // 60
+    seconds = int(sec) % 60
+    msec = int(ms * 100)
+    total_time_print = f"{minutes:02d}:{seconds:02d}:{msec:02d}"
+    arcade.draw_text(str(f"Время : {total_time_print}"), 10, 10, arcade.csscolor.WHITE, 18)
+    arcade.draw_text(f"Счёт: {score}", 10, 50, arcade.csscolor.WHITE, 18)
+    return total_time_print
+
+
+def time_frames(window, frames, draw):
+    times = []
+    for total_time, score in game_clock(frames):
+        window.clear()
+        # Don't count the clear, which is most of a software GL frame
+        window.ctx.finish()
+        start = time.perf_counter()
+        draw(total_time, score)
+        window.ctx.finish()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return sum(times) / len(times), times[int(len(times) * 0.99)], times[-1]
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES
+    window = arcade.Window(1600, 960, "bench_hud", visible=False)
+    hud = Hud()
+
+    for total_time, score in game_clock(frames):
+        hud.update(total_time, score)
+        assert hud.time_text == format_time(total_time), (total_time, hud.time_text)
+        assert hud.score_text.text == f"Счёт: {score}"
+    layouts = hud.layouts / frames
+
+    def cached_hud(total_time, score):
+        hud.update(total_time, score)
+        hud.draw()
+
+    hud = Hud()
+    for name, draw in (("draw_text", draw_text_hud), ("Hud", cached_hud)):
+        mean, p99, worst = time_frames(window, frames, draw)
+        print(f"{name:<10} mean {mean:6.3f} ms  p99 {p99:6.3f} ms  max {worst:6.3f} ms")
+    print(f"Hud sets {layouts:.2f} label texts per frame")
+
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
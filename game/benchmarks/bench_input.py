@@ -0,0 +1,143 @@
+"""
+Input benchmark: jump forgiveness and input latency under load.
+
+First plays a jump pressed a few steps too early before landing, and a few
+steps too late after running off a ledge, with and without the jump
+buffer and coyote time, and shows which presses jump;
+tests/test_controls.py checks the same cases.
+
+Then runs MyGame headless, pressing a key of every action in turn, with
+frames that take longer and longer (extra work slept in every frame), and
+prints the LatencyMeter results: milliseconds from key press to the drawn
+frame that shows it, per action.
+
+    python benchmarks/bench_input.py [frames]
+"""
+import os
+import sys
+import time
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GAME_DIR)
+
+from controls import LatencyMeter, ACTIONS, ACTION_LEFT, ACTION_RIGHT  # noqa: E402
+from simulation import Simulation, InputState, EVENT_JUMP  # noqa: E402
+
+FRAMES = 240
+
+#Frames played before measuring, while the level's sprites are first drawn
+#and the next level is prepared in the background
+WARM_UP_FRAMES = 60
+
+#Steps too early or too late a jump is pressed
+OFFSETS = range(1, 10)
+
+#Extra work in every frame, in milliseconds
+LOADS = (0, 20, 50)
+
+#Frames between two key presses
+PRESS_INTERVAL = 12
+
+
+def steps_until(simulation, script, condition, limit=600):
+    """Step with script(step) until condition(simulation). Returns the number of steps."""
+    for step in range(limit):
+        if condition(simulation):
+            return step
+        simulation.step(script(step))
+    raise RuntimeError("condition never met")
+
+
+def jumps(simulation, script, steps=30):
+    return any(event == EVENT_JUMP for step in range(steps) for event, _ in simulation.step(script(step)))
+
+
+def early_jump(offset, **forgiveness):
+    """Jump from the floor and press jump again offset steps before landing from it."""
+    def idle(step):
+        return InputState()
+
+    def jump_from_floor(simulation):
+        steps_until(simulation, idle, lambda sim: sim.collide)
+        simulation.step(InputState(jump=True))
+
+    # The spawn point is only a few steps above the floor, so a whole jump gives the room to press early
+    probe = Simulation(**forgiveness)
+    jump_from_floor(probe)
+    landing = steps_until(probe, idle, lambda sim: sim.collide)
+
+    simulation = Simulation(**forgiveness)
+    jump_from_floor(simulation)
+    for step in range(landing - offset):
+        simulation.step(InputState())
+    return jumps(simulation, lambda step: InputState(jump=step == 0))
+
+
+def late_jump(offset, **forgiveness):
+    """Run right off the first ledge, pressing jump offset steps after the floor ends."""
+    def run(step):
+        return InputState(right=True, facing="Right" if step == 0 else None)
+
+    simulation = Simulation(**forgiveness)
+    steps_until(simulation, run, lambda sim: sim.collide)
+    steps_until(simulation, run, lambda sim: not sim.collide)
+    for step in range(offset - 1):
+        simulation.step(run(step + 1))
+    return jumps(simulation, lambda step: InputState(right=True, jump=step == 0))
+
+
+def forgiveness_table():
+    rows = (("pressed early, no buffer", early_jump, {"jump_buffer_time": 0, "coyote_time": 0}),
+            ("pressed early, buffered", early_jump, {"coyote_time": 0}),
+            ("pressed late, no coyote time", late_jump, {"jump_buffer_time": 0, "coyote_time": 0}),
+            ("pressed late, coyote time", late_jump, {"jump_buffer_time": 0}))
+    print("steps off".ljust(30) + "".join(f"{offset:>4}" for offset in OFFSETS))
+    for name, play, forgiveness in rows:
+        print(name.ljust(30) + "".join("   x" if play(offset, **forgiveness) else "   ." for offset in OFFSETS))
+
+
+def measure_latency(window, frames, load):
+    """Play frames frames taking load ms of extra work each, pressing a key every PRESS_INTERVAL frames."""
+    window.latency_meter = LatencyMeter()
+    queue = window.input_queue
+    last = time.perf_counter()
+    for frame in range(frames):
+        if frame % PRESS_INTERVAL == 0:
+            action = ACTIONS[frame // PRESS_INTERVAL % len(ACTIONS)]
+            queue.press(action)
+            if action in (ACTION_LEFT, ACTION_RIGHT):
+                queue.release(action)
+        time.sleep(load / 1000)
+        now = time.perf_counter()
+        window.on_update(now - last)
+        last = now
+        window.on_draw()
+        # Wait for the GPU like a buffer swap would, or software GL queues frames up and stalls for seconds
+        window.ctx.finish()
+    return window.latency_meter
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES
+    forgiveness_table()
+
+    from main import MyGame
+
+    window = MyGame()
+    window.set_visible(False)
+    window.setup()
+    frame = 0
+    while frame < WARM_UP_FRAMES or window.preloader.pending and not window.preloader.ready(2):
+        window.on_update(1 / 60)
+        window.on_draw()
+        window.ctx.finish()
+        frame += 1
+    for load in LOADS:
+        print(f"{load} ms extra work per frame")
+        measure_latency(window, frames, load).report()
+    window.preloader.shutdown()
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
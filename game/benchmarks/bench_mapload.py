@@ -0,0 +1,92 @@
+"""
+Map loading benchmark: Tiled JSON vs compiled binary maps.
+
+Compiles each shipped map into a temporary directory, checks that both files
+give the same layers and collision grids, then times parsing the map and
+building its LevelCollision each way (best of RUNS) and the memory allocated
+while doing it.
+
+    python benchmarks/bench_mapload.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collision import LevelCollision  # noqa: E402
+from level_data import load_level_data  # noqa: E402
+from mapbin import compile_map, load_map_binary  # noqa: E402
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 20
+
+
+def load_json(path):
+    return LevelCollision(load_level_data(path), 1)
+
+
+def load_binary(path):
+    return LevelCollision(load_map_binary(path), 1)
+
+
+def best_time(load, path):
+    best = float("inf")
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        load(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def allocated(load, path):
+    tracemalloc.start()
+    load(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def check(json_path, binary_path):
+    json_level = load_level_data(json_path)
+    binary_level = load_map_binary(binary_path)
+    for name, data in json_level.layers.items():
+        assert list(binary_level.layers[name]) == list(data), name
+    json_collision = load_json(json_path)
+    binary_collision = load_binary(binary_path)
+    for name in ("platforms", "spikes", "coins", "honey"):
+        json_grid = getattr(json_collision, name)
+        binary_grid = getattr(binary_collision, name)
+        assert json_grid.rects == binary_grid.rects and json_grid.cells == binary_grid.cells, name
+
+
+def main():
+    work_dir = tempfile.mkdtemp()
+    try:
+        print(f"{'map':<8}{'json KB':>9}{'bin KB':>9}{'json ms':>10}{'bin ms':>10}{'speedup':>10}"
+              f"{'json alloc KB':>15}{'bin alloc KB':>14}")
+        for level_number in (1, 2):
+            name = f"map{level_number}"
+            json_path = os.path.join(GAME_DIR, f"map/{name}.json")
+            binary_path = compile_map(json_path, os.path.join(work_dir, f"{name}.bin"))
+            # Tileset images are stored relative to the map
+            for file_name in os.listdir(os.path.join(GAME_DIR, "map")):
+                if not file_name.endswith(".json"):
+                    shutil.copy(os.path.join(GAME_DIR, "map", file_name), work_dir)
+            check(json_path, binary_path)
+
+            json_time = best_time(load_json, json_path)
+            binary_time = best_time(load_binary, binary_path)
+            print(f"{name:<8}{os.path.getsize(json_path) / 1024:>9.0f}{os.path.getsize(binary_path) / 1024:>9.0f}"
+                  f"{json_time * 1000:>10.2f}{binary_time * 1000:>10.2f}{json_time / binary_time:>9.1f}x"
+                  f"{allocated(load_json, json_path) / 1024:>15.0f}"
+                  f"{allocated(load_binary, binary_path) / 1024:>14.0f}")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Profiler overhead benchmark.
+
+Plays the same scripted run headless three times: never profiled, with a
+Profiler timing the parts of every step, and after that Profiler has been
+removed again. The first and last should be equally fast; the middle one
+shows what profiling costs while it is on.
+
+    python benchmarks/bench_profiler.py [steps]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_simulation import run_and_jump  # noqa: E402
+from profiler import Profiler, profile_simulation  # noqa: E402
+from simulation import Simulation  # noqa: E402
+
+STEPS = 20000
+ROUNDS = 5
+
+
+def steps_per_second(simulation, inputs, profiler=None):
+    start = time.perf_counter()
+    for frame in inputs:
+        simulation.step(frame)
+        if profiler:
+            profiler.frame()
+    return len(inputs) / (time.perf_counter() - start)
+
+
+def main():
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else STEPS
+    inputs = [run_and_jump(frame) for frame in range(steps)]
+    for level in (1, 2):
+        results = {"off": [], "on": [], "removed": []}
+        for _ in range(ROUNDS):
+            results["off"].append(steps_per_second(Simulation(level), inputs))
+
+            simulation = Simulation(level)
+            profiler = Profiler()
+            profile_simulation(profiler, simulation)
+            results["on"].append(steps_per_second(simulation, inputs, profiler))
+
+            profiler.remove()
+            simulation = Simulation(level)
+            results["removed"].append(steps_per_second(simulation, inputs))
+        print(f"map{level}  " + "  ".join(f"{name} {max(rates):>8.0f} steps/s" for name, rates in results.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Replay benchmark: recording size, fast-forward speed and seek time.
+
+Records the scripted runs of bench_simulation, saves and loads them, plays
+each one back headless to check it ends where the recording did, then seeks
+to random frames with and without snapshots.
+
+    python benchmarks/bench_replay.py [frames]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_simulation import SCRIPTS  # noqa: E402
+from replay import Replay, ReplayPlayer, ReplayRecorder  # noqa: E402
+from simulation import Simulation  # noqa: E402
+
+FRAMES = 20000
+SEEKS = 20
+
+
+def record(level, script, frames):
+    simulation = Simulation(level)
+    recorder = ReplayRecorder(simulation)
+    for frame in range(frames):
+        inputs = script(frame)
+        recorder.record(inputs)
+        simulation.step(inputs)
+        if simulation.finished:
+            break
+    return recorder.finish()
+
+
+def mean_seek_ms(replay, targets, snapshots=True):
+    if not snapshots:
+        replay.snapshots = replay.snapshots[:1]
+    total = 0.0
+    for frame in targets:
+        player = ReplayPlayer(replay)
+        start = time.perf_counter()
+        player.seek(frame)
+        total += time.perf_counter() - start
+    return total / len(targets) * 1000
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES
+    rng = random.Random(1)
+    path = os.path.join(tempfile.mkdtemp(), "bench.replay")
+    for level in (1, 2):
+        for script in SCRIPTS:
+            record(level, script, frames).save(path)
+            size = os.path.getsize(path)
+            replay = Replay.load(path)
+
+            player = ReplayPlayer(replay)
+            start = time.perf_counter()
+            differences = player.verify()
+            elapsed = time.perf_counter() - start
+            assert not differences, (level, script.__name__, differences)
+
+            targets = [rng.randrange(replay.frames) for _ in range(SEEKS)]
+            with_snapshots = mean_seek_ms(replay, targets)
+            without = mean_seek_ms(replay, targets, snapshots=False)
+            print(f"map{level} {script.__name__:<14}{replay.frames:>7} frames {len(replay.delta_keys):>6} changes "
+                  f"{size / 1024:>6.1f} KiB  replay {replay.frames / elapsed:>7.0f} frames/s  "
+                  f"seek {with_snapshots:>6.1f} ms (from frame 0: {without:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
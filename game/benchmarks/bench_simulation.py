@@ -0,0 +1,103 @@
+"""
+Headless simulation benchmark.
+
+Plays scripted input sequences on both shipped maps without a window and
+reports steps per second, time spent in each part of a step and memory
+allocated per step.
+
+    python benchmarks/bench_simulation.py [steps]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation import Simulation, InputState  # noqa: E402
+
+STEPS = 20000
+
+#Subsystems timed separately, in the order Simulation.step calls them
+PHASES = ["apply_input", "player_movement", "calculate_collision"]
+
+
+def idle(frame):
+    return InputState()
+
+
+def run_right(frame):
+    return InputState(right=True, facing="Right" if frame == 0 else None)
+
+
+def run_and_jump(frame):
+    return InputState(right=True, facing="Right" if frame == 0 else None, jump=frame % 45 == 0)
+
+
+def dash_spam(frame):
+    return InputState(right=frame % 240 < 200, left=frame % 240 >= 200,
+                      facing="Left" if frame % 240 == 200 else "Right" if frame % 240 == 0 else None,
+                      jump=frame % 30 == 0, dash=frame % 20 == 0)
+
+
+SCRIPTS = [idle, run_right, run_and_jump, dash_spam]
+
+
+class PhaseTimer:
+    """Wraps the simulation's methods to add up the time spent in each."""
+    def __init__(self, simulation):
+        self.totals = {name: 0.0 for name in PHASES}
+        for name in PHASES:
+            setattr(simulation, name, self.wrap(name, getattr(simulation, name)))
+
+    def wrap(self, name, method):
+        totals = self.totals
+        clock = time.perf_counter
+
+        def timed(*args):
+            start = clock()
+            result = method(*args)
+            totals[name] += clock() - start
+            return result
+        return timed
+
+
+def run(level, script, steps):
+    inputs = [script(frame) for frame in range(steps)]
+
+    simulation = Simulation(level)
+    start = time.perf_counter()
+    for frame in inputs:
+        simulation.step(frame)
+    elapsed = time.perf_counter() - start
+
+    simulation = Simulation(level)
+    timer = PhaseTimer(simulation)
+    for frame in inputs:
+        simulation.step(frame)
+
+    simulation = Simulation(level)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for frame in inputs[:2000]:
+        simulation.step(frame)
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename") if stat.size_diff > 0)
+
+    phases = "  ".join(f"{name} {timer.totals[name] / steps * 1e6:.1f}us" for name in PHASES)
+    print(f"map{level} {script.__name__:<14}{steps / elapsed:>10.0f} steps/s  {phases}"
+          f"  {allocated / 2000:.0f} B/step retained, {peak / 1024:.0f} KiB peak"
+          f"  (x={simulation.player_x:.0f} score={simulation.score} level={simulation.level})")
+
+
+def main():
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else STEPS
+    for level in (1, 2):
+        for script in SCRIPTS:
+            run(level, script, steps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Startup benchmark: time from launch to the first playable frame.
+
+Starts python play.py --profile-startup runs times, each in a fresh
+process and from another working directory, reads the phases it prints and
+stops it once the first level has been drawn. Prints the median end time of
+every phase and the wall time from launch to the interactive line.
+
+    python benchmarks/bench_startup.py [runs] [map]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GAME_DIR)
+
+from startup import IMPORTS, WINDOW, FIRST_FRAME, LEVEL_BUILT, SCENE, INTERACTIVE  # noqa: E402
+
+RUNS = 7
+
+#Longest a start may take, in seconds
+TIMEOUT = 60
+
+PHASES = (IMPORTS, WINDOW, FIRST_FRAME, LEVEL_BUILT, SCENE, INTERACTIVE)
+
+
+def start(map_name=None):
+    """Launch the game once. Returns {phase: ms} as it reported them, and the wall time in ms."""
+    command = [sys.executable, os.path.join(GAME_DIR, "play.py"), "--profile-startup"]
+    if map_name:
+        command += ["--map", map_name]
+    launched = time.perf_counter()
+    game = subprocess.Popen(command, cwd=os.path.dirname(GAME_DIR), stdout=subprocess.PIPE, text=True)
+    phases = {}
+    try:
+        for line in game.stdout:
+            for phase in PHASES:
+                if line.startswith(phase + " "):
+                    phases[phase] = float(line[len(phase):].split()[0])
+            if INTERACTIVE in phases:
+                wall = (time.perf_counter() - launched) * 1000
+                break
+            if time.perf_counter() - launched > TIMEOUT:
+                raise RuntimeError("the game did not get to its first frame")
+        else:
+            raise RuntimeError(f"the game exited with {game.wait()} before its first frame")
+    finally:
+        game.terminate()
+        game.wait()
+    return phases, wall
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else RUNS
+    map_name = sys.argv[2] if len(sys.argv) > 2 else None
+    results = [start(map_name) for _ in range(runs)]
+    for phase in PHASES:
+        ends = [phases[phase] for phases, _ in results if phase in phases]
+        if ends:
+            print(f"{phase:<12} median {statistics.median(ends):7.1f} ms  "
+                  f"min {min(ends):7.1f} ms  max {max(ends):7.1f} ms")
+    walls = [wall for _, wall in results]
+    print(f"{'launch to interactive':<21} median {statistics.median(walls):7.1f} ms  "
+          f"min {min(walls):7.1f} ms  max {max(walls):7.1f} ms  ({runs} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Streaming map benchmark: frame time and memory against map size.
+
+Generates synthetic maps from the size of map1 up to 2000x200 cells and pans
+a 1600x960 camera along each one with a StreamingMap, timing update_visible()
+plus draw() every frame. A second, traced pass measures the Python memory the
+streamed sprites hold. Frame time, resident sprites and memory should stay
+flat while the number of tiles in the map grows.
+
+    python benchmarks/bench_streaming.py [frames]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GAME_DIR)
+
+import arcade  # noqa: E402
+
+from mapgen import generate_level  # noqa: E402
+from streaming import StreamingMap  # noqa: E402
+
+WIDTH = 1600
+HEIGHT = 960
+FRAMES = 600
+SIZES = [(80, 44), (500, 100), (1000, 200), (2000, 200)]
+
+
+def camera_path(level, frames):
+    """Camera positions sweeping right across the map while bobbing up and down."""
+    max_x = level.pixel_width - WIDTH
+    max_y = max(0, level.pixel_height - HEIGHT)
+    for frame in range(frames):
+        progress = frame / frames
+        yield max_x * progress, max_y * abs((progress * 4) % 2 - 1)
+
+
+def pan(window, camera, streaming_map, level, frames):
+    """Per-frame milliseconds and the most sprites resident at once."""
+    times = []
+    resident = 0
+    for left, bottom in camera_path(level, frames):
+        camera.move_to((left, bottom))
+        window.clear()
+        camera.use()
+        start = time.perf_counter()
+        streaming_map.update_visible(left, bottom, WIDTH, HEIGHT)
+        streaming_map.draw()
+        window.ctx.finish()
+        times.append((time.perf_counter() - start) * 1000)
+        resident = max(resident, streaming_map.resident_sprites)
+    return times, resident
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES
+    window = arcade.Window(WIDTH, HEIGHT, "bench_streaming", visible=False)
+    camera = arcade.Camera(WIDTH, HEIGHT)
+
+    print(f"{'map':<10}{'tiles':>10}{'resident':>10}{'loads':>7}{'evicted':>8}"
+          f"{'mean ms':>9}{'p95 ms':>8}{'max ms':>8}{'memory KiB':>12}")
+    for width, height in SIZES:
+        level = generate_level(width, height)
+        tiles = sum(1 for data in level.layers.values() for gid in data if gid)
+
+        streaming_map = StreamingMap(level)
+        times, resident = pan(window, camera, streaming_map, level, frames)
+        times.sort()
+
+        tracemalloc.start()
+        traced_map = StreamingMap(level)
+        pan(window, camera, traced_map, level, frames // 4)
+        # Evicted chunks are sprite <-> sprite list cycles; count only what is still live
+        gc.collect()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del traced_map
+
+        print(f"{width}x{height:<6}{tiles:>10}{resident:>10}{streaming_map.loads:>7}{streaming_map.evictions:>8}"
+              f"{sum(times) / len(times):>9.2f}{times[int(len(times) * 0.95)]:>8.2f}{times[-1]:>8.2f}"
+              f"{memory / 1024:>12.0f}")
+
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Camera control and viewport culling.
+
+CameraController follows the player inside the level: the level bounds are
+set once per level, the player may move inside a deadzone around the centre
+of the screen without the camera following, and smoothing closes a share of
+the remaining distance every physics step. MyGame moves it once per drawn
+frame, to where the player is drawn, by the steps the frame moved on. Its
+`position` and `visible_rect` are the world rectangle the screen shows;
+`moved` says whether it changed in the last update, so the arcade camera is
+only moved when there is somewhere new to go.
+
+CulledLayers draws the sprite lists that stay live (coins) through that
+rectangle: their sprites are sorted once into CULL_CHUNK_SIZE chunks, and
+only the sprites of the chunks on screen go into the list that is drawn,
+rebuilt when the camera crosses a chunk border.
+"""
+import arcade
+
+#Share of the distance to its target the camera covers every physics step;
+#1 follows the player exactly
+CAMERA_SMOOTHING = 1.0
+
+#Half width and half height of the box around the screen centre in which the
+#player moves without the camera following
+CAMERA_DEADZONE = (0, 0)
+
+#Side of the chunks CulledLayers sorts sprites into
+CULL_CHUNK_SIZE = 256
+
+
+class CameraController:
+    """
+    Bottom left corner of a viewport that follows a point inside the level.
+    """
+    def __init__(self, viewport_width, viewport_height, smoothing=CAMERA_SMOOTHING, deadzone=CAMERA_DEADZONE):
+        self.viewport_width = viewport_width
+        self.viewport_height = viewport_height
+        self.smoothing = smoothing
+        self.deadzone_x, self.deadzone_y = deadzone
+
+        # Largest left and bottom that keep the viewport inside the level
+        self.max_left = 0
+        self.max_bottom = 0
+
+        self.left = 0.0
+        self.bottom = 0.0
+        self.moved = True
+
+    def set_bounds(self, map_width, map_height):
+        """Keep the viewport inside a level of this size from now on."""
+        self.max_left = max(0, map_width - self.viewport_width)
+        self.max_bottom = max(0, map_height - self.viewport_height)
+
+    def target(self, x, y):
+        """Where the camera should be to show (x, y), allowing for the deadzone."""
+        center_x = self.left + self.viewport_width / 2
+        center_y = self.bottom + self.viewport_height / 2
+        if x > center_x + self.deadzone_x:
+            center_x = x - self.deadzone_x
+        elif x < center_x - self.deadzone_x:
+            center_x = x + self.deadzone_x
+        if y > center_y + self.deadzone_y:
+            center_y = y - self.deadzone_y
+        elif y < center_y - self.deadzone_y:
+            center_y = y + self.deadzone_y
+        left = min(max(center_x - self.viewport_width / 2, 0), self.max_left)
+        bottom = min(max(center_y - self.viewport_height / 2, 0), self.max_bottom)
+        return left, bottom
+
+    def follow(self, x, y, steps=1.0):
+        """
+        Move towards (x, y) as far as smoothing goes in steps physics steps,
+        which need not be whole. Returns the new position.
+        """
+        left, bottom = self.target(x, y)
+        if self.smoothing < 1:
+            share = 1 - (1 - self.smoothing) ** steps
+            left = self.left + (left - self.left) * share
+            bottom = self.bottom + (bottom - self.bottom) * share
+        self.moved = left != self.left or bottom != self.bottom
+        self.left = left
+        self.bottom = bottom
+        return left, bottom
+
+    def snap(self, x, y):
+        """Centre on (x, y) at once, e.g. when a level starts."""
+        self.left = min(max(x - self.viewport_width / 2, 0), self.max_left)
+        self.bottom = min(max(y - self.viewport_height / 2, 0), self.max_bottom)
+        self.moved = True
+        return self.left, self.bottom
+
+    @property
+    def position(self):
+        return self.left, self.bottom
+
+    @property
+    def visible_rect(self):
+        """(left, bottom, right, top) of the world on screen."""
+        return self.left, self.bottom, self.left + self.viewport_width, self.bottom + self.viewport_height
+
+
+class CulledLayers:
+    """
+    Sprite lists of a scene, drawn only where a camera rectangle shows them.
+
+    Sprites are put in the chunk that holds their centre; a chunk is drawn
+    when its area, grown by the largest sprite, overlaps the rectangle.
+    """
+    def __init__(self, scene, names, chunk_width=CULL_CHUNK_SIZE, chunk_height=CULL_CHUNK_SIZE):
+        self.names = [name for name in names if name in scene.name_mapping]
+        self.chunk_width = chunk_width
+        self.chunk_height = chunk_height
+
+        # name -> (column, row) -> sprites, in list order
+        self.chunks = {}
+        margin_x = margin_y = 0
+        for name in self.names:
+            chunks = self.chunks[name] = {}
+            for sprite in scene[name]:
+                key = int(sprite.center_x // chunk_width), int(sprite.center_y // chunk_height)
+                chunks.setdefault(key, []).append(sprite)
+                margin_x = max(margin_x, sprite.width / 2)
+                margin_y = max(margin_y, sprite.height / 2)
+        self.margin_x = margin_x
+        self.margin_y = margin_y
+
+        self.visible = {name: arcade.SpriteList(visible=scene[name].visible) for name in self.names}
+        self.visible_keys = None
+
+    def update_visible(self, left, bottom, width, height):
+        """Pick the sprites of the chunks that overlap a camera rectangle."""
+        first_column = int((left - self.margin_x) // self.chunk_width)
+        last_column = int((left + width + self.margin_x) // self.chunk_width)
+        first_row = int((bottom - self.margin_y) // self.chunk_height)
+        last_row = int((bottom + height + self.margin_y) // self.chunk_height)
+        keys = (first_column, last_column, first_row, last_row)
+        if keys == self.visible_keys:
+            return
+        self.visible_keys = keys
+
+        for name in self.names:
+            chunks = self.chunks[name]
+            visible = self.visible[name]
+            while len(visible):
+                visible.pop()
+            for row in range(first_row, last_row + 1):
+                for column in range(first_column, last_column + 1):
+                    for sprite in chunks.get((column, row), ()):
+                        visible.append(sprite)
+
+    def remove(self, name, sprite):
+        """Take a sprite off its layer for good, e.g. a coin picked up."""
+        if name in self.chunks:
+            key = int(sprite.center_x // self.chunk_width), int(sprite.center_y // self.chunk_height)
+            self.chunks[name][key].remove(sprite)
+        sprite.remove_from_sprite_lists()
+
+    def __len__(self):
+        """Sprites picked for drawing."""
+        return sum(len(visible) for visible in self.visible.values())
+
+    def draw(self):
+        for name in self.names:
+            self.visible[name].draw()
@@ -0,0 +1,273 @@
+"""
+Grid-indexed tile collision.
+
+Every tile of a layer is registered once, at load time, in the grid cell that
+holds its bottom left corner. A query only looks at the few cells under the
+player box instead of walking the whole layer, so the cost per frame does not
+depend on the size of the map.
+
+The tests themselves are the same bounding-box checks MyGame has always used,
+run against the same tiles in the same order, so the resolved positions and
+collide flags match the old full scan.
+"""
+import copy
+
+#Layers the game collides with
+COLLISION_LAYERS = ("platforms01", "spikes", "coins", "honey")
+
+#Flags returned by CollisionGrid.resolve and CollisionGrid.touching
+FLOOR = 1
+LEFT = 2
+RIGHT = 4
+CEILING = 8
+
+
+class CollisionGrid:
+    """
+    Uniform grid over the tiles of one layer.
+    """
+    def __init__(self, blocks, cell_width=64, cell_height=64):
+        # (left, bottom, right, top) of every tile, in layer order
+        self.rects = []
+        self.alive = bytearray()
+        self.max_width = 0
+        self.max_height = 0
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+
+        # (column, row) -> ascending tile indices
+        self.cells = {}
+
+        for center_x, center_y, width, height in blocks:
+            self.add(center_x, center_y, width, height)
+
+        # How far a push-out may move the player before the tiles fetched
+        # for the starting position stop covering it
+        self.margin = max(self.cell_width, self.cell_height)
+
+    @classmethod
+    def from_layer(cls, level, name, scaling=1):
+        """Build the grid of a LevelData layer, or reuse the one compiled into the map."""
+        packed = level.collision_grids.get(name) if scaling == 1 else None
+        if packed is not None:
+            return cls.from_packed(*packed)
+        blocks = list(level.blocks(name, scaling))
+        cell_width = max([block[2] for block in blocks], default=level.tile_width * scaling)
+        cell_height = max([block[3] for block in blocks], default=level.tile_height * scaling)
+        return cls(blocks, cell_width, cell_height)
+
+    @classmethod
+    def from_packed(cls, cell_width, cell_height, rects, cells, indices):
+        """
+        Rebuild a grid saved by pack().
+
+        rects holds left, bottom, right, top of every tile; cells holds
+        column, row, start, count of every cell, pointing into indices.
+        """
+        grid = cls([], cell_width, cell_height)
+        grid.rects = [tuple(rects[i:i + 4]) for i in range(0, len(rects), 4)]
+        grid.alive = bytearray(b"\1") * len(grid.rects)
+        grid.max_width = max((right - left for left, bottom, right, top in grid.rects), default=0)
+        grid.max_height = max((top - bottom for left, bottom, right, top in grid.rects), default=0)
+        for i in range(0, len(cells), 4):
+            column, row, start, count = cells[i:i + 4]
+            grid.cells[column, row] = list(indices[start:start + count])
+        return grid
+
+    def pack(self):
+        """Flat (cell_width, cell_height, rects, cells, indices) for from_packed()."""
+        rects = [value for rect in self.rects for value in rect]
+        cells = []
+        indices = []
+        for (column, row), bucket in sorted(self.cells.items()):
+            cells.extend((column, row, len(indices), len(bucket)))
+            indices.extend(bucket)
+        return self.cell_width, self.cell_height, rects, cells, indices
+
+    def __len__(self):
+        return sum(self.alive)
+
+    def copy(self):
+        """A grid over the same tiles, whose removals leave this one alone."""
+        grid = CollisionGrid([], self.cell_width, self.cell_height)
+        grid.rects = self.rects
+        grid.alive = bytearray(self.alive)
+        grid.max_width = self.max_width
+        grid.max_height = self.max_height
+        grid.cells = {key: list(bucket) for key, bucket in self.cells.items()}
+        return grid
+
+    def add(self, center_x, center_y, width, height):
+        left = center_x - width / 2
+        bottom = center_y - height / 2
+        index = len(self.rects)
+        self.rects.append((left, bottom, center_x + width / 2, center_y + height / 2))
+        self.alive.append(1)
+        self.max_width = max(self.max_width, width)
+        self.max_height = max(self.max_height, height)
+        key = int(left // self.cell_width), int(bottom // self.cell_height)
+        self.cells.setdefault(key, []).append(index)
+        return index
+
+    def remove(self, index):
+        """Take a tile out of the grid, e.g. a collected coin."""
+        self.remove_many([index])
+
+    def remove_many(self, indices):
+        """Take several tiles out of the grid at once, filtering every cell they were in once."""
+        alive = self.alive
+        keys = set()
+        for index in indices:
+            if alive[index]:
+                alive[index] = 0
+                left, bottom = self.rects[index][:2]
+                keys.add((int(left // self.cell_width), int(bottom // self.cell_height)))
+        for key in keys:
+            self.cells[key] = [index for index in self.cells[key] if alive[index]]
+
+    def query(self, left, bottom, right, top):
+        """Indices, in layer order, of the tiles that may overlap a box."""
+        cells = self.cells
+        first_column = int((left - self.max_width) // self.cell_width)
+        last_column = int(right // self.cell_width)
+        first_row = int((bottom - self.max_height) // self.cell_height)
+        last_row = int(top // self.cell_height)
+
+        found = []
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                bucket = cells.get((column, row))
+                if bucket:
+                    found.extend(bucket)
+        found.sort()
+        return found
+
+    def resolve(self, x, y, width, height):
+        """
+        Push a player box out of the tiles.
+
+        Returns the new (x, y) and the FLOOR/LEFT/RIGHT/CEILING flags of the
+        sides that touched a tile.
+        """
+        fifth_width = width / 5
+        quarter_width = width / 4
+        half_height = height / 2
+        quarter_height = height / 4
+        margin = self.margin
+        rects = self.rects
+        flags = 0
+        done = -1
+
+        while True:
+            start_x = x
+            start_y = y
+            for index in self.query(x - quarter_width - margin, y - half_height - margin,
+                                    x + quarter_width + margin, y + half_height + margin):
+                if index <= done:
+                    continue
+                left, bottom, right, top = rects[index]
+                if (x + fifth_width > left and x - fifth_width < right
+                        and bottom <= y - half_height <= top):
+                    y = top + half_height
+                    flags |= FLOOR
+                if (y + quarter_height >= bottom and y - quarter_height <= top
+                        and left <= x - quarter_width <= right):
+                    x = right + quarter_width
+                    flags |= LEFT
+                if (y + quarter_height > bottom and y - quarter_height < top
+                        and left <= x + quarter_width <= right):
+                    x = left - quarter_width
+                    flags |= RIGHT
+                if (x + fifth_width > left and x - fifth_width < right
+                        and bottom <= y + half_height <= top):
+                    y = bottom - half_height
+                    flags |= CEILING
+
+                if abs(x - start_x) > margin or abs(y - start_y) > margin:
+                    # Pushed out of the fetched area: fetch again around the
+                    # new position and carry on after this tile
+                    done = index
+                    break
+            else:
+                return x, y, flags
+
+    def touching(self, x, y, width, height):
+        """
+        List of (index, flags) for every tile the player box touches.
+
+        Uses the same four side tests as resolve, without pushing the player.
+        """
+        fifth_width = width / 5
+        quarter_width = width / 4
+        half_height = height / 2
+        quarter_height = height / 4
+        rects = self.rects
+
+        hits = []
+        for index in self.query(x - quarter_width, y - half_height, x + quarter_width, y + half_height):
+            left, bottom, right, top = rects[index]
+            flags = 0
+            if (x + fifth_width > left and x - fifth_width < right
+                    and bottom <= y - half_height <= top):
+                flags |= FLOOR
+            if (y + quarter_height >= bottom and y - quarter_height <= top
+                    and left <= x - quarter_width <= right):
+                flags |= LEFT
+            if (y + quarter_height > bottom and y - quarter_height < top
+                    and left <= x + quarter_width <= right):
+                flags |= RIGHT
+            if (x + fifth_width > left and x - fifth_width < right
+                    and bottom <= y + half_height <= top):
+                flags |= CEILING
+            if flags:
+                hits.append((index, flags))
+        return hits
+
+    def under_feet(self, x, y, width, height):
+        """Indices of the tiles the bottom of the player box stands on (spikes)."""
+        fifth_width = width / 5
+        foot = y - height / 2
+        rects = self.rects
+        hits = []
+        for index in self.query(x - fifth_width, foot, x + fifth_width, foot):
+            left, bottom, right, top = rects[index]
+            if x + fifth_width > left and x - fifth_width < right and bottom <= foot <= top:
+                hits.append(index)
+        return hits
+
+    def on_floor(self, x, y, width, height):
+        return bool(self.under_feet(x, y, width, height))
+
+    def under_point(self, x, y):
+        """Indices of the tiles a point lies inside (honey)."""
+        rects = self.rects
+        hits = []
+        for index in self.query(x, y, x, y):
+            left, bottom, right, top = rects[index]
+            if left <= x <= right and bottom <= y <= top:
+                hits.append(index)
+        return hits
+
+    def contains_point(self, x, y):
+        return bool(self.under_point(x, y))
+
+
+class LevelCollision:
+    """
+    Collision grids of the gameplay layers of a map.
+    """
+    def __init__(self, level, scaling=1):
+        self.platforms = CollisionGrid.from_layer(level, "platforms01", scaling)
+        self.spikes = CollisionGrid.from_layer(level, "spikes", scaling)
+        self.coins = CollisionGrid.from_layer(level, "coins", scaling)
+        self.honey = CollisionGrid.from_layer(level, "honey", scaling)
+
+        # Tiled layer name -> grid
+        self.layers = dict(zip(COLLISION_LAYERS, (self.platforms, self.spikes, self.coins, self.honey)))
+
+    def copy(self):
+        """The same grids, but coins of its own to pick up."""
+        collision = copy.copy(self)
+        collision.coins = self.coins.copy()
+        collision.layers = dict(self.layers, coins=collision.coins)
+        return collision
@@ -0,0 +1,121 @@
+"""
+Keyboard input pipeline.
+
+Key presses and releases don't touch the game: MyGame turns each key into
+an action, timestamps it and queues it in an InputQueue, and the next
+physics step takes everything queued as its InputState. A key pressed and
+released between two steps still counts for that step, and whether a jump
+pressed a little early or late happens is the simulation's jump buffer and
+coyote time, the same at any frame rate.
+
+LatencyMeter measures, per action, the time from the key press to the end
+of drawing the first frame that shows its effect: the step that moved the
+bear for left, right and down, the step that started the jump or the dash
+for jump and dash (a buffered jump counts from its press to the landing
+that starts it). The clock starts when the game gets the key event, so the
+time the event spent in the OS queue is not in it.
+"""
+import time
+from collections import deque
+
+from simulation import InputState, EVENT_JUMP, EVENT_DASH
+
+#Actions keys are bound to
+ACTION_LEFT = "left"
+ACTION_RIGHT = "right"
+ACTION_JUMP = "jump"
+ACTION_DOWN = "down"
+ACTION_DASH = "dash"
+ACTIONS = (ACTION_LEFT, ACTION_RIGHT, ACTION_JUMP, ACTION_DOWN, ACTION_DASH)
+
+#Held actions, and the facing their press sets
+HELD_ACTIONS = {ACTION_LEFT: "Left", ACTION_RIGHT: "Right"}
+
+#Actions that show once the simulation reports their event; the rest act in the step that takes them
+ACTION_EVENTS = {EVENT_JUMP: ACTION_JUMP, EVENT_DASH: ACTION_DASH}
+
+
+class InputQueue:
+    """
+    Timestamped key events waiting for the next physics step.
+
+    After state(), applied holds (action, press time) of the presses it took.
+    """
+    def __init__(self):
+        self.events = deque()
+        self.held = {action: False for action in HELD_ACTIONS}
+        self.applied = []
+
+    def press(self, action, when=None):
+        self.events.append((time.perf_counter() if when is None else when, action, True))
+
+    def release(self, action, when=None):
+        self.events.append((time.perf_counter() if when is None else when, action, False))
+
+    def state(self):
+        """The InputState of the next physics step, taking every queued event."""
+        held = self.held
+        inputs = InputState(held[ACTION_LEFT], held[ACTION_RIGHT])
+        self.applied.clear()
+        events = self.events
+        while events:
+            when, action, pressed = events.popleft()
+            if action in held:
+                held[action] = pressed
+            if pressed:
+                # A held key counts for the step even if it is let go before it runs
+                setattr(inputs, action, True)
+                if action in HELD_ACTIONS:
+                    inputs.facing = HELD_ACTIONS[action]
+                self.applied.append((action, when))
+        return inputs
+
+
+class LatencyMeter:
+    """
+    Milliseconds from key press to the first drawn frame showing the action.
+
+    Call stepped() after every physics step and frame_drawn() when a frame
+    has been drawn.
+    """
+    def __init__(self):
+        # Action -> press time of its latest press that has not taken effect
+        self.waiting = {}
+        # (action, press time) of presses that took effect since the last frame
+        self.shown = []
+        self.samples = {action: [] for action in ACTIONS}
+
+    def stepped(self, applied, events):
+        """A physics step took the presses applied and reported events."""
+        for action, when in applied:
+            if action == ACTION_JUMP or action == ACTION_DASH:
+                self.waiting[action] = when
+            else:
+                self.shown.append((action, when))
+        for event, _ in events:
+            action = ACTION_EVENTS.get(event)
+            if action in self.waiting:
+                self.shown.append((action, self.waiting.pop(action)))
+
+    def frame_drawn(self, now=None):
+        if not self.shown:
+            return
+        now = time.perf_counter() if now is None else now
+        for action, when in self.shown:
+            self.samples[action].append((now - when) * 1000)
+        self.shown.clear()
+
+    def summary(self):
+        """{action: (count, mean, 95th percentile, worst)} in milliseconds, for actions measured."""
+        results = {}
+        for action, samples in self.samples.items():
+            if samples:
+                ordered = sorted(samples)
+                percentile = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+                results[action] = len(ordered), sum(ordered) / len(ordered), percentile, ordered[-1]
+        return results
+
+    def report(self):
+        for action, (count, mean, percentile, worst) in self.summary().items():
+            print(f"{action:<6} {count:>5} presses  input latency mean {mean:6.1f} ms  "
+                  f"p95 {percentile:6.1f} ms  worst {worst:6.1f} ms")
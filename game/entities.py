@@ -0,0 +1,85 @@
+"""
+Pickups, hazards and exits.
+
+The tiles the player touches rather than stands on are entities. ENTITY_LAYERS
+says, per Tiled layer, what kind of entity its tiles are and how the player is
+tested against them. LevelEntities holds those layers over the level's
+collision grids, whose compact alive flags tell which entities are left.
+
+Once per physics step touching() tests the player box against every layer in
+one pass, at one position, and returns the hits; the simulation turns them
+into events. Pickups it collects are only marked with remove() and leave their
+grid together in flush(), once the step is over, so a pickup touched by
+several sides of the box is still a single hit and scores once.
+"""
+
+#Kinds of entity
+PICKUP = "pickup"
+HAZARD = "hazard"
+EXIT = "exit"
+
+#Tests of the player box against a tile: any of its four sides as
+#CollisionGrid.touching, its feet as under_feet, its centre as under_point
+TOUCH_SIDES = "sides"
+TOUCH_FEET = "feet"
+TOUCH_CENTER = "center"
+
+#Tiled layer -> (kind, test, score of a pickup)
+ENTITY_LAYERS = {
+    "spikes": (HAZARD, TOUCH_FEET, 0),
+    "coins": (PICKUP, TOUCH_SIDES, 1),
+    "honey": (EXIT, TOUCH_CENTER, 0),
+}
+
+
+class EntityLayer:
+    """
+    The entities of one Tiled layer, indexed by a CollisionGrid.
+    """
+    def __init__(self, name, grid, kind, test, value):
+        self.name = name
+        self.grid = grid
+        self.kind = kind
+        self.test = test
+        self.value = value
+
+    def touching(self, x, y, width, height):
+        """Indices of the live entities of the layer the player box touches, in layer order."""
+        if self.test == TOUCH_SIDES:
+            return [index for index, flags in self.grid.touching(x, y, width, height)]
+        if self.test == TOUCH_FEET:
+            return self.grid.under_feet(x, y, width, height)
+        return self.grid.under_point(x, y)
+
+
+class LevelEntities:
+    """
+    Every entity layer of a level, with the removals of the step under way.
+    """
+    def __init__(self, collision, layers=ENTITY_LAYERS):
+        self.layers = [EntityLayer(name, collision.layers[name], *layers[name])
+                       for name in layers if name in collision.layers]
+        self.removed = []
+
+    def touching(self, x, y, width, height):
+        """(layer, index) of every live entity the player box touches, layer by layer."""
+        hits = []
+        for layer in self.layers:
+            if layer.grid.cells:
+                hits.extend((layer, index) for index in layer.touching(x, y, width, height))
+        return hits
+
+    def remove(self, layer, index):
+        """Remove an entity at the next flush()."""
+        self.removed.append((layer, index))
+
+    def flush(self):
+        """Apply the removals of the step, each layer's all at once."""
+        if not self.removed:
+            return
+        by_layer = {}
+        for layer, index in self.removed:
+            by_layer.setdefault(layer, []).append(index)
+        for layer, indices in by_layer.items():
+            layer.grid.remove_many(indices)
+        self.removed = []
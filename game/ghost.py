@@ -0,0 +1,322 @@
+"""
+Ghost racing.
+
+A ghost is a run through one level: every GHOST_SAMPLE_INTERVAL physics
+steps the player's position and drawn frame are sampled. Positions are
+quantized to 1/POSITION_SCALE pixel and stored as the change since the
+previous sample, an int16 for x and one for y; the frame is its animation
+code and index, a byte each. Six bytes a sample, about 5 KiB a minute.
+Respawns, and moves too long for an int16, start a keyframe holding the
+absolute position instead, so playback jumps there rather than sliding.
+
+GhostStore keeps the fastest finished run of every map in GHOST_DIR, one
+file per map, named after the map file and a hash of its contents, so
+another map of the same name, or an edited map, does not race a ghost that
+was run on a different level. GhostPlayer decodes a ghost once, when it is
+loaded, into arrays of absolute positions; update() then only indexes and
+interpolates between two samples and keeps the result in attributes, so
+playing a ghost back builds no objects per frame.
+
+File layout:
+
+    header      magic, version, sample interval, step, run time, sample and keyframe counts
+    keyframes   uint32 sample, int32 x, int32 y of every keyframe
+    dx, dy      int16 of every sample
+    animations  uint8 of every sample
+    frames      uint8 of every sample
+
+    python ghost.py
+"""
+import hashlib
+import os
+import struct
+import sys
+from array import array
+
+from physics import PHYSICS_STEP
+from simulation import GAME_DIR, PLAYER_ANIMATIONS, EVENT_RESPAWN
+
+MAGIC = b"BEARGHO\0"
+VERSION = 1
+
+HEADER = struct.Struct("<8sHHddII")
+
+#Physics steps between two samples, and quantization of positions
+GHOST_SAMPLE_INTERVAL = 4
+POSITION_SCALE = 4
+
+#Largest change an int16 holds
+MAX_DELTA = 32767
+
+#Code of every player animation, its position in PLAYER_ANIMATIONS
+ANIMATION_NAMES = tuple(PLAYER_ANIMATIONS)
+ANIMATION_CODES = {name: code for code, name in enumerate(ANIMATION_NAMES)}
+
+#Where the best runs are kept
+GHOST_DIR = os.path.join(GAME_DIR, "ghosts")
+
+#Hex digits of the map hash in a ghost key
+KEY_HASH_LENGTH = 16
+
+
+def ghost_key(map_path):
+    """Name the best run of a map is stored under: its file name without extension and content hash."""
+    with open(map_path, "rb") as map_file:
+        digest = hashlib.sha256(map_file.read()).hexdigest()
+    return f"{os.path.splitext(os.path.basename(map_path))[0]}-{digest[:KEY_HASH_LENGTH]}"
+
+
+def _little_endian(values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+class Ghost:
+    """
+    The samples of one run through a level, time being its length in seconds.
+    """
+    def __init__(self, interval=GHOST_SAMPLE_INTERVAL, step=PHYSICS_STEP):
+        self.interval = interval
+        self.step = step
+        self.time = 0.0
+
+        # Sample index and quantized absolute position of every keyframe
+        self.key_samples = array("I")
+        self.key_x = array("i")
+        self.key_y = array("i")
+
+        # Per sample: change of the quantized position, animation code and frame
+        self.dx = array("h")
+        self.dy = array("h")
+        self.animations = array("B")
+        self.frames = array("B")
+
+        # Quantized position of the last sample
+        self.last_x = 0
+        self.last_y = 0
+
+    def __len__(self):
+        return len(self.dx)
+
+    @property
+    def sample_time(self):
+        """Seconds between two samples."""
+        return self.interval * self.step
+
+    @property
+    def size(self):
+        """Bytes the ghost takes in a file."""
+        return HEADER.size + 12 * len(self.key_samples) + 6 * len(self)
+
+    def append(self, x, y, texture, keyframe=False):
+        """Add the next sample: position and the (animation name, index) drawn."""
+        quantized_x = round(x * POSITION_SCALE)
+        quantized_y = round(y * POSITION_SCALE)
+        dx = quantized_x - self.last_x
+        dy = quantized_y - self.last_y
+        if keyframe or not len(self) or abs(dx) > MAX_DELTA or abs(dy) > MAX_DELTA:
+            self.key_samples.append(len(self))
+            self.key_x.append(quantized_x)
+            self.key_y.append(quantized_y)
+            dx = dy = 0
+        self.dx.append(dx)
+        self.dy.append(dy)
+        name, index = texture
+        self.animations.append(ANIMATION_CODES[name])
+        self.frames.append(index)
+        self.last_x = quantized_x
+        self.last_y = quantized_y
+
+    def positions(self):
+        """Absolute x and y of every sample, as float arrays."""
+        count = len(self)
+        xs = array("f", bytes(4 * count))
+        ys = array("f", bytes(4 * count))
+        keyframe = 0
+        x = y = 0
+        for sample in range(count):
+            if keyframe < len(self.key_samples) and self.key_samples[keyframe] == sample:
+                x = self.key_x[keyframe]
+                y = self.key_y[keyframe]
+                keyframe += 1
+            else:
+                x += self.dx[sample]
+                y += self.dy[sample]
+            xs[sample] = x / POSITION_SCALE
+            ys[sample] = y / POSITION_SCALE
+        return xs, ys
+
+    def save(self, path):
+        with open(path, "wb") as output:
+            output.write(HEADER.pack(MAGIC, VERSION, self.interval, self.step, self.time, len(self),
+                                     len(self.key_samples)))
+            for values in (self.key_samples, self.key_x, self.key_y, self.dx, self.dy):
+                output.write(_little_endian(values).tobytes())
+            output.write(self.animations.tobytes())
+            output.write(self.frames.tobytes())
+
+    @staticmethod
+    def read_header(buffer, path):
+        magic, version, interval, step, run_time, count, keys = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} ghost")
+        return interval, step, run_time, count, keys
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as ghost_file:
+            buffer = ghost_file.read()
+        interval, step, run_time, count, keys = cls.read_header(buffer, path)
+        ghost = cls(interval, step)
+        ghost.time = run_time
+        offset = HEADER.size
+        for name, typecode, length in (("key_samples", "I", keys), ("key_x", "i", keys), ("key_y", "i", keys),
+                                       ("dx", "h", count), ("dy", "h", count), ("animations", "B", count),
+                                       ("frames", "B", count)):
+            values = array(typecode)
+            values.frombytes(buffer[offset:offset + length * values.itemsize])
+            setattr(ghost, name, _little_endian(values))
+            offset += length * values.itemsize
+        return ghost
+
+
+class GhostRecorder:
+    """
+    Samples a Simulation's run through its current level.
+
+    Call record() after every physics step and finish() when the level is done.
+    """
+    def __init__(self, simulation, texture, interval=GHOST_SAMPLE_INTERVAL, step=PHYSICS_STEP):
+        self.level = simulation.level
+        self.ghost = Ghost(interval, step)
+        self.ghost.append(simulation.player_x, simulation.player_y, texture)
+        self.steps = 0
+        self.respawned = False
+
+    @property
+    def time(self):
+        """Seconds since the level started."""
+        return self.steps * self.ghost.step
+
+    def record(self, simulation, texture):
+        self.steps += 1
+        if simulation.events and (EVENT_RESPAWN, None) in simulation.events:
+            self.respawned = True
+        # The step that reaches the next level counts, the next level's spawn point does not
+        if self.steps % self.ghost.interval == 0 and simulation.level == self.level:
+            self.ghost.append(simulation.player_x, simulation.player_y, texture, self.respawned)
+            self.respawned = False
+
+    def finish(self):
+        self.ghost.time = self.time
+        return self.ghost
+
+
+class GhostPlayer:
+    """
+    Where a ghost is at any time of its run, interpolated between samples.
+
+    After update(): x, y, and texture, the (animation name, index) to draw,
+    which changed says is different from the last update.
+    """
+    def __init__(self, ghost):
+        self.ghost = ghost
+        self.xs, self.ys = ghost.positions()
+        self.animations = ghost.animations
+        self.frames = ghost.frames
+        self.sample_time = ghost.sample_time
+        self.last = len(ghost) - 1
+
+        # Samples that start a keyframe are jumped to, not slid to
+        self.jumps = bytearray(len(ghost))
+        for sample in ghost.key_samples:
+            self.jumps[sample] = 1
+
+        self.x = self.xs[0]
+        self.y = self.ys[0]
+        self.sample = 0
+        self.texture = ANIMATION_NAMES[self.animations[0]], self.frames[0]
+        self.changed = True
+
+    def update(self, time):
+        position = max(0.0, time / self.sample_time)
+        # A time on a sample lands on it, however the division rounds
+        sample = int(position + 1e-9)
+        if sample >= self.last:
+            sample = self.last
+            fraction = 0.0
+        else:
+            fraction = max(0.0, position - sample)
+            if self.jumps[sample + 1]:
+                fraction = 0.0
+        xs = self.xs
+        ys = self.ys
+        if fraction:
+            self.x = xs[sample] + (xs[sample + 1] - xs[sample]) * fraction
+            self.y = ys[sample] + (ys[sample + 1] - ys[sample]) * fraction
+        else:
+            self.x = xs[sample]
+            self.y = ys[sample]
+
+        self.changed = sample != self.sample and (self.animations[sample] != self.animations[self.sample]
+                                                  or self.frames[sample] != self.frames[self.sample])
+        if self.changed:
+            self.texture = ANIMATION_NAMES[self.animations[sample]], self.frames[sample]
+        self.sample = sample
+
+
+class GhostStore:
+    """
+    The fastest ghost of every map, a file each in directory.
+    """
+    def __init__(self, directory=GHOST_DIR):
+        self.directory = directory
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.ghost")
+
+    def best_time(self, key):
+        """Run time of the stored ghost of a map, None if there is none."""
+        try:
+            with open(self.path(key), "rb") as ghost_file:
+                return Ghost.read_header(ghost_file.read(HEADER.size), key)[2]
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def best(self, key):
+        """The stored ghost of a map, or None."""
+        try:
+            return Ghost.load(self.path(key))
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def offer(self, key, ghost):
+        """Keep a finished run if it beats the stored one. Returns True if it did."""
+        best = self.best_time(key)
+        if best is not None and best <= ghost.time:
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        ghost.save(self.path(key))
+        return True
+
+    def keys(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-len(".ghost")] for name in os.listdir(self.directory) if name.endswith(".ghost"))
+
+
+def main():
+    store = GhostStore()
+    for key in store.keys():
+        ghost = store.best(key)
+        if ghost is None:
+            print(f"{key}: unreadable")
+            continue
+        print(f"{key}: {ghost.time:.2f} s, {len(ghost)} samples, {len(ghost.key_samples)} keyframes, "
+              f"{ghost.size / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
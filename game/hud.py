@@ -0,0 +1,154 @@
+"""
+Heads-up display.
+
+arcade.draw_text keeps one pyglet label per text style, so the time and the
+score, drawn in the same style, took turns rewriting and laying out the same
+label twice every frame. Hud keeps a label of its own for every piece of
+text, all in one pyglet batch drawn with a single call, and only sets a
+label's text when what it shows has changed.
+
+The time is split in two labels: "Время : MM:SS:" changes once a second and
+the two centisecond digits after it change every step, so only two glyphs are
+laid out again per frame.
+
+ProfileOverlay graphs the frame times of a Profiler in the top right corner.
+"""
+import math
+
+import arcade
+import pyglet
+
+#Look of the text, as the draw_text calls it replaces
+HUD_FONT = ("calibri", "arial")
+HUD_FONT_SIZE = 18
+HUD_COLOR = arcade.get_four_byte_color(arcade.csscolor.WHITE)
+
+#Positions, from the bottom left of the window
+HUD_MARGIN = 10
+TIME_Y = 10
+SCORE_Y = 50
+
+TIME_LABEL = "Время : "
+SCORE_LABEL = "Счёт: "
+
+#Profile overlay: size, frame time at the top of the graph, the frame budget
+#line, and frames between two refreshes of its numbers
+OVERLAY_WIDTH = 360
+OVERLAY_HEIGHT = 120
+OVERLAY_FONT_SIZE = 10
+OVERLAY_MAX_MS = 50
+FRAME_BUDGET_MS = 1000 / 60
+OVERLAY_TEXT_EVERY = 30
+OVERLAY_BACKGROUND = (0, 0, 0, 170)
+
+#Text of every centisecond value, so a frame formats no strings
+CENTISECONDS = [f"{cents:02d}" for cents in range(100)]
+
+
+def format_time(total_time):
+    """Game time as MM:SS:CC."""
+    ms, sec = math.modf(total_time)
+    seconds = int(sec)
+    return f"{seconds // 60:02d}:{seconds % 60:02d}:{CENTISECONDS[int(ms * 100)]}"
+
+
+class Hud:
+    """
+    Time and score text, updated from the simulation and drawn as one batch.
+
+    Needs the window's GL context, so make it after the window.
+    """
+    def __init__(self, x=HUD_MARGIN):
+        self.batch = pyglet.graphics.Batch()
+        self.time_head = self.label(x, TIME_Y)
+        self.time_cents = self.label(x, TIME_Y)
+        self.score_text = self.label(x, SCORE_Y)
+
+        # What the labels show now; None until the first update()
+        self.time = None
+        self.seconds = None
+        self.cents = None
+        self.score = None
+
+        #Counters
+        self.layouts = 0
+
+    def label(self, x, y):
+        return pyglet.text.Label("", font_name=HUD_FONT, font_size=HUD_FONT_SIZE, color=HUD_COLOR,
+                                 x=x, y=y, batch=self.batch)
+
+    def update(self, total_time, score):
+        """Show a new game time and score; labels whose text stays the same are left alone."""
+        if total_time != self.time:
+            self.time = total_time
+            ms, sec = math.modf(total_time)
+            seconds = int(sec)
+            if seconds != self.seconds:
+                self.seconds = seconds
+                self.time_head.text = f"{TIME_LABEL}{seconds // 60:02d}:{seconds % 60:02d}:"
+                self.time_cents.x = self.time_head.x + self.time_head.content_width
+                self.layouts += 1
+            cents = int(ms * 100)
+            if cents != self.cents:
+                self.cents = cents
+                self.time_cents.text = CENTISECONDS[cents]
+                self.layouts += 1
+
+        if score != self.score:
+            self.score = score
+            self.score_text.text = f"{SCORE_LABEL}{score}"
+            self.layouts += 1
+
+    @property
+    def time_text(self):
+        return self.time_head.text[len(TIME_LABEL):] + self.time_cents.text
+
+    def draw(self):
+        """Draw all the text. Use the GUI camera first."""
+        with arcade.get_window().ctx.pyglet_rendering():
+            self.batch.draw()
+
+
+class ProfileOverlay:
+    """
+    Frame time graph of the last OVERLAY_WIDTH frames, with the mean and worst
+    time of every phase and the mean of every counter under it.
+    """
+    def __init__(self, profiler, window_width, window_height):
+        self.profiler = profiler
+        self.right = window_width - HUD_MARGIN
+        self.left = self.right - OVERLAY_WIDTH
+        self.top = window_height - HUD_MARGIN
+        self.bottom = self.top - OVERLAY_HEIGHT
+        self.batch = pyglet.graphics.Batch()
+        self.text = pyglet.text.Label("", font_name=HUD_FONT, font_size=OVERLAY_FONT_SIZE, color=HUD_COLOR,
+                                      x=self.left, y=self.bottom - 4, width=OVERLAY_WIDTH, multiline=True,
+                                      anchor_y="top", batch=self.batch)
+        self.text_frame = None
+
+    def refresh_text(self):
+        lines = []
+        for name, (mean, p95, worst) in self.profiler.summary().items():
+            if name in self.profiler.timings:
+                lines.append(f"{name}: {mean:.2f} ms, max {worst:.2f} ms")
+            else:
+                lines.append(f"{name}: {mean:.0f} per frame")
+        self.text.text = "\n".join(lines)
+
+    def draw(self):
+        profiler = self.profiler
+        if profiler.frames // OVERLAY_TEXT_EVERY != self.text_frame:
+            self.text_frame = profiler.frames // OVERLAY_TEXT_EVERY
+            self.refresh_text()
+
+        scale = OVERLAY_HEIGHT / OVERLAY_MAX_MS
+        arcade.draw_lrtb_rectangle_filled(self.left, self.right, self.top, self.bottom - 4 - self.text.content_height,
+                                          OVERLAY_BACKGROUND)
+        budget = self.bottom + FRAME_BUDGET_MS * scale
+        arcade.draw_line(self.left, budget, self.right, budget, arcade.color.GREEN)
+        times = profiler.series()[-OVERLAY_WIDTH:]
+        if len(times) > 1:
+            points = [(self.left + i, self.bottom + min(ms, OVERLAY_MAX_MS) * scale) for i, ms in enumerate(times)]
+            arcade.draw_line_strip(points, arcade.color.YELLOW)
+        with arcade.get_window().ctx.pyglet_rendering():
+            self.batch.draw()
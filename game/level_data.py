@@ -0,0 +1,202 @@
+"""
+Tiled map data without arcade.
+
+Reads the raw GID layers of a Tiled JSON map so that game logic (collision,
+analysis, benchmarks) can work on a level without creating sprites.
+"""
+import json
+import os
+import xml.etree.ElementTree as ElementTree
+
+#Tiled stores flip/rotation flags in the high bits of every GID
+GID_MASK = 0x0FFFFFFF
+
+
+class Tileset:
+    """
+    A tileset cut from a single image, like tiles_set.tsx.
+    """
+    def __init__(self, firstgid, tile_width, tile_height, image=None, columns=1, tile_count=0,
+                 margin=0, spacing=0):
+        self.firstgid = firstgid
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.image = image
+        self.columns = columns
+        self.tile_count = tile_count
+        self.margin = margin
+        self.spacing = spacing
+
+    def image_rect(self, gid):
+        """(x, y, width, height) of a tile inside the tileset image, y from the top."""
+        tile_id = (gid & GID_MASK) - self.firstgid
+        row, column = divmod(tile_id, self.columns)
+        return (self.margin + column * (self.tile_width + self.spacing),
+                self.margin + row * (self.tile_height + self.spacing),
+                self.tile_width,
+                self.tile_height)
+
+
+class MapObject:
+    """
+    An object of a Tiled object layer, in game coordinates: y up from the
+    bottom of the map, (left, bottom) its lower left corner. Points have no size.
+    """
+    def __init__(self, layer, kind, name, left, bottom, width=0, height=0):
+        self.layer = layer
+        self.kind = kind
+        self.name = name
+        self.left = left
+        self.bottom = bottom
+        self.width = width
+        self.height = height
+
+    @property
+    def top(self):
+        return self.bottom + self.height
+
+    @property
+    def center(self):
+        return self.left + self.width / 2, self.bottom + self.height / 2
+
+    def as_tuple(self):
+        return self.layer, self.kind, self.name, self.left, self.bottom, self.width, self.height
+
+
+class LevelData:
+    """
+    Tile layers of one map plus the geometry arcade uses to place their sprites.
+    """
+    def __init__(self, width, height, tile_width, tile_height, layers, tilesets, layer_opacity=None,
+                 collision_grids=None, objects=None):
+        # Map size in tiles and size of one map cell in pixels
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+
+        # Layer name -> flat row-major sequence of GIDs, top row first
+        self.layers = layers
+
+        # Tilesets sorted by firstgid
+        self.tilesets = tilesets
+
+        # Layer name -> opacity, for layers that are not fully opaque or hidden (0)
+        self.layer_opacity = layer_opacity or {}
+
+        # Layer name -> CollisionGrid.pack() output, for maps compiled by mapbin
+        self.collision_grids = collision_grids or {}
+
+        # MapObjects of all object layers, in map order
+        self.objects = objects or []
+
+    @property
+    def pixel_width(self):
+        return self.width * self.tile_width
+
+    @property
+    def pixel_height(self):
+        return self.height * self.tile_height
+
+    def layer(self, name):
+        """GIDs of a layer, or an empty list if the map does not have it."""
+        return self.layers.get(name, [])
+
+    def tileset(self, gid):
+        """The tileset a GID belongs to."""
+        gid &= GID_MASK
+        found = self.tilesets[0]
+        for tileset in self.tilesets:
+            if gid < tileset.firstgid:
+                break
+            found = tileset
+        return found
+
+    def tile_size(self, gid):
+        """Image size of the tile behind a GID."""
+        tileset = self.tileset(gid)
+        return tileset.tile_width, tileset.tile_height
+
+    def blocks(self, name, scaling=1):
+        """
+        Yield (center_x, center_y, width, height) for every tile of a layer.
+
+        Tiles come in the same order and at the same place as the sprites
+        arcade.load_tilemap creates: rows top to bottom, and each tile image
+        anchored to the bottom left corner of its map cell.
+        """
+        for i, gid in enumerate(self.layer(name)):
+            if gid:
+                yield self.block(i, gid, scaling)
+
+    def block(self, cell, gid, scaling=1):
+        """(center_x, center_y, width, height) of the tile in a cell, cells numbered like the layer data."""
+        row, column = divmod(cell, self.width)
+        width, height = self.tile_size(gid)
+        width *= scaling
+        height *= scaling
+        return (column * self.tile_width * scaling + width / 2,
+                (self.height - row - 1) * self.tile_height * scaling + height / 2,
+                width,
+                height)
+
+
+def _load_tileset(firstgid, path):
+    root = ElementTree.parse(path).getroot()
+    image = root.find("image")
+    return Tileset(firstgid, int(root.get("tilewidth")), int(root.get("tileheight")),
+                   os.path.join(os.path.dirname(path), image.get("source")) if image is not None else None,
+                   int(root.get("columns", 1)), int(root.get("tilecount", 0)),
+                   int(root.get("margin", 0)), int(root.get("spacing", 0)))
+
+
+def load_level_data(map_name):
+    """Read a Tiled JSON map into a LevelData."""
+    with open(map_name, encoding="utf-8") as map_file:
+        tiled = json.load(map_file)
+
+    map_dir = os.path.dirname(os.path.abspath(map_name))
+    tilesets = []
+    for tileset in tiled["tilesets"]:
+        if "source" in tileset:
+            tilesets.append(_load_tileset(tileset["firstgid"], os.path.join(map_dir, tileset["source"])))
+        else:
+            tilesets.append(Tileset(tileset["firstgid"], tileset["tilewidth"], tileset["tileheight"],
+                                    os.path.join(map_dir, tileset["image"]) if "image" in tileset else None,
+                                    tileset.get("columns", 1), tileset.get("tilecount", 0),
+                                    tileset.get("margin", 0), tileset.get("spacing", 0)))
+    tilesets.sort(key=lambda tileset: tileset.firstgid)
+
+    layers = {}
+    layer_opacity = {}
+    objects = []
+    pixel_height = tiled["height"] * tiled["tileheight"]
+    for layer in tiled["layers"]:
+        if layer["type"] == "tilelayer":
+            layers[layer["name"]] = layer["data"]
+            opacity = layer.get("opacity", 1) if layer.get("visible", True) else 0
+            if opacity != 1:
+                layer_opacity[layer["name"]] = opacity
+        elif layer["type"] == "objectgroup":
+            for tiled_object in layer["objects"]:
+                objects.append(_map_object(layer["name"], tiled_object, pixel_height))
+
+    return LevelData(tiled["width"], tiled["height"], tiled["tilewidth"], tiled["tileheight"],
+                     layers, tilesets, layer_opacity, objects=objects)
+
+
+def _map_object(layer, tiled_object, pixel_height):
+    """
+    A Tiled object as a MapObject.
+
+    Tiled measures y down from the top of the map, to an object's top left
+    corner (its bottom left for tile objects).
+    """
+    width = tiled_object.get("width", 0)
+    height = tiled_object.get("height", 0)
+    bottom = pixel_height - tiled_object["y"]
+    if "gid" not in tiled_object:
+        bottom -= height
+    # Tiled 1.9 called the type "class"
+    kind = tiled_object.get("type") or tiled_object.get("class", "")
+    return MapObject(layer, kind, tiled_object.get("name", ""), tiled_object["x"], bottom, width, height)
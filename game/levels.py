@@ -0,0 +1,105 @@
+"""
+Level markers.
+
+Where a level starts, where the bear comes back after dying and where it
+leaves the level come from objects in the map's object layers, by type:
+
+    spawn       point (or the centre of an area) where the level starts
+    checkpoint  area that, once touched, is a place to respawn at, its centre
+    exit        area that ends the level
+    kill_plane  area the bear dies in, such as the space under a pit
+
+LevelInfo reads them once, when the level is loaded, and indexes the areas
+in CollisionGrids, so the simulation asks "which checkpoint is here" or
+"is this the exit" without any per-level code. A map without markers gets
+what every level had so far: the spawn point of level 1, the right edge of
+the map as its exit and death below y = -50. A map with kill planes has to
+put them wherever the bear can fall out of it.
+
+Levels are the map/map<n>.json files, numbered from 1 without gaps.
+"""
+import os
+
+from collision import CollisionGrid
+
+#Object types
+SPAWN = "spawn"
+CHECKPOINT = "checkpoint"
+EXIT = "exit"
+KILL_PLANE = "kill_plane"
+
+#Markers of maps that have none
+DEFAULT_SPAWN = (64, 200)
+DEFAULT_KILL_Y = -50
+
+
+def map_path(level, game_dir):
+    return os.path.join(game_dir, f"map/map{level}.json")
+
+
+def number_of_levels(game_dir):
+    """How many levels there are: map1.json, map2.json, ... up to the first one missing."""
+    level = 0
+    while os.path.exists(map_path(level + 1, game_dir)):
+        level += 1
+    return level
+
+
+def area_grid(objects):
+    """CollisionGrid over the areas of some MapObjects, in map order."""
+    # Cells as large as the largest area, so a lookup only visits a few of them
+    return CollisionGrid([(*item.center, item.width, item.height) for item in objects],
+                         max([item.width for item in objects], default=0) or 64,
+                         max([item.height for item in objects], default=0) or 64)
+
+
+class LevelInfo:
+    """
+    The markers of one level, indexed for lookups every physics step.
+    """
+    def __init__(self, level_data):
+        objects = level_data.objects
+        spawns = [item for item in objects if item.kind == SPAWN]
+        checkpoints = [item for item in objects if item.kind == CHECKPOINT]
+        exits = [item for item in objects if item.kind == EXIT]
+        kill_planes = [item for item in objects if item.kind == KILL_PLANE]
+
+        self.spawn = spawns[0].center if spawns else DEFAULT_SPAWN
+        self.end_of_map = level_data.width * level_data.tile_width
+        # Kill plane areas; None: death below DEFAULT_KILL_Y
+        self.kill_planes = area_grid(kill_planes) if kill_planes else None
+
+        # Respawn point of every checkpoint, and their areas
+        self.checkpoints = [item.center for item in checkpoints]
+        self.checkpoint_grid = area_grid(checkpoints)
+
+        # Exit areas; None: the right edge of the map
+        self.exits = area_grid(exits) if exits else None
+
+    def checkpoints_at(self, x, y):
+        """Indices of the checkpoints whose area holds a point."""
+        if not self.checkpoints:
+            return []
+        return self.checkpoint_grid.under_point(x, y)
+
+    def at_exit(self, x, y):
+        if self.exits is None:
+            return x >= self.end_of_map
+        return self.exits.contains_point(x, y)
+
+    def killed(self, x, y):
+        if self.kill_planes is None:
+            return y < DEFAULT_KILL_Y
+        return self.kill_planes.contains_point(x, y)
+
+    def respawn_point(self, x, y, reached):
+        """The spawn point or the reached checkpoint nearest to (x, y)."""
+        best = self.spawn
+        best_distance = (best[0] - x) ** 2 + (best[1] - y) ** 2
+        for index in reached:
+            point = self.checkpoints[index]
+            distance = (point[0] - x) ** 2 + (point[1] - y) ** 2
+            if distance < best_distance:
+                best = point
+                best_distance = distance
+        return best
@@ -1,521 +1,434 @@
 """
 Platformer Game
+
+Starts in the order startup.py describes; --profile-startup prints how long
+each phase took. python play.py starts the game the same way and times it from
+its first line.
 """
+import argparse
+
 import arcade
-import math
-import time
+
+from animation import PlayerAnimator
+from assets import ASSETS
+from camera import CameraController, CulledLayers
+from controls import (InputQueue, LatencyMeter, ACTION_LEFT, ACTION_RIGHT, ACTION_JUMP, ACTION_DOWN,
+                      ACTION_DASH)
+from ghost import GhostPlayer, GhostRecorder, GhostStore, ghost_key
+from hud import Hud, ProfileOverlay
+from physics import FixedTimestep, interpolate
+from preload import LevelPreloader, PreparedLevel, TransitionMeter
+from scene_loader import build_scene
+from simulation import (Simulation, LevelRegistry, CHARACTER_SCALING, TILE_SCALING,
+                        PLAYER_ANIMATIONS, EVENT_COIN, EVENT_LEVEL, EVENT_EXIT)
+from startup import StartupProfile, process_started, IMPORTS, WINDOW, FIRST_FRAME, LEVEL_BUILT, SCENE, INTERACTIVE
+from streaming import StreamedLevel, StreamingMap, should_stream
+
 # Constants
 SCREEN_WIDTH = 1600
 SCREEN_HEIGHT = 960
 SCREEN_TITLE = "Platformer"
 
+#Action of every key
+KEY_ACTIONS = {
+    arcade.key.UP: ACTION_JUMP,
+    arcade.key.W: ACTION_JUMP,
+    arcade.key.DOWN: ACTION_DOWN,
+    arcade.key.S: ACTION_DOWN,
+    arcade.key.LEFT: ACTION_LEFT,
+    arcade.key.A: ACTION_LEFT,
+    arcade.key.RIGHT: ACTION_RIGHT,
+    arcade.key.D: ACTION_RIGHT,
+    arcade.key.SPACE: ACTION_DASH,
+}
 
-# Constants used to scale our sprites from their original size
-
-#Size
-CHARACTER_SCALING = 0.8
-TILE_SCALING = 1
-
-#Player movement settings
-JUMP_MAX_HEIGHT = 100
-PLAYER_X_SPEED = 5
-PLAYER_Y_SPEED = 5
-MAX_FALL_SPEED = 20
-GRAVITY = 0.35
+#Opacity of the best run's ghost
+GHOST_ALPHA = 96
 
-#Animations speed
-PLAYER_SPRITE_IMAGE_CHANGE_SPEED = 50
-PLAYER_SPRITE_DASH_ANIMATION_SPEED = 20
-
-#Dash settings
-DASH_SPEED = 15
-DASH_DURATION = 0.2
-DASH_COOLDOWN = 1
-
-#Spawn Points
-PLAYER_START_X_1 = 64
-PLAYER_START_Y_1 = 200
-PLAYER_START_X_2 = 64
-PLAYER_START_Y_2 = 1100
-NUMBER_OF_LEVELS = 2
 
 class MyGame(arcade.Window):
     """
     Main application class.
     """
-    def __init__(self):
+    def __init__(self, measure_transitions=False, map_name=None, record=False, profile=False,
+                 measure_latency=False, startup=None):
+
+        #Startup phases, a StartupProfile for --profile-startup
+        self.startup = startup
+
+        #Level_Loading, the first level is built on the worker thread while the window opens
+        self.map_name = map_name
+        self.levels = LevelRegistry(first_map=map_name)
+        self.preloader = LevelPreloader(self.prepare_level)
+        self.preloader.request(1)
+        self.prepared = None
+        self.transition_meter = TransitionMeter() if measure_transitions else None
 
         # Call the parent class and set up the window
         super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
+        if self.startup:
+            self.startup.mark(WINDOW)
+
+        #Game_State, made by setup() from the first level
+        self.simulation = None
 
         #Map_Settings
-        self.test = 0
-        self.tile_map = None
-        self.map_height = 0
-        self.map_width = 0
+        self.scene = None
+        self.baked_layers = None
+        self.streaming_map = None
 
         #Lists
-        self.wall_list = None
         self.player_list = None
         self.player_sprite = None
+        self.coins_list = []
 
         #Camera
         self.camera = None
         self.gui_camera = None
-        self.camera_max = 0
-        self.score = 0
-
-        self.player_jump = False
-        self.jump_start = 0
-
-        #Button_State
-        self.key_right_pressed = False
-        self.key_left_pressed = False
-        self.key_space_pressed = False
-        self.last_button_pressed = None
-        self.last_button_x = None
-
-        #Collision
-        self.collide = False
-        self.collide_left = False
-        self.collide_right = False
-        self.collide_top = False
-        self.collide_coin = False
-
-        #Speed
-        self.player_dx = PLAYER_X_SPEED
-        self.fall_speed = PLAYER_Y_SPEED
-        self.jump_speed = PLAYER_Y_SPEED
-        self.fall_speed = 0
-
-        #Dash_Settings
-        self.dashing = False
-        self.dash_end_time = 0
-        self.last_dash_direction = None
-        self.dash_cooldown = DASH_COOLDOWN  # Cooldown time in seconds
-        self.last_dash_time = -self.dash_cooldown  # Initialize to allow immediate dash at start
-        self.dash_frame_index = 0
-        self.dash_frame_timer = 0
-        self.dash_frame_duration = 0.05  # Duration to display each dash frame (in seconds)
+        self.camera_controller = CameraController(self.width, self.height)
+        # Physics steps, whole and partial, the camera has followed the player for
+        self.camera_steps = 0.0
+        self.culled_layers = None
+
+        #Button_State, key events wait here for the next physics step
+        self.input_queue = InputQueue()
+        self.latency_meter = LatencyMeter() if measure_latency else None
+
+        #Replay
+        self.record = record
+        self.recorder = None
+
+        #Ghost_Racing, against the best finished run of every level
+        self.ghosts = GhostStore()
+        self.ghost_key = None
+        self.ghost_recorder = None
+        self.ghost_player = None
+        self.ghost_sprite = None
 
         #Interface
-        self.total_time = 0.0
-        self.total_time_print = ""
+        self.hud = Hud()
 
         #Animations
-        self.player_sprite_images_right = []
-        self.player_sprite_images_left = []
-        self.player_sprite_images_dash_right = []
-        self.player_sprite_images_dash_left = []
-        self.player_sprite_images_up_right = []
-        self.player_sprite_images_up_left = []
-        self.player_sprite_images_down_right = []
-        self.player_sprite_images_down_left = []
-        self.player_sprite_idle = []
-
-        #Jump_Settings
-        self.jump_frame_index = 0
-        self.jump_frame_timer = 0
-        self.jump_frame_duration = 0.1
-
-        #Level_Settings
-        self.end_of_map = 0
-        self.level = 1
+        self.player_textures = None
+        self.player_texture = None
+        self.animator = None
 
-        self.coins_list = []
+        #Physics_Clock
+        self.timestep = FixedTimestep()
 
-        arcade.set_background_color(arcade.csscolor.DARK_SLATE_BLUE)
+        #Profiling, toggled with F3
+        self.profiler = None
+        self.profile_overlay = None
+        self.profile_at_start = profile
 
+        arcade.set_background_color(arcade.csscolor.DARK_SLATE_BLUE)
 
     def setup(self):
-        """Set up the game here. Call this function to restart the game."""
+        """
+        Set up the game here, waiting for the first level if it is still being
+        built. Call this function to restart the game.
+        """
+        if self.simulation is None:
+            self.simulation = Simulation(level_loader=self.load_prepared_level, level_count=self.levels.count)
+        else:
+            self.simulation.load_level(self.simulation.level)
+        self.load_scene()
+        if self.record:
+            # Imported here, like the profiler, to keep what is only used on request out of startup
+            from replay import ReplayRecorder
+            self.recorder = ReplayRecorder(self.simulation, self.map_name, step=self.timestep.step)
+        if self.profile_at_start and not self.profiler:
+            self.start_profiler()
+
+    def prepare_level(self, level):
+        """Parse a level and build its sprites. Runs on the preloader's worker thread."""
+        # Decoded here the first time, off the main thread
+        ASSETS.player_animations()
+        loaded = self.levels.load(level)
+        if should_stream(loaded.level_data):
+            prepared = StreamedLevel(loaded, StreamingMap(loaded.level_data, TILE_SCALING))
+        else:
+            scene = build_scene(loaded.level_data, TILE_SCALING, lazy=True)
+            prepared = PreparedLevel(loaded, scene, SCREEN_WIDTH, SCREEN_HEIGHT)
+        if self.startup:
+            self.startup.mark(LEVEL_BUILT)
+        return prepared
+
+    def load_prepared_level(self, level):
+        """Simulation level loader: hand over the preloaded level."""
+        self.prepared = self.preloader.take(level)
+        return self.prepared.loaded
+
+    def warm_up_levels(self):
+        """
+        Spend a little of this frame on the current level's GL setup that its
+        first frames did not need, then on preloading the next level.
+        """
+        if not self.prepared.warm:
+            self.prepared.warm_up()
+            return
+        level = self.simulation.level + 1
+        if level > self.levels.count:
+            return
+        self.preloader.request(level)
+        prepared = self.preloader.ready(level)
+        if prepared is not None:
+            prepared.warm_up()
+
+    def load_scene(self):
+        """Switch to the sprites prepared for the simulation's current level."""
         # Set up the Camera
         self.camera = arcade.Camera(self.width, self.height)
         self.gui_camera = arcade.Camera(self.width, self.height)
-        map_name = f"map/map{self.level}.json"
-        layer_options = {
-            "platforms01": {
-                "use_spatial_hash": True,
-            },
-            "coins": {
-                "use_spatial_hash": True,
-            },
-            "honey": {
-                "use_spatial_hash": True,
-            },
-            "spikes": {
-                "use_spatial_hash": True,
-            }
-        }
-        self.tile_map = arcade.load_tilemap(map_name, TILE_SCALING, layer_options)
-        self.scene = arcade.Scene.from_tilemap(self.tile_map)
-        self.end_of_map = self.tile_map.width * self.tile_map.tile_width
-
-        # Create the Sprite lists
-        self.player_list = arcade.SpriteList()
-        self.wall_list = arcade.SpriteList(use_spatial_hash=True)
-
-        # Set up the player, specifically placing it at these coordinates.
-        image_source = "img/bear/walk_cycle/Bear_Walk_Cycle1.png"
-        self.player_sprite = arcade.Sprite(image_source, CHARACTER_SCALING)
-        if self.level == 1:
-            self.player_sprite.center_x = PLAYER_START_X_1
-            self.player_sprite.center_y = PLAYER_START_Y_1
-        if self.level == 2:
-            self.player_sprite.center_x = PLAYER_START_X_2
-            self.player_sprite.center_y = PLAYER_START_Y_2
-
+        self.prepared.initialize()
+        self.scene = self.prepared.scene
+        self.baked_layers = self.prepared.baked_layers
+        self.streaming_map = self.prepared.streaming_map
+        self.coins_list = list(self.scene.name_mapping.get("coins", []))
+        layers = self.streaming_map or self.baked_layers
+        self.culled_layers = CulledLayers(self.scene, layers.live_layer_names)
+
+        # The level's bounds are fixed for as long as it is played
+        self.camera_controller.set_bounds(self.simulation.map_width, self.simulation.map_height)
+        self.camera.move_to(self.camera_controller.snap(self.simulation.player_x, self.simulation.player_y))
+
+        # Create the Sprite lists, all player frames already sit in their atlas
+        self.player_textures = ASSETS.player_animations()
+        self.player_list = arcade.SpriteList(atlas=ASSETS.get_player_atlas())
+
+        # Set up the player, the simulation decides where it is and the animator which frame it shows
+        self.animator = PlayerAnimator({name: len(frames) for name, frames in PLAYER_ANIMATIONS.items()})
+        self.animator.update(self.simulation)
+        name, index = self.animator.texture
+        self.player_sprite = arcade.Sprite(scale=CHARACTER_SCALING, texture=self.player_textures[name][index])
+        self.player_sprite.center_x = self.simulation.player_x
+        self.player_sprite.center_y = self.simulation.player_y
+        self.player_texture = self.animator.texture
+        self.load_ghost()
         self.player_list.append(self.player_sprite)
-        self.jump_start = self.player_sprite.center_y
-
-
-        self.score = 0
-
-
-        for i in range(1, 5):
-            self.player_sprite_images_right.append(arcade.load_texture(f"img/bear/walk_cycle/Bear_Walk_Cycle{i}.png"))
-        for i in range(4, 0, -1):
-            self.player_sprite_images_left.append(
-                arcade.load_texture(f"img/bear/walk_cycle/Bear_Walk_Cycle{i}.png", flipped_horizontally=True))
-        for i in range(1, 5):
-            self.player_sprite_images_dash_left.append(arcade.load_texture(f"img/bear/dash/bear_dash{i}.png"))
-        for i in range(4, 0, -1):
-            self.player_sprite_images_dash_right.append(
-                arcade.load_texture(f"img/bear/dash/bear_dash{i}.png", flipped_horizontally=True))
-        for i in range(1, 4):
-            self.player_sprite_images_up_right.append(arcade.load_texture(f"img/bear/up/bear_jump{i}.png"))
-        for i in range(3, 0, -1):
-            self.player_sprite_images_up_left.append(
-                arcade.load_texture(f"img/bear/up/bear_jump{i}.png", flipped_horizontally=True))
-        for i in range(1, 3):
-            self.player_sprite_images_down_right.append(arcade.load_texture(f"img/bear/fall/bear_fall{i}.png"))
-        for i in range(2, 0, -1):
-            self.player_sprite_images_down_left.append(
-                arcade.load_texture(f"img/bear/fall/bear_fall{i}.png", flipped_horizontally=True))
+
+    def load_ghost(self):
+        """Start recording this level's run and race the best one so far, drawn under the player."""
+        self.ghost_key = ghost_key(self.levels.path(self.simulation.level))
+        self.ghost_recorder = GhostRecorder(self.simulation, self.animator.texture, step=self.timestep.step)
+        ghost = self.ghosts.best(self.ghost_key)
+        if ghost is None or not len(ghost):
+            self.ghost_player = self.ghost_sprite = None
+            return
+        self.ghost_player = GhostPlayer(ghost)
+        name, index = self.ghost_player.texture
+        self.ghost_sprite = arcade.Sprite(scale=CHARACTER_SCALING, texture=self.player_textures[name][index])
+        self.ghost_sprite.alpha = GHOST_ALPHA
+        self.ghost_sprite.center_x = self.ghost_player.x
+        self.ghost_sprite.center_y = self.ghost_player.y
+        self.player_list.append(self.ghost_sprite)
+
+    def finish_ghost(self):
+        """Keep the run through the level just finished if it is the best one."""
+        self.ghosts.offer(self.ghost_key, self.ghost_recorder.finish())
+
+    def start_profiler(self):
+        """Time the phases of every frame, count what they do and show the overlay."""
+        from profiler import Profiler, profile_simulation
+        profiler = Profiler()
+        for name, phase in (("on_update", "update"), ("center_camera_to_player", "camera"), ("on_draw", "draw"),
+                            ("draw_world", "world"), ("draw_player", "player"), ("draw_hud", "hud")):
+            profiler.timer(self, name, phase)
+        profile_simulation(profiler, self.simulation)
+        profiler.counter(arcade.SpriteList, "draw", "sprites drawn", lambda args, result: len(args[0]))
+        profiler.counter(self, "switch_player_texture", "texture switches")
+        self.profiler = profiler
+        self.profile_overlay = ProfileOverlay(profiler, self.width, self.height)
+
+    def stop_profiler(self):
+        self.profiler.remove()
+        self.profiler = None
+        self.profile_overlay = None
 
     def on_draw(self):
         """Render the screen."""
         # Clear the screen to the background color
         self.clear()
 
-        # Activate our Camera
-        self.camera.use()
+        # Until the first level is ready there is nothing else to show
+        if self.simulation is None:
+            if self.startup:
+                self.startup.mark(FIRST_FRAME)
+            return
 
-        # Draw our sprites
-        self.scene.draw()
-        self.player_list.draw()
+        # Activate our Camera, following the player to where it is drawn
+        x, y = self.player_draw_position()
+        self.center_camera_to_player(x, y)
+        self.camera.use()
+        self.draw_world()
+        self.draw_player(x, y)
 
         self.gui_camera.use()
+        self.draw_hud()
+
+        if self.latency_meter:
+            self.latency_meter.frame_drawn()
+
+        if self.startup and not self.startup.done:
+            self.startup.mark(INTERACTIVE)
+            self.startup.report()
+
+    def draw_world(self):
+        """
+        Pre-rendered chunks of the static layers under the camera (or the
+        streamed chunks of a large map), then the layers that change.
+        """
+        left, bottom = self.camera_controller.position
+        width = self.camera_controller.viewport_width
+        height = self.camera_controller.viewport_height
+        layers = self.streaming_map or self.baked_layers
+        layers.update_visible(left, bottom, width, height)
+        layers.draw()
+        self.culled_layers.update_visible(left, bottom, width, height)
+        self.culled_layers.draw()
+
+    def player_draw_position(self):
+        """The player between its last two physics positions."""
+        alpha = self.timestep.alpha
+        return (interpolate(self.simulation.previous_x, self.simulation.player_x, alpha),
+                interpolate(self.simulation.previous_y, self.simulation.player_y, alpha))
+
+    def draw_player(self, x, y):
+        self.player_sprite.center_x = x
+        self.player_sprite.center_y = y
+        if self.ghost_player:
+            self.draw_ghost(self.timestep.alpha)
+        self.player_list.draw()
 
-        arcade.draw_text(
-            str(f"Время : {self.total_time_print}"),
-            10,
-            10,
-            arcade.csscolor.WHITE,
-            18,
-        )
-        score_text = f"Счёт: {self.score}"
-        arcade.draw_text(
-            score_text,
-            10,
-            50,
-            arcade.csscolor.WHITE,
-            18,
-        )
-
+    def draw_ghost(self, alpha):
+        """The best run where it was this long into the level."""
+        ghost = self.ghost_player
+        ghost.update(self.ghost_recorder.time + alpha * self.timestep.step)
+        self.ghost_sprite.center_x = ghost.x
+        self.ghost_sprite.center_y = ghost.y
+        if ghost.changed:
+            name, index = ghost.texture
+            self.ghost_sprite.texture = self.player_textures[name][index]
+
+    def draw_hud(self):
+        self.hud.draw()
+        if self.profile_overlay:
+            self.profile_overlay.draw()
 
     def on_key_press(self, key, modifiers):
         """Called whenever a key is pressed."""
-        if key == arcade.key.UP or key == arcade.key.W:
-            self.last_button_pressed = "Up"
-            if self.collide:
-                self.player_jump = True
-                self.jump_start = self.player_sprite.center_y
-                self.fall_speed = PLAYER_Y_SPEED  # Reset fall speed on jump
-
-        elif key == arcade.key.DOWN or key == arcade.key.S:
-            self.player_sprite.center_y +=15
-
-        elif key == arcade.key.LEFT or key == arcade.key.A:
-            self.key_left_pressed = True
-            self.last_button_x = "Left"
-
-        elif key == arcade.key.RIGHT or key == arcade.key.D:
-            self.key_right_pressed = True
-            self.last_button_x = "Right"
-
-        elif key == arcade.key.SPACE:
-            self.key_space_pressed = True
-            self.start_dash()
+        action = KEY_ACTIONS.get(key)
+        if action:
+            self.input_queue.press(action)
 
+        elif key == arcade.key.F3 and self.simulation is not None:
+            if self.profiler:
+                self.stop_profiler()
+            else:
+                self.start_profiler()
 
     def on_key_release(self, key, modifiers):
-        if key == arcade.key.LEFT or key == arcade.key.A:
-            self.key_left_pressed = False
-        if key == arcade.key.RIGHT or key == arcade.key.D:
-            self.key_right_pressed = False
-
-    def center_camera_to_player(self):
-        screen_center_x = self.player_sprite.center_x - (self.camera.viewport_width / 2)
-        screen_center_y = self.player_sprite.center_y - (self.camera.viewport_height / 2)
-
-        # Don't let camera travel past 0
-        if screen_center_x < 0:
-            screen_center_x = 0
-        if screen_center_y < 0:
-            screen_center_y = 0
-
-        self.map_height = self.tile_map.height * self.tile_map.tile_height
-        self.map_width = self.tile_map.width * self.tile_map.tile_width
-
-        self.test = screen_center_y
-        if screen_center_x + self.camera.viewport_width > self.map_width:
-            screen_center_x = self.map_width - self.camera.viewport_width
-
-        if screen_center_y + self.camera.viewport_height > self.map_height:
-            screen_center_y = self.map_height - self.camera.viewport_height
-
-        player_centered = screen_center_x, screen_center_y
-        self.camera.move_to(player_centered)
-
-    def player_movement(self):
-        current_time = time.time()
-        # Fix in the player_movement method
-        if self.dashing:
-            if current_time > self.dash_end_time:
-                self.end_dash()
-            else:
-                # Update dash animation frame based on the timer
-                if current_time - self.dash_frame_timer > self.dash_frame_duration:
-                    self.dash_frame_timer = current_time
-                    self.dash_frame_index = (self.dash_frame_index + 1) % 4  # Loop through dash frames
-
-                    if self.last_dash_direction == "left":
-                        self.player_sprite.texture = self.player_sprite_images_dash_left[self.dash_frame_index]
-                    elif self.last_dash_direction == "right":
-                        self.player_sprite.texture = self.player_sprite_images_dash_right[self.dash_frame_index]
-
-                if self.last_dash_direction == "left":
-                    self.player_sprite.center_x -= DASH_SPEED
-                    if self.collide_left:  # Check the boolean value directly
-                        self.player_sprite.center_x += DASH_SPEED  # Move back if collision detected
-                        self.end_dash()
-                elif self.last_dash_direction == "right":
-                    self.player_sprite.center_x += DASH_SPEED
-                    if self.collide_right:  # Check the boolean value directly
-                        self.player_sprite.center_x -= DASH_SPEED  # Move back if collision detected
-                        self.end_dash()
-                return  # Exit early during dash
-
-        # When player hits the collision
-        if self.collide:
-            self.player_dy = 0
-            self.fall_speed = 0  # Reset fall speed on collision
-        else:
-            self.player_dy = PLAYER_Y_SPEED + self.fall_speed
-
-        if self.key_left_pressed and not self.collide_left:
-            self.player_sprite.center_x -= self.player_dx
-            self.player_sprite.texture = self.player_sprite_images_left[
-                int(self.player_sprite.center_x / PLAYER_SPRITE_IMAGE_CHANGE_SPEED) % 4]
-
-        if self.key_right_pressed and not self.collide_right:
-            self.player_sprite.center_x += self.player_dx
-            self.player_sprite.texture = self.player_sprite_images_right[
-                int(self.player_sprite.center_x / PLAYER_SPRITE_IMAGE_CHANGE_SPEED) % 4]
-
-        if self.player_jump:
-            if self.last_button_x == "Right":
-                if current_time - self.jump_frame_timer > self.jump_frame_duration:
-                    self.jump_frame_timer = current_time
-                    self.jump_frame_index = (self.jump_frame_index + 1) % 3  # Loop through jump frames
-                self.player_sprite.texture = self.player_sprite_images_up_right[self.jump_frame_index]
-            distance_covered = self.player_sprite.center_y - self.jump_start
-
-            if self.last_button_x == "Left":
-                if current_time - self.jump_frame_timer > self.jump_frame_duration:
-                    self.jump_frame_timer = current_time
-                    self.jump_frame_index = (self.jump_frame_index + 1) % 3  # Loop through jump frames
-                self.player_sprite.texture = self.player_sprite_images_up_left[self.jump_frame_index]
-            distance_covered = self.player_sprite.center_y - self.jump_start
-            distance_left = JUMP_MAX_HEIGHT - distance_covered
-            jump_speed_ratio = max(distance_left / JUMP_MAX_HEIGHT, 0.1)  # Minimum ratio to ensure some speed
-            adjusted_jump_speed = self.jump_speed * jump_speed_ratio * GRAVITY
-            self.player_sprite.center_y += adjusted_jump_speed
-
-            self.player_sprite.center_y += self.player_dy
-            if self.player_sprite.center_y >= self.jump_start + JUMP_MAX_HEIGHT:
-                self.player_jump = False
-                self.fall_speed = adjusted_jump_speed  # Set fall speed to the speed at the highest point
-        else:
-            if self.last_button_x == "Left":
-                self.player_sprite.texture = self.player_sprite_images_left[
-                    int(self.player_sprite.center_x / PLAYER_SPRITE_IMAGE_CHANGE_SPEED) % 4]
-            elif self.last_button_x == "Right":
-                self.player_sprite.texture = self.player_sprite_images_right[
-                    int(self.player_sprite.center_x / PLAYER_SPRITE_IMAGE_CHANGE_SPEED) % 4]
-
-            self.player_sprite.center_y -= self.player_dy
-
-        if not self.collide and not self.player_jump:
-            self.fall_speed = min(self.fall_speed + GRAVITY, MAX_FALL_SPEED)  # Increase fall speed over time
-
-    def start_dash(self):
-        current_time = time.time()
-
-        if current_time - self.last_dash_time >= self.dash_cooldown:
-            self.dashing = True
-            self.dash_end_time = current_time + DASH_DURATION
-            self.last_dash_time = current_time  # Update last dash time
-            self.dash_frame_index = 0  # Reset dash frame index
-            self.dash_frame_timer = current_time  # Reset dash frame timer
-
-            if self.last_button_x == "Left":
-                self.last_dash_direction = "left"
-            elif self.last_button_x == "Right":
-                self.last_dash_direction = "right"
-
-            # Set the initial dash texture
-            if self.last_dash_direction == "left":
-                self.player_sprite.texture = self.player_sprite_images_dash_left[self.dash_frame_index]
-            elif self.last_dash_direction == "right":
-                self.player_sprite.texture = self.player_sprite_images_dash_right[self.dash_frame_index]
-
-    def end_dash(self):
-        self.dashing = False
-        # Reset to the appropriate walking texture
-        if self.last_button_x == "Left":
-            self.player_sprite.texture = self.player_sprite_images_left[
-                int(self.player_sprite.center_x / PLAYER_SPRITE_IMAGE_CHANGE_SPEED) % 4]
-        elif self.last_button_x == "Right":
-            self.player_sprite.texture = self.player_sprite_images_right[
-                int(self.player_sprite.center_x / PLAYER_SPRITE_IMAGE_CHANGE_SPEED) % 4]
-
-    def calculate_collision(self):
-        self.collide_coin = False
-        self.collide = False
-        self.collide_left = False
-        self.collide_right = False
-        self.collide_top = False
-        for block in self.scene["platforms01"]:
-            if (self.player_sprite.center_x + self.player_sprite.width / 5 > block.center_x - block.width / 2
-                    and self.player_sprite.center_x - self.player_sprite.width / 5 < block.center_x + block.width / 2
-                    and self.player_sprite.center_y - self.player_sprite.height / 2 <= block.center_y + block.height / 2
-                    and self.player_sprite.center_y - self.player_sprite.height / 2 >= block.center_y - block.height / 2):
-                self.player_sprite.center_y = block.center_y + block.height / 2 + self.player_sprite.height / 2
-                self.collide = True
-            if (self.player_sprite.center_y + self.player_sprite.height / 4 >= block.center_y - block.height / 2
-                    and self.player_sprite.center_y - self.player_sprite.height / 4 <= block.center_y + block.height / 2
-                    and self.player_sprite.center_x - self.player_sprite.width / 4 <= block.center_x + block.width / 2
-                    and self.player_sprite.center_x - self.player_sprite.width / 4 >= block.center_x - block.width / 2):
-                self.player_sprite.center_x = block.center_x + block.width / 2 + self.player_sprite.width / 4
-                self.collide_left = True
-            if (self.player_sprite.center_y + self.player_sprite.height / 4 > block.center_y - block.height / 2
-                    and self.player_sprite.center_y - self.player_sprite.height / 4 < block.center_y + block.height / 2
-                    and self.player_sprite.center_x + self.player_sprite.width / 4 >= block.center_x - block.width / 2
-                    and self.player_sprite.center_x + self.player_sprite.width / 4 <= block.center_x + block.width / 2):
-                self.player_sprite.center_x = block.center_x - block.width / 2 - self.player_sprite.width / 4
-                self.collide_right = True
-            if (self.player_sprite.center_x + self.player_sprite.width / 5 > block.center_x - block.width / 2
-                    and self.player_sprite.center_x - self.player_sprite.width / 5 < block.center_x + block.width / 2
-                    and self.player_sprite.center_y + self.player_sprite.height / 2 >= block.center_y - block.height / 2
-                    and self.player_sprite.center_y + self.player_sprite.height / 2 <= block.center_y + block.height / 2):
-                self.player_sprite.center_y = block.center_y - block.height / 2 - self.player_sprite.height / 2
-                self.player_jump = False
-                self.collide_top = True
-        for block in self.scene["spikes"]:
-            if (self.player_sprite.center_x + self.player_sprite.width / 5 > block.center_x - block.width / 2
-                    and self.player_sprite.center_x - self.player_sprite.width / 5 < block.center_x + block.width / 2
-                    and self.player_sprite.center_y - self.player_sprite.height / 2 <= block.center_y + block.height / 2
-                    and self.player_sprite.center_y - self.player_sprite.height / 2 >= block.center_y - block.height / 2):
-                self.player_sprite.center_y = block.center_y + block.height / 2 + self.player_sprite.height / 2
-                self.collide = True
-                if self.level == 1:
-                    self.player_sprite.center_x = PLAYER_START_X_1
-                    self.player_sprite.center_y = PLAYER_START_Y_1
-                if self.level == 2:
-                    self.player_sprite.center_x = PLAYER_START_X_2
-                    self.player_sprite.center_y = PLAYER_START_Y_2
-        for block in self.scene["coins"]:
-            if (self.player_sprite.center_x + self.player_sprite.width / 5 > block.center_x - block.width / 2
-                    and self.player_sprite.center_x - self.player_sprite.width / 5 < block.center_x + block.width / 2
-                    and self.player_sprite.center_y - self.player_sprite.height / 2 <= block.center_y + block.height / 2
-                    and self.player_sprite.center_y - self.player_sprite.height / 2 >= block.center_y - block.height / 2):
-                self.collide_coin = True
-                block.remove_from_sprite_lists()
-                self.score += 1
-            if (self.player_sprite.center_y + self.player_sprite.height / 4 >= block.center_y - block.height / 2
-                    and self.player_sprite.center_y - self.player_sprite.height / 4 <= block.center_y + block.height / 2
-                    and self.player_sprite.center_x - self.player_sprite.width / 4 <= block.center_x + block.width / 2
-                    and self.player_sprite.center_x - self.player_sprite.width / 4 >= block.center_x - block.width / 2):
-                self.collide_coin = True
-                block.remove_from_sprite_lists()
-                self.score += 1
-            if (self.player_sprite.center_y + self.player_sprite.height / 4 > block.center_y - block.height / 2
-                    and self.player_sprite.center_y - self.player_sprite.height / 4 < block.center_y + block.height / 2
-                    and self.player_sprite.center_x + self.player_sprite.width / 4 >= block.center_x - block.width / 2
-                    and self.player_sprite.center_x + self.player_sprite.width / 4 <= block.center_x + block.width / 2):
-                self.collide_coin = True
-                block.remove_from_sprite_lists()
-                self.score += 1
-            if (self.player_sprite.center_x + self.player_sprite.width / 5 > block.center_x - block.width / 2
-                    and self.player_sprite.center_x - self.player_sprite.width / 5 < block.center_x + block.width / 2
-                    and self.player_sprite.center_y + self.player_sprite.height / 2 >= block.center_y - block.height / 2
-                    and self.player_sprite.center_y + self.player_sprite.height / 2 <= block.center_y + block.height / 2):
-                self.collide_coin = True
-                block.remove_from_sprite_lists()
-                self.score += 1
-        if self.level == 2:
-            for block in self.scene["honey"]:
-                if block.center_x + block.width / 2 >= self.player_sprite.center_x >= block.center_x - block.width / 2 \
-                        and block.center_y + block.height / 2 >= self.player_sprite.center_y >= block.center_y - block.height / 2:
-                    arcade.exit()
+        action = KEY_ACTIONS.get(key)
+        if action:
+            self.input_queue.release(action)
+
+    def center_camera_to_player(self, x, y):
+        """Follow the player drawn at (x, y) for the physics steps since the last frame."""
+        render_steps = self.timestep.steps + self.timestep.alpha
+        position = self.camera_controller.follow(x, y, max(0.0, render_steps - self.camera_steps))
+        self.camera_steps = render_steps
+        if self.camera_controller.moved:
+            self.camera.move_to(position)
 
     def on_update(self, delta_time):
-        self.center_camera_to_player()
-        self.player_movement()
-
-        if self.player_jump:
-            self.collide = False
-        else:
-            self.calculate_collision()
-
-        self.total_time += delta_time
-
-        ms, sec = math.modf(self.total_time)
-
-        minutes = int(sec) // 60
-
-        seconds = int(sec) % 60
-
-        msec = int(ms * 100)
-
-        self.total_time_print = f"{minutes:02d}:{seconds:02d}:{msec:02d}"
-
-        if self.level == 1:
-            if self.player_sprite.center_y < -50:
-                self.player_sprite.center_x = PLAYER_START_X_1
-                self.player_sprite.center_y = PLAYER_START_Y_1
-        if self.level == 2:
-            if self.player_sprite.center_y < -50:
-                self.player_sprite.center_x = PLAYER_START_X_2
-                self.player_sprite.center_y = PLAYER_START_Y_2
-
-        if self.player_sprite.center_x >= self.end_of_map:
-            if self.level < NUMBER_OF_LEVELS:
-                self.level += 1
-            else:
-                arcade.exit()
-
+        if self.simulation is None:
+            # Set up once the worker has built the first level, and start the clock from there
+            if self.preloader.ready(1) is None:
+                return
             self.setup()
+            self.timestep.reset()
+            if self.startup:
+                self.startup.mark(SCENE)
+            return
+
+        if self.transition_meter:
+            self.transition_meter.frame()
+        if self.profiler:
+            self.profiler.frame()
+
+        for _ in range(self.timestep.advance(delta_time)):
+            inputs = self.input_queue.state()
+            if self.recorder:
+                self.recorder.record(inputs)
+            events = self.simulation.step(inputs)
+            self.ghost_recorder.record(self.simulation, self.animator.texture)
+            if self.latency_meter:
+                self.latency_meter.stepped(self.input_queue.applied, events)
+            self.handle_events(events)
+
+        self.warm_up_levels()
+
+        if self.animator.update(self.simulation):
+            self.switch_player_texture(self.animator.texture)
+
+        self.hud.update(self.simulation.total_time, self.simulation.score)
+
+    def switch_player_texture(self, texture):
+        name, index = texture
+        self.player_sprite.texture = self.player_textures[name][index]
+        self.player_texture = texture
+
+    def handle_events(self, events):
+        """Mirror what happened in the simulation step on the sprites."""
+        for event, value in events:
+            if event == EVENT_COIN:
+                if self.streaming_map:
+                    self.streaming_map.remove_tile("coins", value)
+                else:
+                    self.culled_layers.remove("coins", self.coins_list[value])
+            elif event == EVENT_LEVEL:
+                self.finish_ghost()
+                self.load_scene()
+                if self.transition_meter:
+                    self.transition_meter.level_changed(value)
+            elif event == EVENT_EXIT:
+                self.finish_ghost()
+                arcade.exit()
 
 
-def main():
-    """Main function"""
-    window = MyGame()
-    window.setup()
+def main(started=None):
+    """Main function; started is when play.py was launched, for --profile-startup"""
+    parser = argparse.ArgumentParser(description=SCREEN_TITLE)
+    parser.add_argument("--measure-transitions", action="store_true",
+                        help="print the worst frame time around every level change")
+    parser.add_argument("--map", help="play this Tiled map (e.g. one made by mapgen.py) as level 1")
+    parser.add_argument("--record", metavar="PATH", help="save the inputs of this run as a replay (see replay.py)")
+    parser.add_argument("--measure-latency", action="store_true",
+                        help="print the time from key press to the frame showing it, per action, on exit")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print how long each startup phase took, once the first level can be played")
+    parser.add_argument("--profile", action="store_true", help="start with the profiling overlay on (F3 toggles it)")
+    parser.add_argument("--profile-export", metavar="PATH",
+                        help="save the profiled frames to a .csv or .json file on exit")
+    args = parser.parse_args()
+
+    startup = None
+    if args.profile_startup:
+        startup = StartupProfile(process_started() if started is None else started)
+        startup.mark(IMPORTS)
+    window = MyGame(measure_transitions=args.measure_transitions, map_name=args.map, record=bool(args.record),
+                    profile=args.profile or bool(args.profile_export), measure_latency=args.measure_latency,
+                    startup=startup)
+    # setup() runs from on_update once the first level is built
     arcade.run()
+    window.preloader.shutdown()
+    if window.recorder:
+        window.recorder.finish().save(args.record)
+    if window.latency_meter:
+        window.latency_meter.report()
+    if window.profiler and args.profile_export:
+        window.profiler.export(args.profile_export)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
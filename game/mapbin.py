@@ -0,0 +1,284 @@
+"""
+Compiled binary maps.
+
+Tiled JSON stores every layer as a long text array of GIDs that has to be
+parsed on every level load. compile_map() turns a map into a binary file next
+to it (map1.json -> map1.bin), a fraction of the JSON's size, with:
+
+    header      magic, version, map size, tile size, record counts
+    tilesets    firstgid, tile size, columns, count, margin, spacing, image
+    layers      name, opacity, palette, indices and cells of a packed layer
+    grids       the CollisionGrid of every collision layer, ready to use
+    objects     the objects of the object layers, as JSON
+    data        the arrays, aligned to 8 bytes
+
+A layer is packed as its palette, the distinct GIDs it uses (uint32), and
+for every cell the index of its GID in the palette, one byte while there are
+at most 256 of them. Mostly empty layers keep only their non-empty cells,
+with the number of each cell (uint16 on maps of up to 65536 cells).
+
+load_map_binary() memory-maps the file, unpacks the layers into GID arrays
+and hands out the collision grids as memoryviews of the mapping, so nothing
+is parsed and the grids are not copied. load_map() uses the compiled file
+when it is newer than the JSON and falls back to JSON otherwise.
+
+    python mapbin.py map/map1.json map/map2.json
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+from collision import COLLISION_LAYERS, CollisionGrid
+from level_data import LevelData, MapObject, Tileset, load_level_data
+
+MAGIC = b"BEARMAP\0"
+VERSION = 3
+
+HEADER = struct.Struct("<8sHHIIIIHHH")
+TILESET = struct.Struct("<IIIIIIIH")
+LAYER = struct.Struct("<HfB?IIIII")
+GRID = struct.Struct("<HddIIIIII")
+OBJECTS = struct.Struct("<I")
+
+#memoryview.cast works in native byte order; the file is little-endian
+NATIVE_LITTLE_ENDIAN = sys.byteorder == "little"
+
+#Typecode of palette indices and cell numbers by their size in bytes
+TYPECODES = {1: "B", 2: "H", 4: "I"}
+
+
+def binary_path(map_name):
+    return os.path.splitext(map_name)[0] + ".bin"
+
+
+def _align(offset, alignment=8):
+    return -(-offset // alignment) * alignment
+
+
+def _smallest_typecode(largest):
+    """Typecode of the smallest unsigned array that holds 0..largest."""
+    for size, typecode in TYPECODES.items():
+        if largest < 1 << 8 * size:
+            return typecode
+    raise ValueError(f"{largest} does not fit in 32 bits")
+
+
+def _cell_typecode(level):
+    return _smallest_typecode(level.width * level.height - 1)
+
+
+def pack_layer(data, cell_typecode):
+    """
+    A layer as (palette, indices, cells).
+
+    cells, the numbers of the non-empty cells, is None when every cell is
+    kept; indices then has one entry per cell.
+    """
+    palette = sorted(set(data))
+    typecode = _smallest_typecode(len(palette) - 1)
+    position = {gid: index for index, gid in enumerate(palette)}
+    filled = [cell for cell, gid in enumerate(data) if gid]
+    index_size = array(typecode).itemsize
+    if len(filled) * (index_size + array(cell_typecode).itemsize) < len(data) * index_size:
+        return (array("I", palette), array(typecode, [position[data[cell]] for cell in filled]),
+                array(cell_typecode, filled))
+    return array("I", palette), array(typecode, [position[gid] for gid in data]), None
+
+
+def unpack_layer(palette, indices, cells, length):
+    """The GIDs of a layer packed by pack_layer()."""
+    lookup = palette.tolist().__getitem__
+    if cells is None:
+        return array("I", map(lookup, indices))
+    data = array("I", bytes(4 * length))
+    for cell, gid in zip(cells, map(lookup, indices)):
+        data[cell] = gid
+    return data
+
+
+def compile_map(map_name, output=None):
+    """Compile a Tiled JSON map. Returns the path of the binary file."""
+    output = output or binary_path(map_name)
+    level = load_level_data(map_name)
+    map_dir = os.path.dirname(os.path.abspath(map_name))
+
+    blobs = []
+
+    def add_blob(values):
+        blobs.append(values)
+        return len(blobs) - 1
+
+    tileset_records = []
+    for tileset in level.tilesets:
+        image = os.path.relpath(tileset.image, map_dir).encode("utf-8") if tileset.image else b""
+        tileset_records.append((tileset, image))
+
+    layer_records = []
+    cell_typecode = _cell_typecode(level)
+    for name, data in level.layers.items():
+        palette, indices, cells = pack_layer(data, cell_typecode)
+        layer_records.append((name.encode("utf-8"), level.layer_opacity.get(name, 1.0), indices.itemsize,
+                              cells is not None, add_blob(palette), len(palette), add_blob(indices),
+                              len(indices), add_blob(cells) if cells is not None else None))
+
+    grid_records = []
+    for name in COLLISION_LAYERS:
+        if name not in level.layers:
+            continue
+        cell_width, cell_height, rects, cells, indices = CollisionGrid.from_layer(level, name).pack()
+        grid_records.append((name.encode("utf-8"), cell_width, cell_height,
+                             add_blob(array("d", rects)), len(rects),
+                             add_blob(array("i", cells)), len(cells),
+                             add_blob(array("i", indices)), len(indices)))
+
+    objects = json.dumps([map_object.as_tuple() for map_object in level.objects]).encode("utf-8")
+
+    # Every record has a fixed size apart from its name, so the blobs can be
+    # placed before the records are written
+    records_size = HEADER.size
+    records_size += sum(TILESET.size + len(image) for tileset, image in tileset_records)
+    records_size += sum(LAYER.size + len(record[0]) for record in layer_records)
+    records_size += sum(GRID.size + len(record[0]) for record in grid_records)
+    records_size += OBJECTS.size + len(objects)
+    offsets = []
+    offset = _align(records_size)
+    for blob in blobs:
+        offsets.append(offset)
+        offset = _align(offset + len(blob) * blob.itemsize)
+
+    out = bytearray(HEADER.pack(MAGIC, VERSION, 0, level.width, level.height, level.tile_width,
+                                level.tile_height, len(tileset_records), len(layer_records),
+                                len(grid_records)))
+    for tileset, image in tileset_records:
+        out += TILESET.pack(tileset.firstgid, tileset.tile_width, tileset.tile_height, tileset.columns,
+                            tileset.tile_count, tileset.margin, tileset.spacing, len(image))
+        out += image
+    for name, opacity, index_size, sparse, palette, palette_length, indices, indices_length, cells \
+            in layer_records:
+        out += LAYER.pack(len(name), opacity, index_size, sparse, offsets[palette], palette_length,
+                          offsets[indices], indices_length, offsets[cells] if sparse else 0)
+        out += name
+    for name, cell_width, cell_height, rects, rects_length, cells, cells_length, indices, indices_length \
+            in grid_records:
+        out += GRID.pack(len(name), cell_width, cell_height, offsets[rects], rects_length,
+                         offsets[cells], cells_length, offsets[indices], indices_length)
+        out += name
+    out += OBJECTS.pack(len(objects))
+    out += objects
+
+    for blob, blob_offset in zip(blobs, offsets):
+        out += bytes(blob_offset - len(out))
+        if not NATIVE_LITTLE_ENDIAN:
+            blob = array(blob.typecode, blob)
+            blob.byteswap()
+        out += blob.tobytes()
+
+    # Written next to it and renamed over it: a game that has the old file
+    # mapped keeps reading the old file instead of one truncated under it
+    descriptor, temporary = tempfile.mkstemp(prefix=os.path.basename(output) + ".", suffix=".tmp",
+                                             dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        with os.fdopen(descriptor, "wb") as binary_file:
+            binary_file.write(out)
+        # mkstemp makes the file private; give it the mode open() would have
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temporary, 0o666 & ~umask)
+        os.replace(temporary, output)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return output
+
+
+def _view(buffer, typecode, offset, length):
+    """A typed view of part of the file, a copy only on big-endian machines."""
+    size = array(typecode).itemsize
+    view = memoryview(buffer)[offset:offset + length * size]
+    if NATIVE_LITTLE_ENDIAN:
+        return view.cast(typecode)
+    values = array(typecode, view.tobytes())
+    values.byteswap()
+    return values
+
+
+def load_map_binary(path):
+    """Map a compiled map into memory as a LevelData."""
+    with open(path, "rb") as binary_file:
+        buffer = mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    (magic, version, flags, width, height, tile_width, tile_height,
+     tileset_count, layer_count, grid_count) = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} compiled map")
+    offset = HEADER.size
+    map_dir = os.path.dirname(os.path.abspath(path))
+
+    tilesets = []
+    for _ in range(tileset_count):
+        firstgid, tile_w, tile_h, columns, tile_count, margin, spacing, image_length = \
+            TILESET.unpack_from(buffer, offset)
+        offset += TILESET.size
+        image = buffer[offset:offset + image_length].decode("utf-8")
+        offset += image_length
+        tilesets.append(Tileset(firstgid, tile_w, tile_h, os.path.join(map_dir, image) if image else None,
+                                columns, tile_count, margin, spacing))
+
+    layers = {}
+    layer_opacity = {}
+    cell_typecode = _smallest_typecode(width * height - 1)
+    for _ in range(layer_count):
+        (name_length, opacity, index_size, sparse, palette, palette_length, indices, indices_length,
+         cells) = LAYER.unpack_from(buffer, offset)
+        offset += LAYER.size
+        name = buffer[offset:offset + name_length].decode("utf-8")
+        offset += name_length
+        layers[name] = unpack_layer(_view(buffer, "I", palette, palette_length),
+                                    _view(buffer, TYPECODES[index_size], indices, indices_length),
+                                    _view(buffer, cell_typecode, cells, indices_length) if sparse else None,
+                                    width * height)
+        if opacity != 1:
+            layer_opacity[name] = opacity
+
+    collision_grids = {}
+    for _ in range(grid_count):
+        (name_length, cell_width, cell_height, rects, rects_length, cells, cells_length,
+         indices, indices_length) = GRID.unpack_from(buffer, offset)
+        offset += GRID.size
+        name = buffer[offset:offset + name_length].decode("utf-8")
+        offset += name_length
+        collision_grids[name] = (cell_width, cell_height,
+                                 _view(buffer, "d", rects, rects_length),
+                                 _view(buffer, "i", cells, cells_length),
+                                 _view(buffer, "i", indices, indices_length))
+
+    objects_length, = OBJECTS.unpack_from(buffer, offset)
+    offset += OBJECTS.size
+    objects = [MapObject(*values) for values in json.loads(buffer[offset:offset + objects_length])]
+
+    return LevelData(width, height, tile_width, tile_height, layers, tilesets, layer_opacity,
+                     collision_grids, objects)
+
+
+def load_map(map_name):
+    """Load a map from its compiled file when that is up to date, else from the JSON."""
+    path = binary_path(map_name)
+    try:
+        if os.path.getmtime(path) >= os.path.getmtime(map_name):
+            return load_map_binary(path)
+    except (OSError, ValueError):
+        pass
+    return load_level_data(map_name)
+
+
+def main():
+    for map_name in sys.argv[1:]:
+        print(f"{map_name} -> {compile_map(map_name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Synthetic level generator.
+
+Builds maps of any size out of the tiles the shipped levels use: a solid
+backdrop, some background walls, a floor along the bottom, floating
+platforms with coins above them and spikes on the floor. A markers object
+layer puts the spawn point on the floor at the level 1 start point and a
+checkpoint on the floor every CHECKPOINT_SPACING cells; the right edge ends
+the level as usual. Used to try out and benchmark levels far larger than
+map1/map2.
+
+    python mapgen.py map/big.json 2000 200 [seed]
+    python mapbin.py map/big.json
+"""
+import json
+import os
+import random
+import sys
+from array import array
+
+from level_data import LevelData, MapObject, load_level_data
+from levels import SPAWN, CHECKPOINT, DEFAULT_SPAWN
+
+TILESET_SOURCE = "tiles_set.tsx"
+
+#GIDs from tiles_set.tsx, as used in map1
+BACKDROP = 147
+WALLS = (299, 300, 301, 303)
+PLATFORM = 100
+SPIKE = 140
+COIN = 342
+
+#Layers in draw order, bottom first
+LAYER_NAMES = ("solid back", "background_walls", "platforms01", "spikes", "coins")
+
+#Cells between platforms, and how many cells one platform tile covers
+PLATFORM_SPACING = 12
+TILE_CELLS = 2
+
+#Cells between checkpoints, and the height of their areas above the floor
+CHECKPOINT_SPACING = 120
+CHECKPOINT_HEIGHT = 256
+
+
+def generate_level(width, height, seed=0, map_dir=None):
+    """A LevelData of width x height cells, the same for the same seed."""
+    map_dir = map_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), "map")
+    tilesets = load_level_data(os.path.join(map_dir, "map1.json")).tilesets
+    rng = random.Random(seed)
+    layers = {name: array("I", bytes(4 * width * height)) for name in LAYER_NAMES}
+
+    def put(name, column, row, gid):
+        if 0 <= column < width and 0 <= row < height:
+            layers[name][row * width + column] = gid
+
+    for row in range(0, height, TILE_CELLS):
+        for column in range(0, width, TILE_CELLS):
+            put("solid back", column, row, BACKDROP)
+            if rng.random() < 0.05:
+                put("background_walls", column, row, rng.choice(WALLS))
+
+    # Floor along the bottom row, spikes on it away from the spawn point
+    floor_row = height - 1
+    for column in range(0, width, TILE_CELLS):
+        put("platforms01", column, floor_row, PLATFORM)
+        if column > PLATFORM_SPACING and rng.random() < 0.03:
+            put("spikes", column, floor_row - TILE_CELLS, SPIKE)
+
+    # Floating platforms at random heights above the floor
+    row = floor_row - 4
+    for column in range(PLATFORM_SPACING, width - PLATFORM_SPACING, PLATFORM_SPACING):
+        row = min(floor_row - 4, max(2, row + rng.choice((-4, -2, 0, 2, 4))))
+        length = rng.randint(2, 4)
+        for tile in range(length):
+            put("platforms01", column + tile * TILE_CELLS, row, PLATFORM)
+        if rng.random() < 0.5:
+            put("coins", column + length // 2 * TILE_CELLS, row - TILE_CELLS, COIN)
+
+    # Markers, the floor tiles being TILE_CELLS cells high
+    floor_top = TILE_CELLS * 32
+    objects = [MapObject("markers", SPAWN, "start", *DEFAULT_SPAWN)]
+    for column in range(CHECKPOINT_SPACING, width - PLATFORM_SPACING, CHECKPOINT_SPACING):
+        objects.append(MapObject("markers", CHECKPOINT, f"checkpoint {len(objects)}", column * 32, floor_top,
+                                 TILE_CELLS * 32, CHECKPOINT_HEIGHT))
+
+    return LevelData(width, height, 32, 32, layers, tilesets, objects=objects)
+
+
+def write_tiled_json(level, path):
+    """Save a generated level as a Tiled JSON map next to tiles_set.tsx."""
+    tiled = {
+        "compressionlevel": -1, "width": level.width, "height": level.height, "infinite": False,
+        "orientation": "orthogonal", "renderorder": "right-down", "type": "map", "version": "1.10",
+        "tilewidth": level.tile_width, "tileheight": level.tile_height,
+        "tilesets": [{"firstgid": 1, "source": TILESET_SOURCE}],
+        "layers": [],
+    }
+    for layer_id, (name, data) in enumerate(level.layers.items(), start=1):
+        tiled["layers"].append({"id": layer_id, "name": name, "type": "tilelayer", "data": list(data),
+                                "width": level.width, "height": level.height, "x": 0, "y": 0,
+                                "opacity": 1, "visible": True})
+    objects = []
+    for object_id, map_object in enumerate(level.objects, start=1):
+        objects.append({"id": object_id, "name": map_object.name, "type": map_object.kind,
+                        "x": map_object.left, "y": level.pixel_height - map_object.top,
+                        "width": map_object.width, "height": map_object.height, "rotation": 0, "visible": True,
+                        **({"point": True} if not map_object.width and not map_object.height else {})})
+    tiled["layers"].append({"id": len(tiled["layers"]) + 1, "name": "markers", "type": "objectgroup",
+                            "draworder": "topdown", "objects": objects, "x": 0, "y": 0, "opacity": 1,
+                            "visible": True})
+    tiled["nextlayerid"] = len(tiled["layers"]) + 1
+    tiled["nextobjectid"] = len(objects) + 1
+    with open(path, "w", encoding="utf-8") as map_file:
+        json.dump(tiled, map_file, separators=(",", ":"))
+
+
+def main():
+    path, width, height = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    write_tiled_json(generate_level(width, height, seed), path)
+    print(f"{path}: {width}x{height}")
+
+
+if __name__ == "__main__":
+    main()
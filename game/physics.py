@@ -0,0 +1,68 @@
+"""
+Fixed timestep clock for the game physics.
+
+The movement constants in simulation.py (PLAYER_X_SPEED, GRAVITY, DASH_SPEED,
+...) are amounts per physics step of PHYSICS_STEP seconds. Running the physics
+at that fixed step instead of once per rendered frame keeps them the same per
+second of game time at any frame rate, and lets the simulation run faster than
+real time. Simulation.step() always advances the game clock, which the dash,
+the dash cooldown, the jump buffer and coyote time are timed on, by
+PHYSICS_STEP, as movement does not scale with the step.
+"""
+
+#Physics runs at arcade's default update rate, which the constants were tuned for
+PHYSICS_STEP = 1 / 60
+
+#Most steps run for one rendered frame; time beyond that is dropped
+MAX_STEPS_PER_UPDATE = 5
+
+
+class FixedTimestep:
+    """
+    Accumulates frame time and hands it out as whole physics steps.
+    """
+    def __init__(self, step=PHYSICS_STEP, max_steps=MAX_STEPS_PER_UPDATE):
+        self.step = step
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+
+        # Simulation time in seconds, advanced only by whole steps
+        self.time = 0.0
+        self.steps = 0
+
+        # Time dropped because a frame needed more than max_steps
+        self.dropped_time = 0.0
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.time = 0.0
+        self.steps = 0
+        self.dropped_time = 0.0
+
+    def advance(self, delta_time):
+        """
+        Add a frame's delta_time and return how many steps to run now.
+
+        After a hitch up to max_steps catch-up steps are returned; anything
+        left over is dropped so a slow frame can't cause a slower next frame.
+        """
+        self.accumulator += delta_time
+        # The small bias stops 1/60 + 1/60 from rounding down to one step
+        steps = int(self.accumulator / self.step + 1e-9)
+        if steps > self.max_steps:
+            self.dropped_time += (steps - self.max_steps) * self.step
+            self.accumulator -= (steps - self.max_steps) * self.step
+            steps = self.max_steps
+        self.accumulator = max(self.accumulator - steps * self.step, 0.0)
+        self.time += steps * self.step
+        self.steps += steps
+        return steps
+
+    @property
+    def alpha(self):
+        """How far the render time is between the last step and the next one, 0..1."""
+        return self.accumulator / self.step
+
+
+def interpolate(previous, current, alpha):
+    return previous + (current - previous) * alpha
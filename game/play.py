@@ -0,0 +1,20 @@
+"""
+Starts the game, like python main.py, but notes the time before anything
+else is imported, so --profile-startup counts arcade and the game modules
+too. Run this one to measure startup:
+
+    python play.py --profile-startup
+"""
+import time
+
+#When the game started, for --profile-startup
+STARTED = time.perf_counter()
+
+
+def run():
+    import main
+    main.main(STARTED)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,131 @@
+"""
+Background level loading.
+
+While level n is played, once its own setup is done, a worker thread parses
+level n+1 and builds its collision grids and (lazy) tile sprites, so reaching
+end_of_map only swaps in what is already prepared instead of parsing a map
+inside one frame.
+
+The OpenGL side (sprite buffers, texture uploads, layer baking) has to happen
+on the main thread; PreparedLevel.warm_up() does it one small piece per frame
+before the player gets to the end of the map.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from baking import BakedLayers
+
+#Frames after a level change that count towards the transition hitch
+TRANSITION_FRAMES = 10
+
+
+class PreparedLevel:
+    """
+    A level loaded off the main thread: simulation data, lazy scene and a
+    not yet baked BakedLayers.
+    """
+    def __init__(self, loaded, scene, chunk_width, chunk_height):
+        level_data = loaded.level_data
+        self.loaded = loaded
+        self.scene = scene
+        self.baked_layers = BakedLayers(scene, level_data.pixel_width, level_data.pixel_height,
+                                        chunk_width, chunk_height)
+        self.uninitialized = list(scene.sprite_lists)
+        self.streaming_map = None
+
+    @property
+    def warm(self):
+        return not self.uninitialized and self.baked_layers.baked
+
+    def warm_up(self):
+        """Do one piece of the main-thread setup. Returns False once there is nothing left."""
+        if self.uninitialized:
+            self.uninitialized.pop(0).initialize()
+            return True
+        return self.baked_layers.bake_next()
+
+    def initialize(self):
+        """
+        Upload every layer's sprites and textures now. Done before the level is
+        first drawn: writing to the atlas between draws that use it makes the
+        GL driver wait for those draws, a hitch per texture.
+        """
+        while self.uninitialized:
+            self.uninitialized.pop(0).initialize()
+
+    def finish(self):
+        while self.warm_up():
+            pass
+
+
+class LevelPreloader:
+    """
+    Prepares levels on a worker thread with prepare(level).
+
+    take(level) returns the prepared result, waiting for the worker if it is
+    still busy, or prepares the level right away if nobody asked for it.
+    """
+    def __init__(self, prepare):
+        self.prepare = prepare
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="level-preload")
+        self.pending = {}
+
+        #Counters
+        self.preloaded = 0
+        self.loaded_on_demand = 0
+
+    def request(self, level):
+        if level not in self.pending:
+            self.pending[level] = self.executor.submit(self.prepare, level)
+
+    def ready(self, level):
+        """The prepared level if the worker has finished it, without waiting."""
+        future = self.pending.get(level)
+        if future is None or not future.done():
+            return None
+        return future.result()
+
+    def take(self, level):
+        future = self.pending.pop(level, None)
+        if future is None:
+            self.loaded_on_demand += 1
+            return self.prepare(level)
+        self.preloaded += 1
+        return future.result()
+
+    def shutdown(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=False)
+
+
+class TransitionMeter:
+    """
+    Reports the worst frame time around level changes.
+
+    Call frame() once per rendered frame and level_changed() when a new level
+    is swapped in; the longest frame among the next TRANSITION_FRAMES is printed.
+    """
+    def __init__(self, frames=TRANSITION_FRAMES):
+        self.frames = frames
+        self.last_frame = None
+        self.level = None
+        self.remaining = 0
+        self.worst = 0.0
+        self.results = []
+
+    def frame(self):
+        now = time.perf_counter()
+        if self.last_frame is not None and self.remaining:
+            self.worst = max(self.worst, now - self.last_frame)
+            self.remaining -= 1
+            if not self.remaining:
+                self.results.append((self.level, self.worst))
+                print(f"level {self.level} transition: worst frame {self.worst * 1000:.1f} ms")
+        self.last_frame = now
+
+    def level_changed(self, level):
+        self.level = level
+        self.remaining = self.frames
+        self.worst = 0.0
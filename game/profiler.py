@@ -0,0 +1,213 @@
+"""
+Frame profiler.
+
+Profiler measures a running game without touching the code it measures:
+timer() and counter() replace a method, on an object or on a whole class,
+with a wrapper that adds up its time or counts its calls, and remove() puts
+the original methods back. With no Profiler installed nothing is wrapped, so
+profiling costs nothing when it is off.
+
+Call frame() once per frame. It closes the frame: the time since the last
+frame() and everything timed and counted since go into ring buffers of the
+last `history` frames, which summary(), export_csv() and export_json() read.
+
+Headless, a replay can be profiled step by step, one step per frame:
+
+    python profiler.py run.replay [--csv steps.csv] [--json steps.json]
+"""
+import argparse
+import json
+import time
+from array import array
+from contextlib import contextmanager
+
+from collision import CollisionGrid
+from replay import Replay, ReplayPlayer
+
+#Frames kept in the ring buffers, ten seconds at 60 fps
+PROFILE_HISTORY = 600
+
+#Name of the time between two frame() calls
+FRAME = "frame time"
+
+
+class Profiler:
+    """
+    Per-frame timings (milliseconds) and counts, for the last `history` frames.
+    """
+    def __init__(self, history=PROFILE_HISTORY):
+        self.history = history
+        self.frames = 0
+        self.last_frame = None
+
+        # name -> ring buffer, in the order they were added
+        self.timings = {FRAME: array("d", bytes(8 * history))}
+        self.counts = {}
+
+        # Totals of the frame under way
+        self.current = {}
+
+        # (owner, name, what owner.__dict__ held before) of every wrapped method
+        self.patches = []
+
+    def timer(self, owner, name, phase=None):
+        """Add the time of every owner.name() call to `phase` (default: name)."""
+        phase = phase or name
+        self.timings.setdefault(phase, array("d", bytes(8 * self.history)))
+        current = self.current
+        clock = time.perf_counter
+        original = getattr(owner, name)
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                current[phase] = current.get(phase, 0.0) + (clock() - start) * 1000
+        self.patch(owner, name, timed)
+
+    def counter(self, owner, name, counter=None, amount=None):
+        """
+        Count owner.name() calls in `counter`.
+
+        amount(args, result) says how much a call adds; one if not given.
+        """
+        counter = counter or name
+        self.counts.setdefault(counter, array("q", bytes(8 * self.history)))
+        current = self.current
+        original = getattr(owner, name)
+
+        def counted(*args, **kwargs):
+            result = original(*args, **kwargs)
+            current[counter] = current.get(counter, 0) + (amount(args, result) if amount else 1)
+            return result
+        self.patch(owner, name, counted)
+
+    def patch(self, owner, name, wrapper):
+        self.patches.append((owner, name, vars(owner).get(name)))
+        setattr(owner, name, wrapper)
+
+    def remove(self):
+        """Put back every wrapped method, newest first."""
+        for owner, name, before in reversed(self.patches):
+            if before is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, before)
+        self.patches = []
+
+    @contextmanager
+    def scope(self, phase):
+        """Time a block of code as `phase`."""
+        self.timings.setdefault(phase, array("d", bytes(8 * self.history)))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current[phase] = self.current.get(phase, 0.0) + (time.perf_counter() - start) * 1000
+
+    def add(self, counter, amount=1):
+        self.counts.setdefault(counter, array("q", bytes(8 * self.history)))
+        self.current[counter] = self.current.get(counter, 0) + amount
+
+    def frame(self):
+        """Close the frame under way and start the next one."""
+        now = time.perf_counter()
+        if self.last_frame is not None:
+            current = self.current
+            current[FRAME] = (now - self.last_frame) * 1000
+            slot = self.frames % self.history
+            for name, ring in self.timings.items():
+                ring[slot] = current.get(name, 0.0)
+            for name, ring in self.counts.items():
+                ring[slot] = current.get(name, 0)
+            self.frames += 1
+            current.clear()
+        self.last_frame = now
+
+    @property
+    def names(self):
+        return list(self.timings) + list(self.counts)
+
+    def series(self, name=FRAME):
+        """Values of the recorded frames, oldest first; the frame times by default."""
+        ring = self.timings.get(name)
+        if ring is None:
+            ring = self.counts[name]
+        if self.frames <= self.history:
+            return list(ring[:self.frames])
+        slot = self.frames % self.history
+        return list(ring[slot:]) + list(ring[:slot])
+
+    def summary(self):
+        """name -> (mean, p95, max) over the recorded frames."""
+        result = {}
+        for name in self.names:
+            values = sorted(self.series(name))
+            if values:
+                result[name] = (sum(values) / len(values), values[int(len(values) * 0.95)], values[-1])
+        return result
+
+    def rows(self):
+        """(frame number, value of every name) of the recorded frames, oldest first."""
+        columns = [self.series(name) for name in self.names]
+        first = self.frames - len(columns[0])
+        return [(first + i, *values) for i, values in enumerate(zip(*columns))]
+
+    def export_csv(self, path):
+        with open(path, "w", encoding="utf-8") as output:
+            output.write(",".join(["frame"] + self.names) + "\n")
+            for row in self.rows():
+                output.write(",".join(f"{value:.4f}" if isinstance(value, float) else str(value)
+                                      for value in row) + "\n")
+
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as output:
+            json.dump({"frames": self.frames, "history": self.history,
+                       "timings": {name: self.series(name) for name in self.timings},
+                       "counts": {name: self.series(name) for name in self.counts},
+                       "summary": self.summary()}, output)
+
+    def export(self, path):
+        """export_json() for .json paths, export_csv() otherwise."""
+        if path.endswith(".json"):
+            self.export_json(path)
+        else:
+            self.export_csv(path)
+
+
+def profile_simulation(profiler, simulation):
+    """Time the parts of Simulation.step and count collision tests."""
+    profiler.timer(simulation, "step")
+    profiler.timer(simulation, "player_movement", "movement")
+    profiler.timer(simulation, "calculate_collision", "collision")
+    profiler.counter(CollisionGrid, "query", "collision tests", lambda args, result: len(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile a replay step by step, headless")
+    parser.add_argument("replay")
+    parser.add_argument("--csv", help="write every step's timings and counts to this CSV file")
+    parser.add_argument("--json", help="write them to this JSON file")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay)
+    player = ReplayPlayer(replay)
+    profiler = Profiler(history=max(replay.frames, 1))
+    profile_simulation(profiler, player.simulation)
+    profiler.frame()
+    for frame in range(replay.frames):
+        player.run_to(frame + 1)
+        profiler.frame()
+    profiler.remove()
+
+    for name, (mean, p95, worst) in profiler.summary().items():
+        print(f"{name:<18} mean {mean:8.3f}  p95 {p95:8.3f}  max {worst:8.3f}")
+    if args.csv:
+        profiler.export_csv(args.csv)
+    if args.json:
+        profiler.export_json(args.json)
+
+
+if __name__ == "__main__":
+    main()
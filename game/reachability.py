@@ -0,0 +1,358 @@
+"""
+Level reachability analysis.
+
+Builds a movement graph of a level by playing it: nodes are the places the
+bear can stand on, cells of NODE_CELL pixels, and edges are short input
+macros (walk with or without steering off a ledge, jump, run or jump and
+dash a little later, each to the left, right or on the spot) played on a
+headless Simulation from a snapshot of the node until the bear stands again.
+Every edge therefore follows the game's own movement and collision rules,
+whatever JUMP_MAX_HEIGHT, PLAYER_X_SPEED and DASH_SPEED are; other values are
+passed to that Simulation, the game's own constants are never changed.
+A walk that leaves the floor is a fall edge; macros that end in a respawn
+(spikes, or falling off the map) are dropped and counted as deadly.
+
+From the spawn point the analysis finds which coins can be picked up, whether
+the exit (end_of_map, or the honey) can be reached, the fastest
+route to it through the graph and a lower bound no route can beat.
+
+analyze_many() spreads maps and parameter sets over a process pool. Results
+are cached by the SHA-256 of the map file and the parameters, so unchanged
+maps are not played again.
+
+    python reachability.py [maps] [--jump-height 100 120] [--x-speed 5] [--dash-speed 15]
+"""
+import argparse
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import simulation
+from mapbin import load_map
+from physics import PHYSICS_STEP
+from simulation import (GAME_DIR, Simulation, InputState, LoadedLevel, map_path, NUMBER_OF_LEVELS,
+                        EVENT_COIN, EVENT_RESPAWN, EVENT_LEVEL, EVENT_EXIT)
+
+#Bump when the analysis changes, so cached results are worked out again
+ANALYSIS_VERSION = 5
+
+CACHE_PATH = os.path.join(GAME_DIR, "map", "reachability_cache.json")
+
+#Size of the standing places that make one graph node
+NODE_CELL = 32
+
+#Steps a walk edge holds its direction, about one node
+WALK_STEPS = 7
+
+#Steps into a run or a jump at which dash macros dash: right away, going up,
+#around the top, and while falling from a ledge or a jump
+DASH_STEPS = (0, 10, 25, 40, 55, 65)
+
+#Steps after which a macro that has not landed is given up
+MACRO_MAX_STEPS = 300
+
+#Movement an analysis can change: its name -> the simulation constant and the Simulation argument replacing it
+PARAMETERS = {"jump_height": ("JUMP_MAX_HEIGHT", "jump_max_height"),
+              "x_speed": ("PLAYER_X_SPEED", "player_x_speed"),
+              "dash_speed": ("DASH_SPEED", "dash_speed")}
+
+#Edge kinds
+WALK = "walk"
+FALL = "fall"
+JUMP = "jump"
+DASH = "dash"
+
+
+def default_parameters():
+    return {name: getattr(simulation, constant) for name, (constant, _) in PARAMETERS.items()}
+
+
+def level_of(map_name):
+    """The level a map plays as: 2 for map2.json, 1 for anything else."""
+    match = re.search(r"map(\d+)\.json$", map_name)
+    number = int(match.group(1)) if match else 1
+    return number if 1 <= number <= NUMBER_OF_LEVELS else 1
+
+
+def map_hash(map_name):
+    with open(map_name, "rb") as map_file:
+        return hashlib.sha256(map_file.read()).hexdigest()
+
+
+def cache_key(map_name, level, parameters):
+    return f"{map_hash(map_name)}:{level}:{json.dumps(parameters, sort_keys=True)}:{ANALYSIS_VERSION}"
+
+
+def macros():
+    """
+    (kind, name, min_steps, steps) of every edge tried from a node.
+
+    steps() yields the InputStates; the macro ends when the bear stands again
+    after at least min_steps.
+    """
+    for direction in ("Left", "Right"):
+        left = direction == "Left"
+
+        def walk(left=left, direction=direction):
+            # Keeps steering if the bear walks off a ledge
+            for step in itertools.count():
+                yield InputState(left, not left, facing=direction if step == 0 else None)
+        yield WALK, direction, WALK_STEPS, walk
+
+        def drop(left=left, direction=direction):
+            # Lets go after a step's worth of walking, to fall straight down
+            for step in range(WALK_STEPS):
+                yield InputState(left, not left, facing=direction if step == 0 else None)
+            while True:
+                yield InputState()
+        yield WALK, direction + " drop", WALK_STEPS, drop
+
+        for dash_step in DASH_STEPS:
+            for jump in (False, True):
+                def dash(left=left, direction=direction, dash_step=dash_step, jump=jump):
+                    for step in itertools.count():
+                        yield InputState(left, not left, jump=jump and step == 0, dash=step == dash_step,
+                                         facing=direction if step == 0 else None)
+                yield DASH, f"{direction} {'jump' if jump else 'run'} {dash_step}", dash_step + 1, dash
+
+    for direction in ("Left", "Right", None):
+        def jump(direction=direction):
+            left = direction == "Left"
+            right = direction == "Right"
+            for step in itertools.count():
+                yield InputState(left, right, jump=step == 0, facing=direction if step == 0 else None)
+        yield JUMP, direction, 1, jump
+
+
+class LevelGraph:
+    """
+    The movement graph of one level, explored from its spawn point, with the
+    movement parameters given (the game's by default).
+    """
+    def __init__(self, map_name, level, parameters=None):
+        self.level = level
+        self.loaded = LoadedLevel(level, load_map(map_name))
+        self.level_data = self.loaded.level_data
+        parameters = parameters or {}
+        arguments = {argument: parameters[name] for name, (_, argument) in PARAMETERS.items() if name in parameters}
+        self.simulation = Simulation(level, level_loader=self.load_level, **arguments)
+
+        # node -> snapshot of the first time the bear stood there
+        self.nodes = {}
+        # node -> [(node or None for the exit, steps, kind)]
+        self.edges = {}
+        self.coins = set()
+        self.deadly = 0
+        # Steps the bear took to land at the spawn point, set by explore()
+        self.start_steps = 0
+
+    def load_level(self, level):
+        # Reaching the next level ends a macro, the map only has to load;
+        # restoring a node's snapshot reuses the grids
+        loaded = self.loaded
+        return LoadedLevel(level, loaded.level_data, loaded.collision.copy(), loaded.info)
+
+    def node(self):
+        sim = self.simulation
+        return int(sim.player_x // NODE_CELL), int(sim.player_y // NODE_CELL)
+
+    def standing(self):
+        sim = self.simulation
+        return sim.collide and not sim.player_jump and not sim.dashing
+
+    def play(self, state, kind, min_steps, steps):
+        """
+        Play a macro from a snapshot.
+
+        Returns (node, steps, kind): node is None if the bear reached the exit
+        and the whole result None if it died or never landed.
+        """
+        sim = self.simulation
+        sim.restore(state)
+        count = 0
+        if kind == DASH:
+            # Stand still until the dash is ready
+            while sim.total_time - sim.last_dash_time < sim.dash_cooldown:
+                sim.step(InputState())
+                count += 1
+        min_steps += count
+        left_floor = False
+        for inputs in steps():
+            events = sim.step(inputs)
+            count += 1
+            for event, value in events:
+                if event == EVENT_COIN:
+                    self.coins.add(value)
+                elif event == EVENT_RESPAWN:
+                    self.deadly += 1
+                    return None
+                elif event in (EVENT_LEVEL, EVENT_EXIT):
+                    return None, count, kind
+            if sim.finished:
+                return None, count, kind
+            if not self.standing():
+                left_floor = True
+            elif count >= min_steps:
+                return self.node(), count, FALL if left_floor and kind == WALK else kind
+            if count >= MACRO_MAX_STEPS:
+                return None
+
+    def explore(self):
+        """Breadth-first search over the nodes reachable from the spawn point."""
+        sim = self.simulation
+        # Let the bear land at the spawn point first
+        for _ in range(MACRO_MAX_STEPS):
+            if self.standing():
+                break
+            sim.step(InputState())
+        start = self.node()
+        self.nodes[start] = sim.snapshot()
+        self.start_steps = round(sim.total_time / PHYSICS_STEP)
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            state = self.nodes[node]
+            edges = self.edges[node] = []
+            for kind, name, min_steps, steps in macros():
+                result = self.play(state, kind, min_steps, steps)
+                if result is None:
+                    continue
+                edges.append(result)
+                target = result[0]
+                if target is not None and target not in self.nodes:
+                    self.nodes[target] = self.simulation.snapshot()
+                    queue.append(target)
+        return start
+
+    def route_steps(self, start):
+        """Fewest steps from start to the exit through the graph, or None."""
+        best = {start: 0}
+        # The counter keeps the exit (None) from being compared with nodes
+        order = itertools.count()
+        heap = [(0, next(order), start)]
+        while heap:
+            steps, _, node = heapq.heappop(heap)
+            if node is None:
+                return steps
+            if steps > best.get(node, math.inf):
+                continue
+            for target, edge_steps, kind in self.edges.get(node, ()):
+                total = steps + edge_steps
+                if total < best.get(target, math.inf):
+                    best[target] = total
+                    heapq.heappush(heap, (total, next(order), target))
+        return None
+
+
+def analyze(map_name, level=None, parameters=None):
+    """Reachability of one map with the given movement parameters (the game's by default)."""
+    level = level or level_of(map_name)
+    parameters = dict(default_parameters(), **(parameters or {}))
+    graph = LevelGraph(map_name, level, parameters)
+    start = graph.explore()
+    route = graph.route_steps(start)
+    sim = graph.simulation
+    spawn_x = sim.spawn_point()[0]
+
+    kinds = {WALK: 0, FALL: 0, JUMP: 0, DASH: 0}
+    for edges in graph.edges.values():
+        for target, steps, kind in edges:
+            kinds[kind] += 1
+    end_of_map = graph.level_data.width * graph.level_data.tile_width
+    fastest = max(parameters["x_speed"], parameters["dash_speed"])
+    return {
+        "map": os.path.relpath(map_name, GAME_DIR),
+        "level": level,
+        "parameters": parameters,
+        "nodes": len(graph.nodes),
+        "edges": kinds,
+        "deadly_moves": graph.deadly,
+        "coins": len(sim.collision.coins.rects),
+        "reachable_coins": len(graph.coins),
+        "exit_reachable": route is not None,
+        "route_time": None if route is None else (graph.start_steps + route) * PHYSICS_STEP,
+        # Nothing crosses the map faster than the fastest move, in a straight line
+        "time_lower_bound": max(0, end_of_map - spawn_x) / fastest * PHYSICS_STEP,
+    }
+
+
+def _analyze_job(job):
+    return analyze(*job)
+
+
+def load_cache(path=CACHE_PATH):
+    try:
+        with open(path, encoding="utf-8") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache, path=CACHE_PATH):
+    with open(path, "w", encoding="utf-8") as cache_file:
+        json.dump(cache, cache_file, indent=1)
+
+
+def analyze_many(jobs, workers=None, cache_path=CACHE_PATH):
+    """
+    analyze() every (map_name, level, parameters) job, in worker processes.
+
+    Returns the results in job order. With a cache_path, results of unchanged
+    maps come from the cache and new ones are added to it.
+    """
+    jobs = [(map_name, level or level_of(map_name), dict(default_parameters(), **(parameters or {})))
+            for map_name, level, parameters in jobs]
+    cache = load_cache(cache_path) if cache_path else {}
+    keys = [cache_key(*job) for job in jobs]
+    missing = [i for i, key in enumerate(keys) if key not in cache]
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for i, result in zip(missing, pool.map(_analyze_job, [jobs[i] for i in missing])):
+                cache[keys[i]] = result
+        if cache_path:
+            save_cache(cache, cache_path)
+    return [dict(cache[key], cached=i not in missing) for i, key in enumerate(keys)]
+
+
+def number(text):
+    """A parameter value, an int when it is whole like the game's constants."""
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the coins and the exit of maps can be reached")
+    parser.add_argument("maps", nargs="*", help="Tiled maps (default: the game's levels)")
+    parser.add_argument("--jump-height", type=number, nargs="+", help="JUMP_MAX_HEIGHT values to try")
+    parser.add_argument("--x-speed", type=number, nargs="+", help="PLAYER_X_SPEED values to try")
+    parser.add_argument("--dash-speed", type=number, nargs="+", help="DASH_SPEED values to try")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--no-cache", action="store_true", help="analyze every map again")
+    args = parser.parse_args()
+
+    maps = args.maps or [map_path(level, GAME_DIR) for level in range(1, NUMBER_OF_LEVELS + 1)]
+    defaults = default_parameters()
+    choices = [(name, values or [defaults[name]]) for name, values in
+               (("jump_height", args.jump_height), ("x_speed", args.x_speed), ("dash_speed", args.dash_speed))]
+    parameter_sets = [dict(zip([name for name, values in choices], combination))
+                      for combination in itertools.product(*[values for name, values in choices])]
+    jobs = [(map_name, None, parameters) for map_name in maps for parameters in parameter_sets]
+
+    results = analyze_many(jobs, args.workers, None if args.no_cache else CACHE_PATH)
+    for result in results:
+        parameters = " ".join(f"{name}={value:g}" for name, value in result["parameters"].items())
+        route = f"{result['route_time']:.2f}s" if result["exit_reachable"] else "UNREACHABLE"
+        print(f"{result['map']} ({parameters}){' [cached]' if result['cached'] else ''}: "
+              f"exit {route} (bound {result['time_lower_bound']:.2f}s), "
+              f"coins {result['reachable_coins']}/{result['coins']}, {result['nodes']} nodes, "
+              f"edges {result['edges']}, {result['deadly_moves']} deadly moves")
+
+
+if __name__ == "__main__":
+    main()
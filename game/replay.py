@@ -0,0 +1,269 @@
+"""
+Input recording and replay.
+
+Simulation only moves on by whole physics steps and reads no clock, so the
+same InputState sequence from the same start always plays out the same way.
+A replay is that sequence, stored as key-state deltas: one (frame, keys) entry
+whenever the keys differ from the previous frame, keys being a bit mask of
+InputState. Held keys cost nothing while they stay held.
+
+Every SNAPSHOT_INTERVAL frames the recorder also stores a Simulation
+snapshot(), so ReplayPlayer.seek() starts from the nearest snapshot before
+the wanted frame instead of from frame 0. The result at the end of the
+recording (level, position, score, time) is stored too, for verify().
+
+File layout:
+
+    header      magic, version, delta count, frame count, metadata length
+    frames      uint32 frame of every delta
+    keys        uint8 keys of every delta
+    metadata    JSON: start level, step, map, result and snapshots
+
+    python replay.py verify run.replay
+    python replay.py show run.replay FRAME
+"""
+import json
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_right
+
+from physics import PHYSICS_STEP
+from simulation import GAME_DIR, Simulation, InputState, LevelRegistry
+
+MAGIC = b"BEARRPL\0"
+VERSION = 2
+
+HEADER = struct.Struct("<8sHIII")
+
+#Bits of the keys of one frame
+KEY_LEFT = 1
+KEY_RIGHT = 2
+KEY_JUMP = 4
+KEY_DOWN = 8
+KEY_DASH = 16
+KEY_FACING_LEFT = 32
+KEY_FACING_RIGHT = 64
+
+#Frames between two snapshots, ten seconds of play
+SNAPSHOT_INTERVAL = 600
+
+#What verify() compares at the end of a replay
+RESULT_FIELDS = ("level", "player_x", "player_y", "score", "total_time", "finished")
+
+
+def encode_keys(inputs):
+    keys = 0
+    if inputs.left:
+        keys |= KEY_LEFT
+    if inputs.right:
+        keys |= KEY_RIGHT
+    if inputs.jump:
+        keys |= KEY_JUMP
+    if inputs.down:
+        keys |= KEY_DOWN
+    if inputs.dash:
+        keys |= KEY_DASH
+    if inputs.facing == "Left":
+        keys |= KEY_FACING_LEFT
+    elif inputs.facing == "Right":
+        keys |= KEY_FACING_RIGHT
+    return keys
+
+
+def decode_keys(keys):
+    facing = "Left" if keys & KEY_FACING_LEFT else "Right" if keys & KEY_FACING_RIGHT else None
+    return InputState(bool(keys & KEY_LEFT), bool(keys & KEY_RIGHT), bool(keys & KEY_JUMP),
+                      bool(keys & KEY_DOWN), bool(keys & KEY_DASH), facing)
+
+
+def simulation_result(simulation):
+    return {name: getattr(simulation, name) for name in RESULT_FIELDS}
+
+
+class Replay:
+    """
+    A recorded run: the keys of every frame from a starting level.
+
+    map_name is the map played as level 1 instead of map1, like MyGame's --map.
+    """
+    def __init__(self, level=1, step=PHYSICS_STEP, map_name=None):
+        self.level = level
+        self.step = step
+        self.map_name = map_name
+        self.frames = 0
+
+        # Frame of every key change, and the keys from then on
+        self.delta_frames = array("I")
+        self.delta_keys = array("B")
+
+        # (frame, Simulation.snapshot() taken before that frame's step)
+        self.snapshots = []
+        self.result = None
+
+    def append(self, inputs):
+        """Add the keys of the next frame."""
+        keys = encode_keys(inputs)
+        if not self.delta_keys or self.delta_keys[-1] != keys:
+            self.delta_frames.append(self.frames)
+            self.delta_keys.append(keys)
+        self.frames += 1
+
+    def inputs(self, start=0, stop=None):
+        """InputState of every frame from start to stop."""
+        stop = self.frames if stop is None else min(stop, self.frames)
+        delta = bisect_right(self.delta_frames, start) - 1
+        keys = self.delta_keys[delta] if delta >= 0 else 0
+        next_change = self.delta_frames[delta + 1] if delta + 1 < len(self.delta_frames) else stop
+        for frame in range(start, stop):
+            if frame == next_change:
+                delta += 1
+                keys = self.delta_keys[delta]
+                next_change = self.delta_frames[delta + 1] if delta + 1 < len(self.delta_frames) else stop
+            yield decode_keys(keys)
+
+    def snapshot_before(self, frame):
+        """The last (frame, snapshot) at or before frame, or None."""
+        index = bisect_right([snapshot_frame for snapshot_frame, state in self.snapshots], frame) - 1
+        return self.snapshots[index] if index >= 0 else None
+
+    def save(self, path):
+        metadata = json.dumps({"level": self.level, "step": self.step, "map": self.map_name,
+                               "result": self.result, "snapshots": self.snapshots},
+                              separators=(",", ":")).encode("utf-8")
+        frames = array("I", self.delta_frames)
+        if sys.byteorder != "little":
+            frames.byteswap()
+        with open(path, "wb") as output:
+            output.write(HEADER.pack(MAGIC, VERSION, len(self.delta_keys), self.frames, len(metadata)))
+            output.write(frames.tobytes())
+            output.write(self.delta_keys.tobytes())
+            output.write(metadata)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as replay_file:
+            buffer = replay_file.read()
+        magic, version, delta_count, frames, metadata_length = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} replay")
+        offset = HEADER.size
+        delta_frames = array("I", buffer[offset:offset + delta_count * 4])
+        if sys.byteorder != "little":
+            delta_frames.byteswap()
+        offset += delta_count * 4
+        delta_keys = array("B", buffer[offset:offset + delta_count])
+        offset += delta_count
+        metadata = json.loads(buffer[offset:offset + metadata_length].decode("utf-8"))
+
+        replay = cls(metadata["level"], metadata["step"], metadata["map"])
+        replay.frames = frames
+        replay.delta_frames = delta_frames
+        replay.delta_keys = delta_keys
+        replay.snapshots = [(frame, state) for frame, state in metadata["snapshots"]]
+        replay.result = metadata["result"]
+        return replay
+
+
+class ReplayRecorder:
+    """
+    Records the inputs a Simulation is stepped with.
+
+    Call record() with every frame's inputs right before the simulation steps
+    with them, and finish() once the run is over.
+    """
+    def __init__(self, simulation, map_name=None, snapshot_interval=SNAPSHOT_INTERVAL, step=PHYSICS_STEP):
+        self.simulation = simulation
+        self.snapshot_interval = snapshot_interval
+        self.replay = Replay(simulation.level, step, map_name)
+        self.replay.snapshots.append((0, simulation.snapshot()))
+
+    def record(self, inputs):
+        replay = self.replay
+        if replay.frames and replay.frames % self.snapshot_interval == 0:
+            replay.snapshots.append((replay.frames, self.simulation.snapshot()))
+        replay.append(inputs)
+
+    def finish(self):
+        """The replay, with the simulation's final state as its result."""
+        self.replay.result = simulation_result(self.simulation)
+        return self.replay
+
+
+class ReplayPlayer:
+    """
+    Plays a replay back on its own Simulation, as fast as it can step.
+
+    Maps are parsed once per level and reused when a seek goes back to a level.
+    """
+    def __init__(self, replay, game_dir=GAME_DIR):
+        self.replay = replay
+        self.game_dir = game_dir
+        if replay.step != PHYSICS_STEP:
+            raise ValueError(f"replay recorded at a {replay.step}s step, the game steps by {PHYSICS_STEP}s")
+        self.levels = LevelRegistry(game_dir, replay.map_name)
+        self.simulation = Simulation(replay.level, game_dir, self.levels.load, level_count=self.levels.count)
+        self.frame = 0
+        # The recording may have started from a game already under way
+        first = replay.snapshot_before(0)
+        if first is not None:
+            self.simulation.restore(first[1])
+
+    def run_to(self, frame):
+        """Step forward to frame, or to the end of the replay. Returns the simulation."""
+        simulation = self.simulation
+        for inputs in self.replay.inputs(self.frame, frame):
+            if simulation.finished:
+                break
+            simulation.step(inputs)
+            self.frame += 1
+        return simulation
+
+    def seek(self, frame):
+        """Jump to frame, starting from the closest snapshot when that saves steps."""
+        snapshot = self.replay.snapshot_before(frame)
+        if snapshot is not None and (frame < self.frame or snapshot[0] > self.frame):
+            self.frame, state = snapshot
+            self.simulation.restore(state)
+        elif frame < self.frame:
+            self.frame = 0
+            self.simulation = Simulation(self.replay.level, self.game_dir, self.levels.load,
+                                         level_count=self.levels.count)
+        return self.run_to(frame)
+
+    def verify(self):
+        """Play to the end. Returns {field: (recorded, replayed)} of what differs."""
+        result = simulation_result(self.run_to(self.replay.frames))
+        recorded = self.replay.result or {}
+        return {name: (recorded.get(name), value) for name, value in result.items() if recorded.get(name) != value}
+
+
+def main():
+    command, path = sys.argv[1:3]
+    replay = Replay.load(path)
+    player = ReplayPlayer(replay)
+    if command == "verify":
+        start = time.perf_counter()
+        differences = player.verify()
+        elapsed = time.perf_counter() - start
+        print(f"{path}: {replay.frames} frames, {len(replay.delta_keys)} key changes, "
+              f"played in {elapsed:.2f}s ({replay.frames / elapsed:.0f} frames/s)")
+        for name, (recorded, replayed) in differences.items():
+            print(f"  {name}: recorded {recorded}, replayed {replayed}")
+        print("MISMATCH" if differences else "OK")
+        sys.exit(1 if differences else 0)
+    elif command == "show":
+        frame = int(sys.argv[3])
+        start = time.perf_counter()
+        simulation = player.seek(frame)
+        elapsed = time.perf_counter() - start
+        print(f"frame {player.frame} (seek took {elapsed * 1000:.1f} ms)")
+        for name, value in sorted(simulation.snapshot().items()):
+            print(f"  {name} = {value}")
+    else:
+        sys.exit(f"unknown command {command}, expected verify or show")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Build an arcade Scene straight from LevelData.
+
+Gives the same sprites, in the same order and places, as
+arcade.Scene.from_tilemap(arcade.load_tilemap(...)) for maps cut from a
+single tileset image, but can make its sprite lists lazy. Lazy lists touch no
+OpenGL state until they are first drawn, so a level can be built on a worker
+thread while the current one is still being played.
+"""
+import arcade
+
+from level_data import GID_MASK
+
+#Tiled flip flags, as in arcade.tilemap
+FLIPPED_HORIZONTALLY = 0x80000000
+FLIPPED_VERTICALLY = 0x40000000
+FLIPPED_DIAGONALLY = 0x20000000
+
+
+def tile_texture(level_data, gid):
+    tileset = level_data.tileset(gid)
+    x, y, width, height = tileset.image_rect(gid)
+    return arcade.load_texture(tileset.image, x, y, width, height,
+                               flipped_horizontally=bool(gid & FLIPPED_HORIZONTALLY),
+                               flipped_vertically=bool(gid & FLIPPED_VERTICALLY),
+                               flipped_diagonally=bool(gid & FLIPPED_DIAGONALLY),
+                               hit_box_algorithm="None")
+
+
+def tile_sprite(level_data, cell, gid, textures, scaling=1, opacity=1):
+    """The sprite of one map cell. textures caches tile textures by GID."""
+    texture = textures.get(gid)
+    if texture is None:
+        texture = textures[gid] = tile_texture(level_data, gid)
+    center_x, center_y, width, height = level_data.block(cell, gid, scaling)
+    sprite = arcade.Sprite(scale=scaling, texture=texture)
+    sprite.center_x = center_x
+    sprite.center_y = center_y
+    sprite.properties["tile_id"] = (gid & GID_MASK) - level_data.tileset(gid).firstgid
+    if opacity:
+        sprite.alpha = int(opacity * 255)
+    return sprite
+
+
+def build_scene(level_data, scaling=1, layer_options=None, lazy=True):
+    """A Scene with one sprite list per tile layer of the map."""
+    layer_options = layer_options or {}
+    textures = {}
+    scene = arcade.Scene()
+    for name, data in level_data.layers.items():
+        options = layer_options.get(name, {})
+        sprite_list = arcade.SpriteList(use_spatial_hash=options.get("use_spatial_hash", False), lazy=lazy)
+        opacity = level_data.layer_opacity.get(name, 1)
+
+        for cell, gid in enumerate(data):
+            if gid:
+                sprite_list.append(tile_sprite(level_data, cell, gid, textures, scaling, opacity))
+
+        sprite_list.visible = opacity > 0
+        scene.add_sprite_list(name, sprite_list=sprite_list)
+    return scene
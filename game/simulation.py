@@ -0,0 +1,512 @@
+"""
+Window independent game simulation.
+
+Movement, collision, scoring, respawn and level transitions of the bear, with
+no arcade imports, so a level can be played without an OpenGL window. MyGame
+feeds it one InputState per physics step and draws whatever state it ends up
+in; benchmarks and tools can drive it directly.
+"""
+import copy
+import os
+import struct
+
+from collision import LevelCollision, FLOOR, LEFT, RIGHT, CEILING
+from entities import LevelEntities, PICKUP, HAZARD, EXIT
+from levels import LevelInfo, map_path, number_of_levels
+from mapbin import load_map
+from physics import PHYSICS_STEP
+
+GAME_DIR = os.path.dirname(os.path.abspath(__file__))
+
+#Size
+CHARACTER_SCALING = 0.8
+TILE_SCALING = 1
+
+#Player movement settings, per physics step (see physics.PHYSICS_STEP)
+JUMP_MAX_HEIGHT = 100
+PLAYER_X_SPEED = 5
+PLAYER_Y_SPEED = 5
+MAX_FALL_SPEED = 20
+GRAVITY = 0.35
+
+#Animations speed
+PLAYER_SPRITE_IMAGE_CHANGE_SPEED = 50
+PLAYER_SPRITE_DASH_ANIMATION_SPEED = 20
+
+#Dash settings
+DASH_SPEED = 15
+DASH_DURATION = 0.2
+DASH_COOLDOWN = 1
+
+#Jump forgiveness, in seconds: a jump pressed this long before landing still
+#happens on landing, and one pressed this long after walking off a ledge
+#still leaves the ground
+JUMP_BUFFER_TIME = 0.1
+COYOTE_TIME = 0.1
+
+#Slack on those windows: the clock is a sum of steps, and its rounding must
+#not cut a window of whole steps one step short
+WINDOW_EPSILON = 1e-9
+
+#Time of a jump press or floor contact that never happened
+NEVER = -1.0
+
+#Levels, the map/map<n>.json files
+NUMBER_OF_LEVELS = number_of_levels(GAME_DIR)
+
+#Player animations: name -> frames as (image, flipped horizontally)
+PLAYER_ANIMATIONS = {
+    "right": [(f"img/bear/walk_cycle/Bear_Walk_Cycle{i}.png", False) for i in range(1, 5)],
+    "left": [(f"img/bear/walk_cycle/Bear_Walk_Cycle{i}.png", True) for i in range(4, 0, -1)],
+    "dash_left": [(f"img/bear/dash/bear_dash{i}.png", False) for i in range(1, 5)],
+    "dash_right": [(f"img/bear/dash/bear_dash{i}.png", True) for i in range(4, 0, -1)],
+    "up_right": [(f"img/bear/up/bear_jump{i}.png", False) for i in range(1, 4)],
+    "up_left": [(f"img/bear/up/bear_jump{i}.png", True) for i in range(3, 0, -1)],
+    "down_right": [(f"img/bear/fall/bear_fall{i}.png", False) for i in range(1, 3)],
+    "down_left": [(f"img/bear/fall/bear_fall{i}.png", True) for i in range(2, 0, -1)],
+    "idle_right": [("img/bear/walk_cycle/Bear_Walk_Cycle1.png", False)],
+    "idle_left": [("img/bear/walk_cycle/Bear_Walk_Cycle1.png", True)],
+}
+
+#Attributes of Simulation that are not game state, left out of snapshots
+NOT_STATE = ("game_dir", "level_loader", "level_count", "jump_max_height", "dash_speed", "animation_sizes",
+             "collision", "entities", "level_info", "events")
+
+#Events reported by Simulation.step
+EVENT_COIN = "coin"
+EVENT_RESPAWN = "respawn"
+EVENT_LEVEL = "level"
+EVENT_EXIT = "exit"
+EVENT_CHECKPOINT = "checkpoint"
+EVENT_JUMP = "jump"
+EVENT_DASH = "dash"
+
+
+def image_size(path):
+    """Width and height of a PNG, read from its header."""
+    with open(path, "rb") as image:
+        header = image.read(24)
+    return struct.unpack(">II", header[16:24])
+
+
+class InputState:
+    """
+    Keys for one physics step.
+
+    left and right are held keys; jump, down and dash are presses that happened
+    since the previous step, and facing is the last of Left/Right pressed.
+    """
+    def __init__(self, left=False, right=False, jump=False, down=False, dash=False, facing=None):
+        self.left = left
+        self.right = right
+        self.jump = jump
+        self.down = down
+        self.dash = dash
+        self.facing = facing
+
+
+class LoadedLevel:
+    """
+    Everything the simulation needs from a map, ready to play.
+
+    collision, if given, is a LevelCollision of the same map to reuse.
+    """
+    def __init__(self, level, level_data, collision=None, info=None):
+        self.level = level
+        self.level_data = level_data
+        self.collision = collision or LevelCollision(level_data, TILE_SCALING)
+        self.info = info or LevelInfo(level_data)
+
+
+def load_level(level, game_dir=GAME_DIR):
+    """Load a level's map (compiled if available) and build its collision grids."""
+    return LoadedLevel(level, load_map(map_path(level, game_dir)))
+
+
+class LevelRegistry:
+    """
+    The levels of a game directory, each read and indexed once.
+
+    load() hands out the cached map, markers and collision grids, with coins
+    of its own, so starting a level again, restoring a snapshot or the next
+    game parse nothing. first_map, if given, is played as level 1.
+    """
+    def __init__(self, game_dir=GAME_DIR, first_map=None):
+        self.game_dir = game_dir
+        self.first_map = first_map
+        self.count = number_of_levels(game_dir)
+        self.levels = {}
+
+    def path(self, level):
+        if self.first_map and level == 1:
+            return self.first_map
+        return map_path(level, self.game_dir)
+
+    def load(self, level):
+        cached = self.levels.get(level)
+        if cached is None:
+            cached = self.levels[level] = LoadedLevel(level, load_map(self.path(level)))
+        return LoadedLevel(level, cached.level_data, cached.collision.copy(), cached.info)
+
+
+class Simulation:
+    """
+    One player playing through the levels.
+
+    level_loader(level) -> LoadedLevel is called whenever a level starts; by
+    default a LevelRegistry of game_dir. level_count is how many levels it
+    has, the exit of the last one ending the game; by default the number of
+    maps in game_dir. jump_buffer_time and coyote_time are the jump
+    forgiveness windows, 0 for none. jump_max_height, player_x_speed and
+    dash_speed replace the movement constants of the same name, for tools
+    that try other values.
+    """
+    def __init__(self, level=1, game_dir=GAME_DIR, level_loader=None, jump_buffer_time=JUMP_BUFFER_TIME,
+                 coyote_time=COYOTE_TIME, level_count=None, jump_max_height=JUMP_MAX_HEIGHT,
+                 player_x_speed=PLAYER_X_SPEED, dash_speed=DASH_SPEED):
+        self.game_dir = game_dir
+        self.level_loader = level_loader or LevelRegistry(game_dir).load
+        self.level_count = number_of_levels(game_dir) if level_count is None else level_count
+
+        # Player box size of every animation, the player collides with the shown frame
+        self.animation_sizes = {}
+        for name, frames in PLAYER_ANIMATIONS.items():
+            width, height = image_size(os.path.join(game_dir, frames[0][0]))
+            self.animation_sizes[name] = width * CHARACTER_SCALING, height * CHARACTER_SCALING
+
+        #Level
+        self.level = level
+        self.collision = None
+        self.entities = None
+        self.level_info = None
+        self.checkpoints = []
+        self.end_of_map = 0
+        self.map_width = 0
+        self.map_height = 0
+        self.finished = False
+        self.events = []
+
+        #Player
+        self.player_x = 0
+        self.player_y = 0
+        self.previous_x = 0
+        self.previous_y = 0
+        self.player_width = 0
+        self.player_height = 0
+        self.texture = None
+
+        self.player_jump = False
+        self.jump_start = 0
+        self.last_button_x = None
+
+        #Jump_Forgiveness
+        self.jump_buffer_time = jump_buffer_time
+        self.coyote_time = coyote_time
+        self.jump_press_time = NEVER
+        self.floor_time = NEVER
+
+        #Collision
+        self.collide = False
+        self.collide_left = False
+        self.collide_right = False
+        self.collide_top = False
+        self.collide_coin = False
+
+        #Speed
+        self.player_dx = player_x_speed
+        self.player_dy = 0
+        self.jump_speed = PLAYER_Y_SPEED
+        self.fall_speed = 0
+
+        #Dash_Settings
+        self.dash_speed = dash_speed
+        self.dashing = False
+        self.dash_end_time = 0
+        self.last_dash_direction = None
+        self.dash_cooldown = DASH_COOLDOWN  # Cooldown time in seconds
+        self.last_dash_time = -self.dash_cooldown  # Initialize to allow immediate dash at start
+        self.dash_frame_index = 0
+        self.dash_frame_timer = 0
+        self.dash_frame_duration = 0.05  # Duration to display each dash frame (in seconds)
+
+        #Jump_Settings
+        self.jump_max_height = jump_max_height
+        self.jump_frame_index = 0
+        self.jump_frame_timer = 0
+        self.jump_frame_duration = 0.1
+
+        #Interface
+        self.score = 0
+
+        # Simulation clock, advanced only by physics steps
+        self.total_time = 0.0
+
+        self.load_level(level)
+
+    def load_level(self, level):
+        """Start a level from its spawn point, like MyGame.setup always has."""
+        self.level = level
+        loaded = self.level_loader(level)
+        level_data = loaded.level_data
+        self.collision = loaded.collision
+        self.entities = LevelEntities(self.collision)
+        self.level_info = loaded.info
+        self.checkpoints = []
+        self.end_of_map = level_data.width * level_data.tile_width
+        self.map_width = level_data.pixel_width
+        self.map_height = level_data.pixel_height
+
+        self.set_texture("right", 0)
+        self.respawn()
+        self.jump_start = self.player_y
+        self.jump_press_time = self.floor_time = NEVER
+        self.score = 0
+
+    def snapshot(self):
+        """
+        The game state as a dict of plain values, for restore().
+
+        Holds the player, the clocks, the level number, the checkpoints
+        reached and the coins picked up on it; the map itself is loaded
+        again on restore.
+        """
+        # Copied, so that checkpoints reached later do not show up in it
+        state = copy.deepcopy({name: value for name, value in vars(self).items() if name not in NOT_STATE})
+        state["taken_coins"] = [index for index, alive in enumerate(self.collision.coins.alive) if not alive]
+        return state
+
+    def restore(self, state):
+        """Go back to a snapshot(), reloading its level through level_loader."""
+        # Copied, so that playing on does not change the snapshot
+        state = copy.deepcopy(state)
+        taken_coins = state.pop("taken_coins")
+        loaded = self.level_loader(state["level"])
+        self.collision = loaded.collision
+        self.collision.coins.remove_many(taken_coins)
+        self.entities = LevelEntities(self.collision)
+        self.level_info = loaded.info
+        self.checkpoints = []
+        vars(self).update(state)
+        # Snapshots may have been through JSON, which has no tuples
+        self.texture = tuple(self.texture)
+        self.events = []
+
+    def set_texture(self, name, index):
+        self.texture = name, index
+        self.player_width, self.player_height = self.animation_sizes[name]
+
+    def spawn_point(self):
+        return self.level_info.spawn
+
+    def respawn(self):
+        """Put the player back on the start point or the reached checkpoint nearest to it."""
+        self.player_x, self.player_y = self.level_info.respawn_point(self.player_x, self.player_y,
+                                                                     self.checkpoints)
+        # Teleport, don't interpolate from where the player died
+        self.previous_x = self.player_x
+        self.previous_y = self.player_y
+
+    def apply_input(self, inputs):
+        if inputs.facing:
+            self.last_button_x = inputs.facing
+
+        # A press waits jump_buffer_time for the floor, the floor stays jumpable for coyote_time
+        if inputs.jump:
+            self.jump_press_time = self.total_time
+        if self.collide:
+            self.floor_time = self.total_time
+        if (self.total_time - self.jump_press_time <= self.jump_buffer_time + WINDOW_EPSILON
+                and self.total_time - self.floor_time <= self.coyote_time + WINDOW_EPSILON):
+            self.player_jump = True
+            self.jump_start = self.player_y
+            self.fall_speed = PLAYER_Y_SPEED  # Reset fall speed on jump
+            self.jump_press_time = self.floor_time = NEVER
+            self.events.append((EVENT_JUMP, None))
+
+        if inputs.down:
+            self.player_y += 15
+
+        if inputs.dash:
+            self.start_dash()
+
+    def step(self, inputs):
+        """Advance the game by one physics step of PHYSICS_STEP seconds. Returns the events."""
+        self.events = []
+        self.previous_x = self.player_x
+        self.previous_y = self.player_y
+
+        self.apply_input(inputs)
+        self.player_movement(inputs)
+
+        if self.player_jump:
+            self.collide = False
+        else:
+            self.calculate_collision()
+        self.reach_checkpoints()
+
+        self.total_time += PHYSICS_STEP
+
+        if self.level_info.killed(self.player_x, self.player_y):
+            self.respawn()
+            self.events.append((EVENT_RESPAWN, None))
+
+        if self.level_info.at_exit(self.player_x, self.player_y):
+            if self.level < self.level_count:
+                self.load_level(self.level + 1)
+                self.events.append((EVENT_LEVEL, self.level))
+            else:
+                self.finished = True
+                self.events.append((EVENT_EXIT, None))
+
+        return self.events
+
+    def reach_checkpoints(self):
+        for index in self.level_info.checkpoints_at(self.player_x, self.player_y):
+            if index not in self.checkpoints:
+                self.checkpoints.append(index)
+                self.events.append((EVENT_CHECKPOINT, index))
+
+    def walk_frame(self):
+        return int(self.player_x / PLAYER_SPRITE_IMAGE_CHANGE_SPEED) % 4
+
+    def player_movement(self, inputs):
+        current_time = self.total_time
+        if self.dashing:
+            if current_time > self.dash_end_time:
+                self.end_dash()
+            else:
+                # Update dash animation frame based on the timer
+                if current_time - self.dash_frame_timer > self.dash_frame_duration:
+                    self.dash_frame_timer = current_time
+                    self.dash_frame_index = (self.dash_frame_index + 1) % 4  # Loop through dash frames
+
+                    if self.last_dash_direction == "left":
+                        self.set_texture("dash_left", self.dash_frame_index)
+                    elif self.last_dash_direction == "right":
+                        self.set_texture("dash_right", self.dash_frame_index)
+
+                if self.last_dash_direction == "left":
+                    self.player_x -= self.dash_speed
+                    if self.collide_left:
+                        self.player_x += self.dash_speed  # Move back if collision detected
+                        self.end_dash()
+                elif self.last_dash_direction == "right":
+                    self.player_x += self.dash_speed
+                    if self.collide_right:
+                        self.player_x -= self.dash_speed  # Move back if collision detected
+                        self.end_dash()
+                return  # Exit early during dash
+
+        # When player hits the collision
+        if self.collide:
+            self.player_dy = 0
+            self.fall_speed = 0  # Reset fall speed on collision
+        else:
+            self.player_dy = PLAYER_Y_SPEED + self.fall_speed
+
+        if inputs.left and not self.collide_left:
+            self.player_x -= self.player_dx
+            self.set_texture("left", self.walk_frame())
+
+        if inputs.right and not self.collide_right:
+            self.player_x += self.player_dx
+            self.set_texture("right", self.walk_frame())
+
+        if self.player_jump:
+            if self.last_button_x == "Right":
+                if current_time - self.jump_frame_timer > self.jump_frame_duration:
+                    self.jump_frame_timer = current_time
+                    self.jump_frame_index = (self.jump_frame_index + 1) % 3  # Loop through jump frames
+                self.set_texture("up_right", self.jump_frame_index)
+
+            if self.last_button_x == "Left":
+                if current_time - self.jump_frame_timer > self.jump_frame_duration:
+                    self.jump_frame_timer = current_time
+                    self.jump_frame_index = (self.jump_frame_index + 1) % 3  # Loop through jump frames
+                self.set_texture("up_left", self.jump_frame_index)
+            distance_covered = self.player_y - self.jump_start
+            distance_left = self.jump_max_height - distance_covered
+            jump_speed_ratio = max(distance_left / self.jump_max_height, 0.1)  # Minimum ratio to ensure some speed
+            adjusted_jump_speed = self.jump_speed * jump_speed_ratio * GRAVITY
+            self.player_y += adjusted_jump_speed
+
+            self.player_y += self.player_dy
+            if self.player_y >= self.jump_start + self.jump_max_height:
+                self.player_jump = False
+                self.fall_speed = adjusted_jump_speed  # Set fall speed to the speed at the highest point
+        else:
+            if self.last_button_x == "Left":
+                self.set_texture("left", self.walk_frame())
+            elif self.last_button_x == "Right":
+                self.set_texture("right", self.walk_frame())
+
+            self.player_y -= self.player_dy
+
+        if not self.collide and not self.player_jump:
+            self.fall_speed = min(self.fall_speed + GRAVITY, MAX_FALL_SPEED)  # Increase fall speed over time
+
+    def start_dash(self):
+        current_time = self.total_time
+
+        if current_time - self.last_dash_time >= self.dash_cooldown:
+            self.dashing = True
+            self.dash_end_time = current_time + DASH_DURATION
+            self.last_dash_time = current_time  # Update last dash time
+            self.dash_frame_index = 0  # Reset dash frame index
+            self.dash_frame_timer = current_time  # Reset dash frame timer
+            self.events.append((EVENT_DASH, None))
+
+            if self.last_button_x == "Left":
+                self.last_dash_direction = "left"
+            elif self.last_button_x == "Right":
+                self.last_dash_direction = "right"
+
+            # Set the initial dash texture
+            if self.last_dash_direction == "left":
+                self.set_texture("dash_left", self.dash_frame_index)
+            elif self.last_dash_direction == "right":
+                self.set_texture("dash_right", self.dash_frame_index)
+
+    def end_dash(self):
+        self.dashing = False
+        # Reset to the appropriate walking texture
+        if self.last_button_x == "Left":
+            self.set_texture("left", self.walk_frame())
+        elif self.last_button_x == "Right":
+            self.set_texture("right", self.walk_frame())
+
+    def calculate_collision(self):
+        self.collide_coin = False
+
+        self.player_x, self.player_y, flags = self.collision.platforms.resolve(
+            self.player_x, self.player_y, self.player_width, self.player_height)
+        self.collide = bool(flags & FLOOR)
+        self.collide_left = bool(flags & LEFT)
+        self.collide_right = bool(flags & RIGHT)
+        self.collide_top = bool(flags & CEILING)
+        if self.collide_top:
+            self.player_jump = False
+
+        self.touch_entities()
+
+    def touch_entities(self):
+        """Pick up, die on or leave through whatever the player touches where the collision put it."""
+        hazard = False
+        for layer, index in self.entities.touching(self.player_x, self.player_y,
+                                                   self.player_width, self.player_height):
+            if layer.kind == PICKUP:
+                self.collide_coin = True
+                self.entities.remove(layer, index)
+                self.score += layer.value
+                self.events.append((EVENT_COIN, index))
+            elif layer.kind == HAZARD:
+                hazard = True
+            elif layer.kind == EXIT and not self.finished:
+                self.finished = True
+                self.events.append((EVENT_EXIT, None))
+        self.entities.flush()
+
+        if hazard:
+            self.collide = True
+            self.respawn()
+            self.events.append((EVENT_RESPAWN, None))
@@ -0,0 +1,66 @@
+"""
+Startup phases.
+
+python main.py opens the window before the first level is ready: the level
+is parsed, its sprites built and the player's frames decoded on the
+preloader's worker thread while the window and GL context are created, and
+frames showing only the background are drawn until it is done. Only then
+is the level's GL side set up, and of that only what is on screen; the rest
+is done a piece per frame, and the next level is not preloaded until the
+first one can be played.
+
+StartupProfile notes when each phase ended, counted from play.py's STARTED,
+taken before anything else is imported, and --profile-startup prints them:
+
+    imports      arcade and the game modules
+    window       window and GL context
+    first frame  first frame drawn, background only
+    level built  map parsed and sprites built, on the worker thread
+    scene        textures uploaded and the chunks on screen baked
+    interactive  first frame of the level drawn; keys move the bear from here on
+"""
+import sys
+import time
+
+#Phases, in the order they usually end
+IMPORTS = "imports"
+WINDOW = "window"
+FIRST_FRAME = "first frame"
+LEVEL_BUILT = "level built"
+SCENE = "scene"
+INTERACTIVE = "interactive"
+
+
+def process_started():
+    """
+    About when this process started, on the time.perf_counter() clock, for
+    python main.py. Until the imports are done it has been busy all along, so
+    its CPU time is its age, less the time it waited on the disk.
+    """
+    return time.perf_counter() - time.process_time()
+
+
+class StartupProfile:
+    """
+    End times of the startup phases, in seconds from started.
+    """
+    def __init__(self, started):
+        self.started = started
+        self.ends = {}
+
+    def mark(self, phase):
+        """Note that a phase ended now; only its first end counts. Safe from any thread."""
+        self.ends.setdefault(phase, time.perf_counter() - self.started)
+
+    @property
+    def done(self):
+        return INTERACTIVE in self.ends
+
+    def report(self):
+        """One line per phase, in the order they ended: when, and how long after the previous one."""
+        previous = 0.0
+        for phase, end in sorted(self.ends.items(), key=lambda item: item[1]):
+            print(f"{phase:<12} {end * 1000:8.1f} ms  (+{(end - previous) * 1000:6.1f} ms)")
+            previous = end
+        # Read as it is printed by benchmarks/bench_startup.py through a pipe
+        sys.stdout.flush()
@@ -0,0 +1,212 @@
+"""
+Streaming tile maps.
+
+A scene built up front holds a sprite for every tile of the map, and the
+baked layers a texture for every screen of it, so both grow with the level.
+StreamingMap cuts the map into square chunks of CHUNK_CELLS map cells and only
+creates the sprites of the chunks around the camera. Chunks that scroll out of
+view stay resident until more than MAX_RESIDENT_CHUNKS are loaded, then the
+least recently seen ones are dropped. Resident sprites and the per-frame work
+depend on the size of the screen, not of the map.
+
+Tiles belong to the chunk of their map cell, like the collision grid, and are
+drawn layer by layer over all visible chunks.
+"""
+from collections import OrderedDict
+
+import arcade
+
+from baking import DYNAMIC_LAYERS
+from scene_loader import tile_sprite
+
+#Map cells along each side of a chunk
+CHUNK_CELLS = 32
+
+#Chunks kept in memory, visible ones included; enough for the preload ring
+#around a 1600x960 window
+MAX_RESIDENT_CHUNKS = 32
+
+#Ring of chunks around the visible ones loaded ahead of time, one per frame
+PRELOAD_RING = 1
+
+#Maps with more cells than this are streamed instead of baked
+STREAMING_MIN_CELLS = 40000
+
+
+def should_stream(level_data):
+    return level_data.width * level_data.height > STREAMING_MIN_CELLS
+
+
+class StreamingMap:
+    """
+    The tile layers of a level, instantiated chunk by chunk around the camera.
+
+    Has the update_visible()/draw() interface of BakedLayers and draws every
+    layer itself, so live_layer_names is empty.
+    """
+    def __init__(self, level_data, scaling=1, chunk_cells=CHUNK_CELLS, max_chunks=MAX_RESIDENT_CHUNKS):
+        self.level_data = level_data
+        self.scaling = scaling
+        self.chunk_cells = chunk_cells
+        self.max_chunks = max_chunks
+        self.chunk_width = chunk_cells * level_data.tile_width * scaling
+        self.chunk_height = chunk_cells * level_data.tile_height * scaling
+        self.columns = -(-level_data.width // chunk_cells)
+        self.rows = -(-level_data.height // chunk_cells)
+        self.layer_names = [name for name in level_data.layers if level_data.layer_opacity.get(name, 1) > 0]
+        self.live_layer_names = []
+
+        # How far a tile image can reach past the top right of its cell
+        self.overhang = max(0, max(max(tileset.tile_width - level_data.tile_width,
+                                       tileset.tile_height - level_data.tile_height)
+                                   for tileset in level_data.tilesets) * scaling)
+
+        # (column, row) -> {layer name: SpriteList}, least recently visible first.
+        # Rows count from the bottom of the map, like the camera.
+        self.chunks = OrderedDict()
+        self.visible = []
+        self.visible_keys = None
+        self.textures = {}
+
+        # Cells whose tile was removed while playing, per dynamic layer, and
+        # chunk -> {(layer name, cell): sprite} of those layers
+        self.removed = {name: set() for name in DYNAMIC_LAYERS}
+        self.dynamic_sprites = {}
+        self.tile_cells = {}
+
+        #Counters
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def resident_sprites(self):
+        return sum(len(sprite_list) for chunk in self.chunks.values() for sprite_list in chunk.values())
+
+    def chunk_key(self, cell):
+        row, column = divmod(cell, self.level_data.width)
+        return column // self.chunk_cells, (self.level_data.height - 1 - row) // self.chunk_cells
+
+    def load_chunk(self, key):
+        """Create the sprites of one chunk."""
+        level_data = self.level_data
+        column, row = key
+        first_column = column * self.chunk_cells
+        last_column = min(first_column + self.chunk_cells, level_data.width)
+        # Map rows run from the top, chunk rows from the bottom
+        last_row = level_data.height - row * self.chunk_cells
+        first_row = max(0, last_row - self.chunk_cells)
+
+        chunk = {}
+        dynamic = {}
+        for name in self.layer_names:
+            data = level_data.layers[name]
+            opacity = level_data.layer_opacity.get(name, 1)
+            removed = self.removed.get(name)
+            sprite_list = None
+            for map_row in range(first_row, last_row):
+                start = map_row * level_data.width
+                for cell in range(start + first_column, start + last_column):
+                    gid = data[cell]
+                    if not gid or (removed is not None and cell in removed):
+                        continue
+                    if sprite_list is None:
+                        sprite_list = arcade.SpriteList()
+                    sprite = tile_sprite(level_data, cell, gid, self.textures, self.scaling, opacity)
+                    sprite_list.append(sprite)
+                    if removed is not None:
+                        dynamic[name, cell] = sprite
+            if sprite_list is not None:
+                chunk[name] = sprite_list
+        self.chunks[key] = chunk
+        self.dynamic_sprites[key] = dynamic
+        self.loads += 1
+        return chunk
+
+    def evict(self, keep):
+        """Drop the least recently visible chunks beyond max_chunks."""
+        while len(self.chunks) > max(self.max_chunks, len(keep)):
+            key, chunk = self.chunks.popitem(last=False)
+            if key in keep:
+                self.chunks[key] = chunk
+                continue
+            del self.dynamic_sprites[key]
+            self.evictions += 1
+
+    def chunk_range(self, left, bottom, width, height, ring=0):
+        """(first_column, last_column, first_row, last_row) of the chunks a rectangle can show."""
+        return (max(0, int((left - self.overhang) // self.chunk_width) - ring),
+                min(self.columns - 1, int((left + width) // self.chunk_width) + ring),
+                max(0, int((bottom - self.overhang) // self.chunk_height) - ring),
+                min(self.rows - 1, int((bottom + height) // self.chunk_height) + ring))
+
+    def update_visible(self, left, bottom, width, height):
+        """Load the chunks under a camera rectangle, and one more of the ring around it."""
+        keys = self.chunk_range(left, bottom, width, height)
+        if keys != self.visible_keys:
+            self.visible_keys = keys
+            first_column, last_column, first_row, last_row = keys
+            # Top rows first, like the sprites of a layer
+            self.visible = [(column, row) for row in range(last_row, first_row - 1, -1)
+                            for column in range(first_column, last_column + 1)]
+            for key in self.visible:
+                if key not in self.chunks:
+                    self.load_chunk(key)
+                self.chunks.move_to_end(key)
+            self.evict(set(self.visible))
+
+        if PRELOAD_RING:
+            first_column, last_column, first_row, last_row = self.chunk_range(left, bottom, width, height,
+                                                                              PRELOAD_RING)
+            ring = [(column, row) for row in range(first_row, last_row + 1)
+                    for column in range(first_column, last_column + 1)]
+            # Never preload more than fits, or the ring would evict itself
+            if len(ring) > self.max_chunks:
+                return
+            for key in ring:
+                if key not in self.chunks:
+                    self.load_chunk(key)
+                    self.evict(set(ring))
+                    return
+
+    def draw(self):
+        for name in self.layer_names:
+            for key in self.visible:
+                sprite_list = self.chunks[key].get(name)
+                if sprite_list is not None:
+                    sprite_list.draw()
+
+    def remove_tile(self, name, index):
+        """Remove the index-th tile of a dynamic layer, in LevelData.blocks() order, for good."""
+        cells = self.tile_cells.get(name)
+        if cells is None:
+            cells = self.tile_cells[name] = [cell for cell, gid in enumerate(self.level_data.layers[name])
+                                             if gid]
+        cell = cells[index]
+        self.removed[name].add(cell)
+        sprite = self.dynamic_sprites.get(self.chunk_key(cell), {}).pop((name, cell), None)
+        if sprite is not None:
+            sprite.remove_from_sprite_lists()
+
+
+class StreamedLevel:
+    """
+    A streamed level handed over by the preloader, in place of a PreparedLevel.
+
+    There is nothing to warm up: chunks are created when the camera gets near.
+    """
+    warm = True
+
+    def __init__(self, loaded, streaming_map):
+        self.loaded = loaded
+        self.streaming_map = streaming_map
+        self.scene = arcade.Scene()
+        self.baked_layers = None
+
+    def warm_up(self):
+        return False
+
+    def initialize(self):
+        pass
+
+    def finish(self):
+        pass
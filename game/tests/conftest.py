@@ -0,0 +1,13 @@
+"""
+Tests of the game, run from the repository root with python -m pytest.
+
+The game modules import each other by name, the way python main.py runs
+them, so the game directory goes on sys.path; so does benchmarks/, for the
+reference code the benchmarks and the tests both compare against.
+"""
+import os
+import sys
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GAME_DIR)
+sys.path.insert(0, os.path.join(GAME_DIR, "benchmarks"))
@@ -0,0 +1,39 @@
+"""
+Asset cache over repeated level loads. Needs arcade and an OpenGL context,
+skipped without them.
+"""
+import pytest
+
+arcade = pytest.importorskip("arcade")
+
+from assets import ASSETS  # noqa: E402
+from bench_assets import heap_growth  # noqa: E402
+
+LOADS = 100
+
+#Heap growth allowed after the first 10 loads, in bytes
+MAX_HEAP_GROWTH = 128 * 1024
+
+
+@pytest.fixture(scope="module")
+def window():
+    try:
+        arcade.Window(visible=False).close()
+    except Exception as error:
+        pytest.skip(f"no OpenGL context: {error}")
+    from main import MyGame
+
+    window = MyGame()
+    window.set_visible(False)
+    yield window
+    window.preloader.shutdown()
+    window.close()
+
+
+def test_repeated_setups_keep_memory_flat(window):
+    window.setup()
+    window.ctx.gc()
+    resident = ASSETS.stats()["resident_bytes"]
+
+    assert heap_growth(window, LOADS) <= MAX_HEAP_GROWTH
+    assert ASSETS.stats()["resident_bytes"] == resident
@@ -0,0 +1,80 @@
+"""
+BatchSimulation against one Simulation per bear, step by step.
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from batch import BatchSimulation, ANIMATION_NAMES  # noqa: E402
+from bench_batch import PARITY_DIRECTIONS, input_state, random_inputs  # noqa: E402
+from level_data import LevelData, MapObject, Tileset  # noqa: E402
+from levels import KILL_PLANE  # noqa: E402
+from simulation import Simulation, LoadedLevel, EVENT_RESPAWN  # noqa: E402
+
+BEARS = 40
+STEPS = 900
+
+#Level size in cells of 32 pixels; tiles are 64 pixels, two cells
+WIDTH = 60
+HEIGHT = 16
+
+PLATFORM = 1
+SPIKE = 2
+HONEY = 3
+
+
+def small_level(honey):
+    """
+    A floor with a hole to fall through and a spike on it, ending at the
+    right edge of the map, or in honey before that. A kill plane runs under
+    the map and a raised one floats above the floor, out of reach of bears
+    that do not jump.
+    """
+    layers = {name: [0] * (WIDTH * HEIGHT) for name in ("platforms01", "spikes", "coins", "honey")}
+    floor_row = HEIGHT - 1
+    for column in range(0, WIDTH, 2):
+        if not 20 <= column < 24:
+            layers["platforms01"][floor_row * WIDTH + column] = PLATFORM
+    layers["spikes"][(floor_row - 2) * WIDTH + 12] = SPIKE
+    if honey:
+        layers["honey"][(floor_row - 3) * WIDTH + 40] = HONEY
+    objects = [MapObject("markers", KILL_PLANE, "under", -1000, -1000, WIDTH * 32 + 2000, 950),
+               MapObject("markers", KILL_PLANE, "raised", 960, 180, 64, 100)]
+    return LevelData(WIDTH, HEIGHT, 32, 32, layers, [Tileset(1, 64, 64)], objects=objects)
+
+
+@pytest.mark.parametrize("honey", [False, True], ids=["right edge", "honey"])
+def test_batch_matches_simulation(honey):
+    level_data = small_level(honey)
+    batch = BatchSimulation(BEARS, loaded=LoadedLevel(1, level_data))
+    bears = [Simulation(level_loader=lambda number: LoadedLevel(number, level_data), level_count=1)
+             for _ in range(BEARS)]
+    rng = np.random.default_rng(1)
+    playing = set(range(BEARS))
+    inputs = None
+    respawns = 0
+    for step in range(STEPS):
+        inputs = random_inputs(rng, BEARS, inputs, PARITY_DIRECTIONS)
+        batch.step(inputs)
+        for i in sorted(playing):
+            bear = bears[i]
+            events = bear.step(input_state(inputs, i))
+            respawns += sum(event == EVENT_RESPAWN for event, value in events)
+            assert bool(batch.finished[i]) == bear.finished, (step, i)
+            if bear.finished:
+                playing.discard(i)
+                continue
+            expected = (bear.player_x, bear.player_y, bear.texture, bear.score, bear.player_jump, bear.dashing,
+                        bear.collide, bear.collide_left, bear.collide_right)
+            actual = (batch.x[i], batch.y[i], (ANIMATION_NAMES[batch.animation[i]], batch.frame[i]),
+                      batch.score[i], batch.jumping[i], batch.dashing[i], batch.collide[i], batch.collide_left[i],
+                      batch.collide_right[i])
+            assert actual == expected, (step, i)
+
+    # Some bears left the level the way it ends, and some died on the way
+    finished = np.flatnonzero(batch.finished)
+    if honey:
+        assert batch.in_honey[finished].any()
+    else:
+        assert (batch.x[finished] >= batch.end_of_map).any()
+    assert respawns == int(batch.respawns.sum()) > 0
@@ -0,0 +1,54 @@
+"""
+CollisionGrid against the full layer scan MyGame used to run every frame.
+"""
+import os
+
+import pytest
+
+from bench_collision import Block, probes, scan_on_floor, scan_platforms, synthetic_level
+from collision import CollisionGrid
+from level_data import load_level_data
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def shipped_level(number):
+    return load_level_data(os.path.join(GAME_DIR, f"map/map{number}.json"))
+
+
+LEVELS = {
+    "map1": lambda: shipped_level(1),
+    "map2": lambda: shipped_level(2),
+    "synthetic": lambda: synthetic_level(400, 44),
+}
+
+
+@pytest.mark.parametrize("name", LEVELS)
+def test_grid_matches_full_scan(name):
+    level = LEVELS[name]()
+    platform_blocks = [Block(*block) for block in level.blocks("platforms01")]
+    spike_blocks = [Block(*block) for block in level.blocks("spikes")]
+    platforms = CollisionGrid.from_layer(level, "platforms01")
+    spikes = CollisionGrid.from_layer(level, "spikes")
+
+    for x, y, width, height in probes(level):
+        assert platforms.resolve(x, y, width, height) == scan_platforms(platform_blocks, x, y, width, height)
+        assert spikes.on_floor(x, y, width, height) == scan_on_floor(spike_blocks, x, y, width, height)
+
+
+def test_removed_tiles_are_not_found():
+    grid = CollisionGrid([(16, 16, 32, 32), (48, 16, 32, 32)], 32, 32)
+    assert grid.under_point(16, 16) == [0]
+
+    grid.remove(0)
+    assert grid.under_point(16, 16) == []
+    assert grid.under_point(48, 16) == [1]
+    assert len(grid) == 1
+
+
+def test_copy_keeps_its_own_removals():
+    grid = CollisionGrid([(16, 16, 32, 32)], 32, 32)
+    copy = grid.copy()
+    copy.remove(0)
+    assert grid.contains_point(16, 16)
+    assert not copy.contains_point(16, 16)
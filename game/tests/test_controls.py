@@ -0,0 +1,75 @@
+"""
+Input queue and jump forgiveness, played on map1.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from bench_input import early_jump, late_jump
+from controls import InputQueue, ACTION_JUMP, ACTION_RIGHT
+from physics import PHYSICS_STEP
+from simulation import JUMP_BUFFER_TIME, COYOTE_TIME
+
+#Steps the windows span
+BUFFER_STEPS = round(JUMP_BUFFER_TIME / PHYSICS_STEP)
+COYOTE_STEPS = round(COYOTE_TIME / PHYSICS_STEP)
+
+
+@pytest.mark.parametrize("offset", range(1, BUFFER_STEPS + 1))
+def test_jump_pressed_early_happens_on_landing(offset):
+    assert early_jump(offset, coyote_time=0)
+    assert not early_jump(offset, jump_buffer_time=0, coyote_time=0)
+
+
+def test_jump_pressed_too_early_is_dropped():
+    assert not early_jump(BUFFER_STEPS + 1, coyote_time=0)
+
+
+@pytest.mark.parametrize("offset", range(1, COYOTE_STEPS + 1))
+def test_jump_pressed_late_leaves_the_ground(offset):
+    assert late_jump(offset, jump_buffer_time=0)
+    assert not late_jump(offset, jump_buffer_time=0, coyote_time=0)
+
+
+def test_jump_pressed_too_late_is_dropped():
+    assert not late_jump(COYOTE_STEPS + 1, jump_buffer_time=0)
+
+
+def test_press_and_release_between_steps_counts_once():
+    queue = InputQueue()
+    queue.press(ACTION_RIGHT, 1.0)
+    queue.release(ACTION_RIGHT, 1.001)
+    queue.press(ACTION_JUMP, 1.002)
+
+    inputs = queue.state()
+    assert inputs.right and inputs.jump and inputs.facing == "Right"
+    assert queue.applied == [(ACTION_RIGHT, 1.0), (ACTION_JUMP, 1.002)]
+
+    inputs = queue.state()
+    assert not inputs.right and not inputs.jump and inputs.facing is None
+
+
+def test_held_key_stays_down_until_released():
+    queue = InputQueue()
+    queue.press(ACTION_RIGHT, 1.0)
+    queue.state()
+    assert queue.state().right
+    # Let go before the step runs, it still counts for that step
+    queue.release(ACTION_RIGHT, 2.0)
+    assert queue.state().right
+    assert not queue.state().right
+
+
+def test_window_keys_reach_the_input_queue():
+    arcade = pytest.importorskip("arcade")
+    from main import MyGame
+
+    # The key handlers only touch the queue, so no window is needed to call them
+    game = SimpleNamespace(input_queue=InputQueue())
+    MyGame.on_key_press(game, arcade.key.RIGHT, 0)
+    MyGame.on_key_press(game, arcade.key.UP, 0)
+    inputs = game.input_queue.state()
+    assert inputs.right and inputs.jump
+    MyGame.on_key_release(game, arcade.key.RIGHT, 0)
+    assert game.input_queue.state().right
+    assert not game.input_queue.state().right
@@ -0,0 +1,24 @@
+"""
+Keys the best runs of maps are stored under.
+"""
+import os
+import shutil
+
+from ghost import ghost_key
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_map_of_the_same_name_gets_its_own_ghost(tmp_path):
+    shipped = os.path.join(GAME_DIR, "map/map1.json")
+    other = tmp_path / "map1.json"
+    shutil.copy(os.path.join(GAME_DIR, "map/map2.json"), other)
+    assert ghost_key(str(other)) != ghost_key(shipped)
+    assert ghost_key(str(other)).startswith("map1-")
+
+
+def test_same_map_anywhere_shares_its_ghost(tmp_path):
+    shipped = os.path.join(GAME_DIR, "map/map1.json")
+    copy = tmp_path / "map1.json"
+    shutil.copy(shipped, copy)
+    assert ghost_key(str(copy)) == ghost_key(shipped)
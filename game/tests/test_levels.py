@@ -0,0 +1,26 @@
+"""
+Level markers read from map objects.
+"""
+from level_data import LevelData, MapObject
+from levels import LevelInfo, SPAWN, KILL_PLANE, DEFAULT_KILL_Y
+
+
+def level_info(objects):
+    return LevelInfo(LevelData(80, 44, 32, 32, {}, [], objects=objects))
+
+
+def test_kill_planes_only_kill_inside_their_area():
+    info = level_info([MapObject("markers", SPAWN, "start", 64, 200),
+                       MapObject("markers", KILL_PLANE, "pit", 0, -1000, 2560, 950),
+                       MapObject("markers", KILL_PLANE, "raised", 960, 300, 64, 100)])
+    assert info.killed(1000, 350)
+    assert not info.killed(500, 350)
+    assert not info.killed(1100, 350)
+    assert info.killed(500, -60)
+    assert not info.killed(500, 100)
+
+
+def test_without_kill_planes_the_bear_dies_below_the_default_height():
+    info = level_info([])
+    assert info.killed(3000, DEFAULT_KILL_Y - 1)
+    assert not info.killed(0, DEFAULT_KILL_Y)
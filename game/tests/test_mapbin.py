@@ -0,0 +1,54 @@
+"""
+Compiled maps against the Tiled JSON they are compiled from.
+"""
+import os
+import shutil
+
+import pytest
+
+from collision import LevelCollision
+from level_data import load_level_data
+from mapbin import compile_map, load_map_binary, pack_layer, unpack_layer
+from mapgen import TILESET_SOURCE, generate_level, write_tiled_json
+
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("name", ["map1", "map2"])
+def test_compiled_map_matches_json(name, tmp_path):
+    json_path = os.path.join(GAME_DIR, f"map/{name}.json")
+    binary_path = compile_map(json_path, str(tmp_path / f"{name}.bin"))
+    json_level = load_level_data(json_path)
+    binary_level = load_map_binary(binary_path)
+
+    assert os.path.getsize(binary_path) < os.path.getsize(json_path) / 3
+    assert {name: list(data) for name, data in binary_level.layers.items()} == json_level.layers
+    assert binary_level.layer_opacity == json_level.layer_opacity
+    assert [item.as_tuple() for item in binary_level.objects] == [item.as_tuple() for item in json_level.objects]
+
+    json_collision = LevelCollision(json_level)
+    binary_collision = LevelCollision(binary_level)
+    for layer, grid in json_collision.layers.items():
+        assert binary_collision.layers[layer].rects == grid.rects
+        assert binary_collision.layers[layer].cells == grid.cells
+
+
+@pytest.mark.parametrize("data", [
+    [0] * 99 + [0x80000005],
+    [7, 0x40000007, 9] * 30,
+    list(range(1, 301)),
+    [0] * 100,
+])
+def test_pack_layer_round_trip(data):
+    palette, indices, cells = pack_layer(data, "H")
+    assert list(unpack_layer(palette, indices, cells, len(data))) == data
+
+
+def test_large_map_numbers_cells_in_32_bits(tmp_path):
+    # 400 x 200 cells, more than a uint16 can number
+    shutil.copy(os.path.join(GAME_DIR, "map", TILESET_SOURCE), tmp_path)
+    json_path = str(tmp_path / "big.json")
+    write_tiled_json(generate_level(400, 200), json_path)
+
+    binary_level = load_map_binary(compile_map(json_path))
+    assert {name: list(data) for name, data in binary_level.layers.items()} == load_level_data(json_path).layers
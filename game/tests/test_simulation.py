@@ -0,0 +1,59 @@
+"""
+Simulation: stepping, replays of its steps, snapshots.
+"""
+import pytest
+
+from physics import PHYSICS_STEP
+from level_data import LevelData, MapObject, Tileset
+from levels import SPAWN, CHECKPOINT
+from replay import Replay, ReplayPlayer
+from simulation import Simulation, InputState, LoadedLevel, EVENT_CHECKPOINT
+
+
+def test_step_advances_the_clock_by_physics_step():
+    simulation = Simulation()
+    for _ in range(3):
+        simulation.step(InputState())
+    assert simulation.total_time == pytest.approx(3 * PHYSICS_STEP)
+
+
+def test_replay_at_another_step_is_refused():
+    with pytest.raises(ValueError):
+        ReplayPlayer(Replay(step=PHYSICS_STEP / 2))
+
+
+def marked_level():
+    """A floor 60 cells long with a checkpoint a few steps to the right of the spawn point."""
+    width, height = 60, 16
+    platforms = [0] * (width * height)
+    for column in range(0, width, 2):
+        platforms[(height - 1) * width + column] = 1
+    objects = [MapObject("markers", SPAWN, "start", 64, 200),
+               MapObject("markers", CHECKPOINT, "checkpoint", 384, 64, 64, 256)]
+    return LevelData(width, height, 32, 32, {"platforms01": platforms}, [Tileset(1, 64, 64)], objects=objects)
+
+
+def play_until(simulation, inputs, event, limit=600):
+    for _ in range(limit):
+        if any(name == event for name, value in simulation.step(inputs)):
+            return
+    raise AssertionError(f"no {event} event")
+
+
+def test_restored_snapshot_respawns_at_checkpoints_reached_before_it():
+    level_data = marked_level()
+    simulation = Simulation(level_loader=lambda level: LoadedLevel(level, level_data), level_count=1)
+    spawn = simulation.spawn_point()
+    snapshot = simulation.snapshot()
+
+    play_until(simulation, InputState(right=True), EVENT_CHECKPOINT)
+    assert simulation.checkpoints == [0]
+    assert snapshot["checkpoints"] == []
+
+    simulation.restore(snapshot)
+    simulation.respawn()
+    assert (simulation.player_x, simulation.player_y) == spawn
+
+    # Reaching the checkpoint again leaves the snapshot alone too
+    play_until(simulation, InputState(right=True), EVENT_CHECKPOINT)
+    assert snapshot["checkpoints"] == []